@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+
+# analyses of the model that need more than one optimization, done on the solver of the model without copying it
+# lexicographic_optimize is the procedure of Irani et al. (2016): optimize the growth, keep it as a constraint and
+# then optimize the protein production, every stage is one LP that starts from the basis of the stage before
+# focused_fva only does the flux variability of the reactions we look at (the heterologous pathway), for many media at
+# once: every condition is a model_gsm.scenario and the min/max LPs are split among a process pool
+# sample_fluxes is OptGP sampling (Megchelenbrink et al. 2014) with every chain in its own process, the thinned samples
+# go straight to a .npy file on disk (a numpy memmap) and only their running means and variances are kept in memory,
+# which give the convergence diagnostics (R-hat between the chains and the Geweke score of every chain)
+# bound_sensitivity tells which bounds limit the objective from the duals of one optimal solution: the reduced cost of
+# a flux at its bound is the change of the optimum per unit the bound is moved, and the ranging of GLPK gives how far it
+# can be moved before the basis (and so the rate) changes, which is what a scan of that bound would show
+
+import fnmatch
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from cobra.core import get_solution
+from cobra.flux_analysis.loopless import loopless_fva_iter
+from cobra.sampling import OptGPSampler
+from cobra.util.solver import fix_objective_as_constraint
+
+try:
+    # not part of the API of cobra (works with the version in requirements.txt), see check_sampler
+    from cobra.sampling.core import step
+except ImportError:
+    step = None
+
+import model_gsm
+
+# model (or sampler) of the worker process, set once by worker_init (or sampler_init)
+worker_model = None
+worker_sampler = None
+
+
+def worker_init(model):
+
+    global worker_model
+    worker_model = model
+
+
+def objective_expression(model, objective):
+
+    # flux expression of a reaction (id or cobra Reaction), anything else is taken as an optlang expression
+    if isinstance(objective, str):
+        return model.reactions.get_by_id(objective).flux_expression
+    if hasattr(objective, 'flux_expression'):
+        return objective.flux_expression
+    return objective
+
+
+def lexicographic_optimize(model, objectives, tolerances=None, directions=None, verbose=False):
+
+    # optimizes the objectives one after the other, every stage keeps the optimum of the stages before as a constraint
+    # tolerances are the slack of every stage as a fraction of its optimum (0, the default, keeps it exact, 0.05 allows
+    # 5% less growth for a maximization), directions are 'max' (default) or 'min' for every stage
+    # the constraints and the last objective stay in the model like any objective change, so use it inside `with model:`
+    # to get the model back as it was. a stage that is not optimal stops the rest (their values are nan)
+    # returns a dict with the optimum, the solver status and the wall time of every stage, and the cobra solution of the
+    # last stage (None if it was not solved). verbose prints them for every stage
+    tolerances = [0] * len(objectives) if tolerances is None else list(tolerances)
+    directions = ['max'] * len(objectives) if directions is None else list(directions)
+    if not len(objectives) == len(tolerances) == len(directions):
+        raise ValueError("one tolerance and one direction per objective are needed")
+    if any(direction not in ('max', 'min') for direction in directions):
+        raise ValueError("directions must be 'max' or 'min'")
+    result = {'objective': np.full(len(objectives), np.nan), 'status': [None] * len(objectives),
+              'time': np.zeros(len(objectives)), 'solution': None}
+    for stage, (objective, tolerance, direction) in enumerate(zip(objectives, tolerances, directions)):
+        start = time.perf_counter()
+        expression = objective_expression(model, objective)
+        model.objective = model.problem.Objective(expression, direction=direction)
+        status = model.solver.optimize()
+        result['status'][stage] = status
+        if status != 'optimal':
+            result['time'][stage] = time.perf_counter() - start
+            print("WARNING: stage {} of the lexicographic optimization is {}, the next ones are not solved".format(
+                stage, status))
+            break
+        value = model.solver.objective.value
+        result['objective'][stage] = value
+        if stage < len(objectives) - 1:
+            slack = tolerance * abs(value)
+            bounds = {'lb': value - slack} if direction == 'max' else {'ub': value + slack}
+            # a constraint of an earlier call with the same name is replaced, not added twice
+            name = 'lexicographic_stage_{}'.format(stage)
+            if name in model.constraints:
+                model.remove_cons_vars([model.constraints[name]])
+            model.add_cons_vars([model.problem.Constraint(expression, name=name, **bounds)])
+        else:
+            result['solution'] = get_solution(model)
+        result['time'][stage] = time.perf_counter() - start
+    for stage, objective in enumerate(objectives if verbose else []):
+        print("stage {} ({}): {} {:.6g} in {:.1f} ms".format(
+            stage, getattr(objective, 'id', objective), result['status'][stage], result['objective'][stage],
+            1000 * result['time'][stage]))
+    return result
+
+
+def select_reactions(model, patterns):
+
+    # ids of the reactions that match any of the patterns (reaction ids or shell patterns like '*_DNA_reaction'),
+    # in the order of the patterns
+    ids = [reaction.id for reaction in model.reactions]
+    selected = []
+    for pattern in patterns:
+        matches = fnmatch.filter(ids, pattern)
+        if not matches:
+            raise ValueError("no reaction matches {}".format(pattern))
+        selected.extend(match for match in matches if match not in selected)
+    return selected
+
+
+def flux_ranges(model, reactions, fraction_of_optimum=1.0, loopless=False):
+
+    # optimum and status of the model as it is, and the minimum and maximum flux of every reaction keeping the objective
+    # at least at fraction_of_optimum of the optimum. the LPs only change the objective coefficients, so every one starts
+    # from the basis of the one before. the model is left as it was
+    ranges = np.full((len(reactions), 2), np.nan)
+    objective, status = model_gsm.optimum(model)
+    if status != 'optimal':
+        return objective, status, ranges
+    with model:
+        fix_objective_as_constraint(model, bound=fraction_of_optimum * objective)
+        model.objective = model.problem.Objective(0, direction='max')
+        for row, reaction in enumerate(model.reactions.get_by_id(reaction) for reaction in reactions):
+            coefficients = {reaction.forward_variable: 1, reaction.reverse_variable: -1}
+            model.solver.objective.set_linear_coefficients(coefficients)
+            for column, direction in enumerate(('min', 'max')):
+                model.solver.objective.direction = direction
+                if model.solver.optimize() != 'optimal':
+                    continue
+                ranges[row, column] = loopless_fva_iter(model, reaction) if loopless else model.solver.objective.value
+            model.solver.objective.set_linear_coefficients({variable: 0 for variable in coefficients})
+    return objective, status, ranges
+
+
+def condition_ranges(model, task):
+
+    condition, changes, reactions, fraction_of_optimum, loopless = task
+    with model_gsm.scenario(model, **changes):
+        return (condition, reactions) + flux_ranges(model, reactions, fraction_of_optimum, loopless)
+
+
+def worker_ranges(task):
+
+    return condition_ranges(worker_model, task)
+
+
+def focused_fva(model, reactions, conditions=None, fraction_of_optimum=1.0, loopless=False, processes=None):
+
+    # flux variability of the reactions (ids or shell patterns, see select_reactions) in every condition, conditions is
+    # a dict {name: dict of model_gsm.scenario arguments} or a list of them (named by their position), None is the model
+    # as it is. the reactions of every condition are split in a few chunks so all the processes have work
+    # returns a pandas DataFrame with a row per condition and reaction: condition, reaction, minimum, maximum, the
+    # optimum of the condition and its solver status (minimum and maximum are nan if the condition has no optimum)
+    import pandas as pd
+    reactions = select_reactions(model, reactions)
+    conditions = {None: {}} if conditions is None else conditions
+    if not isinstance(conditions, dict):
+        conditions = dict(enumerate(conditions))
+    processes = processes or os.cpu_count()
+    chunks = min(len(reactions), math.ceil(4 * processes / len(conditions))) if processes > 1 else 1
+    tasks = [(condition, changes, [reactions[index] for index in chunk], fraction_of_optimum, loopless)
+             for condition, changes in conditions.items() for chunk in np.array_split(np.arange(len(reactions)), chunks)]
+    if processes == 1:
+        results = [condition_ranges(model, task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes, initializer=worker_init, initargs=(model,)) as pool:
+            results = pool.map(worker_ranges, tasks)
+    rows = [(condition, reaction, minimum, maximum, objective, status)
+            for condition, chunk, objective, status, ranges in results
+            for reaction, (minimum, maximum) in zip(chunk, ranges)]
+    return pd.DataFrame(rows, columns=['condition', 'reaction', 'minimum', 'maximum', 'objective', 'status'])
+
+
+class FluxSampler(OptGPSampler):
+
+    # the OptGP sampler of cobra, but only warmup points that are the same point are dropped. cobra drops the ones that
+    # are too correlated with another one, which in pheast_final drops the point of maximum hemo_Biosynthesis (0.08,
+    # next to loops of 1000) and then no chain can ever move it from 0
+
+    def _is_redundant(self, matrix, cutoff=None):
+        _, first = np.unique(np.round(np.asarray(matrix) / self.feasibility_tol), axis=0, return_index=True)
+        redundant = np.ones(len(matrix), dtype=bool)
+        redundant[first] = False
+        return redundant
+
+
+# what sample_chain and FluxSampler use of the OptGP sampler of cobra besides its API
+sampler_internals = ['_seed', '_reproject', 'fwd_idx', 'rev_idx', 'warmup', 'n_warmup', 'center', 'n_samples', 'nproj',
+                     'problem', 'thinning']
+
+
+def check_sampler(sampler=None):
+
+    # the chains of sample_fluxes are run here with internals of the OptGP sampler of cobra (cobra only samples batches
+    # that all start again from the center with the same seed), so another version of cobra must fail here and not give
+    # wrong samples. without sampler only what is there before the warmup points are made is checked
+    import cobra
+    missing = [] if step is not None else ['cobra.sampling.core.step']
+    if not callable(getattr(OptGPSampler, '_is_redundant', None)):
+        missing.append('OptGPSampler._is_redundant')
+    if sampler is not None:
+        missing += ['OptGPSampler.' + name for name in sampler_internals if not hasattr(sampler, name)]
+    if missing:
+        raise ImportError("sample_fluxes needs {} which cobra {} does not have, install the version in "
+                          "requirements.txt".format(', '.join(missing), cobra.__version__))
+
+
+def sampler_init(sampler):
+
+    global worker_sampler
+    worker_sampler = sampler
+
+
+def add_moments(moments, block):
+
+    # (count, mean, sum of squared deviations) of every column with the rows of block added (Chan et al.)
+    count, mean, squares = moments
+    if len(block) == 0:
+        return moments
+    block_mean = block.mean(axis=0)
+    total = count + len(block)
+    delta = block_mean - mean
+    squares = squares + ((block - block_mean) ** 2).sum(axis=0) + delta ** 2 * count * len(block) / total
+    return total, mean + delta * len(block) / total, squares
+
+
+def sample_chain(sampler, task):
+
+    # one OptGP chain: rows start to stop of the memmap in path, batch_size samples at a time, each one every
+    # sampler.thinning steps. only the flux of the reactions at columns of the net fluxes is written
+    # returns the moments of the whole chain and of 10 batches of its first 10% and of its last 50% (for the Geweke
+    # score, the batch means give its standard errors with the autocorrelation of the chain)
+    path, chain, start, stop, columns, batch_size = task
+    np.random.seed((sampler._seed + chain) % np.iinfo(np.int32).max)
+    samples = np.lib.format.open_memmap(path, mode='r+')
+    forward, reverse = sampler.fwd_idx[columns], sampler.rev_idx[columns]
+    center = np.array(sampler.center)
+    prev = step(sampler, center, sampler.warmup[np.random.randint(sampler.n_warmup)] - center, 0.95)
+    n_samples = max(sampler.n_samples, 1)
+    length = stop - start
+    segments = {'chain': (0, length)}
+    for name, (low, high) in (('first', (0, math.ceil(0.1 * length))), ('last', (length - length // 2, length))):
+        edges = np.linspace(low, high, 11).astype(int)
+        segments.update({(name, batch): (edges[batch], edges[batch + 1]) for batch in range(10)})
+    moments = {segment: (0, 0.0, 0.0) for segment in segments}
+    for offset in range(0, length, batch_size):
+        batch = np.empty((min(batch_size, length - offset), len(columns)))
+        for row in range(len(batch)):
+            for _ in range(sampler.thinning):
+                delta = sampler.warmup[np.random.randint(sampler.n_warmup)] - center
+                prev = step(sampler, prev, delta)
+                if sampler.problem.homogeneous and n_samples * sampler.thinning % sampler.nproj == 0:
+                    prev = sampler._reproject(prev)
+                    center = sampler._reproject(center)
+                center = (n_samples * center) / (n_samples + 1) + prev / (n_samples + 1)
+                n_samples += 1
+            batch[row] = prev[forward] - prev[reverse]
+        samples[start + offset:start + offset + len(batch)] = batch
+        samples.flush()
+        for segment, (low, high) in segments.items():
+            moments[segment] = add_moments(moments[segment], batch[max(low - offset, 0):max(high - offset, 0)])
+    del samples
+    return chain, moments
+
+
+def worker_chain(task):
+
+    return sample_chain(worker_sampler, task)
+
+
+def geweke(chain):
+
+    # Geweke score of every reaction of a chain with batch-means standard errors, nan if the chain is too short
+    means = {}
+    for name in ('first', 'last'):
+        means[name] = np.array([chain[name, batch][1] for batch in range(10) if chain[name, batch][0] > 0])
+    if min(len(means['first']), len(means['last'])) < 2:
+        return np.nan
+    error = np.sqrt(sum(batch_means.var(axis=0, ddof=1) / len(batch_means) for batch_means in means.values()))
+    return np.where(error > 0, np.abs(means['first'].mean(axis=0) - means['last'].mean(axis=0)) / error, 0.0)
+
+
+def convergence(moments, reactions, tolerance=1e-6):
+
+    # diagnostics of every reaction from the moments of every chain: mean and standard deviation of all the samples,
+    # R-hat (Gelman and Rubin, nan with one chain, close to 1 when the chains agree) and the largest absolute Geweke
+    # score of the chains (difference of the means of the first 10% and the last 50% of a chain in standard errors,
+    # below 2 when the chain does not drift). both are nan for the reactions that do not change (standard deviation
+    # below tolerance), their differences are only rounding
+    import pandas as pd
+    counts = np.array([chain['chain'][0] for chain in moments], dtype=float)
+    means = np.array([chain['chain'][1] for chain in moments])
+    squares = np.array([chain['chain'][2] for chain in moments])
+    variances = squares / np.maximum(counts - 1, 1)[:, None]
+    mean = counts @ means / counts.sum()
+    spread = (squares.sum(axis=0) + counts @ (means - mean) ** 2) / max(counts.sum() - 1, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rhat = np.full(len(reactions), np.nan)
+        if len(moments) > 1:
+            # chains of (about) the same length n: W the mean variance in the chains, B / n the variance of their means
+            n = counts.mean()
+            within = variances.mean(axis=0)
+            between = means.var(axis=0, ddof=1)
+            rhat = np.sqrt(((n - 1) / n * within + between) / within)
+        scores = np.max([np.broadcast_to(geweke(chain), mean.shape) for chain in moments], axis=0)
+    constant = np.sqrt(spread) < tolerance
+    return pd.DataFrame({'reaction': reactions, 'mean': mean, 'std': np.sqrt(spread),
+                         'rhat': np.where(constant, np.nan, rhat), 'geweke': np.where(constant, np.nan, scores)})
+
+
+def sample_fluxes(model, path, n_samples, reactions=None, chains=None, thinning=5000, batch_size=1000, seed=None,
+                  processes=None, dtype=np.float64):
+
+    # n_samples flux distributions of model sampled uniformly with OptGP, written to path as a .npy array (samples x
+    # reactions) that np.load(path, mmap_mode='r') (or read_samples) opens without loading it. reactions are ids or
+    # shell patterns (see select_reactions) of the reactions to keep, all by default. the samples are split in chains
+    # (one per process by default), every chain runs in a process of its own and writes its rows batch_size samples at
+    # a time, so a million samples of a few hundred reactions only need the disk. the warmup points (two LPs per
+    # reaction) are made once here and sent to every process. the reaction ids go to path with .txt instead of .npy
+    # the chains of pheast_final mix slowly: with 2000 samples in 4 chains a thinning of 100 (the default of cobra) gives
+    # R-hat up to 1.12 and Geweke scores up to 12, 1000 gets R-hat to 1 but Geweke scores up to 3.5, and 5000 (the
+    # default here) passes both for hemo_Biosynthesis, r_methane_oxidation and r1339. a smaller thinning is only good
+    # to check that everything runs
+    # returns the diagnostics of every reaction (see convergence)
+    processes = processes or os.cpu_count()
+    chains = chains or processes
+    reactions = [reaction.id for reaction in model.reactions] if reactions is None else select_reactions(model, reactions)
+    index = {reaction.id: column for column, reaction in enumerate(model.reactions)}
+    columns = np.array([index[reaction] for reaction in reactions])
+    check_sampler()
+    start = time.perf_counter()
+    sampler = FluxSampler(model, thinning=thinning, processes=1, seed=seed)
+    check_sampler(sampler)
+    print("{} warmup points in {:.0f} s".format(sampler.n_warmup, time.perf_counter() - start))
+    np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n_samples, len(reactions)))
+    with open(path[:-4] + '.txt' if path.endswith('.npy') else path + '.txt', 'w') as handle:
+        handle.write('\n'.join(reactions) + '\n')
+    bounds = np.linspace(0, n_samples, chains + 1).astype(int)
+    tasks = [(path, chain, bounds[chain], bounds[chain + 1], columns, batch_size) for chain in range(chains)]
+    start = time.perf_counter()
+    if processes == 1 or chains == 1:
+        results = [sample_chain(sampler, task) for task in tasks]
+    else:
+        with multiprocessing.Pool(min(processes, chains), initializer=sampler_init, initargs=(sampler,)) as pool:
+            results = pool.map(worker_chain, tasks, chunksize=1)
+    elapsed = time.perf_counter() - start
+    diagnostics = convergence([moments for _, moments in sorted(results, key=lambda result: result[0])], reactions)
+    print("{} samples of {} reactions in {} chains in {:.0f} s ({:.0f} per second), of the {} that change {} have R-hat "
+          "above 1.1 and {} a Geweke score above 2".format(
+              n_samples, len(reactions), chains, elapsed, n_samples / elapsed, int(diagnostics['geweke'].notna().sum()),
+              int((diagnostics['rhat'] > 1.1).sum()), int((diagnostics['geweke'] > 2).sum())))
+    return diagnostics
+
+
+def read_samples(path):
+
+    # samples written by sample_fluxes as a memmap (nothing is read until it is used) and the ids of its columns
+    with open(path[:-4] + '.txt' if path.endswith('.npy') else path + '.txt') as handle:
+        reactions = handle.read().split()
+    return np.load(path, mmap_mode='r'), reactions
+
+
+def bound_sensitivity(model, reactions=None, tolerance=1e-9):
+
+    # which bounds of reactions (ids or shell patterns, see select_reactions, the exchanges of the model by default)
+    # limit the objective, from one LP. for every reaction: the bound its flux is at ('upper' or 'lower', None if the
+    # flux is not at a bound), its value, the flux, the rate (change of the objective per unit the bound is relaxed,
+    # raised for an upper bound and lowered for a lower one, negative if relaxing it makes the objective worse), the
+    # range of values of the bound where the rate holds (from GLPK ranging, nan with other solvers), the gain of
+    # relaxing the bound to the end of that range and the shadow price of the metabolite of the reaction (for
+    # reactions with one metabolite). a fixed bound (a closed uptake) is relaxed in the direction that helps most
+    # in a degenerate LP the range can end at the bound itself (gain 0): the basis changes at once, but the rate often
+    # still holds further, a scan of that bound tells
+    # returns a pandas DataFrame with the limiting bounds (largest rate) first, the model is left as it was
+    import pandas as pd
+    reactions = [reaction.id for reaction in model.exchanges] if reactions is None else select_reactions(model, reactions)
+    start = time.perf_counter()
+    status = model.solver.optimize()
+    if status != 'optimal':
+        raise ValueError("the model is {}, it has no duals".format(status))
+    objective = model.solver.objective.value
+    solved = time.perf_counter() - start
+    sign = 1 if model.solver.objective.direction == 'max' else -1
+    glpk = model.solver.interface.__name__ == 'optlang.glpk_interface'
+    if glpk:
+        import swiglpk
+        problem = model.solver.problem
+        n_rows = swiglpk.glp_get_num_rows(problem)
+        if not swiglpk.glp_bf_exists(problem):
+            swiglpk.glp_factorize(problem)
+        low, high = swiglpk.doubleArray(1), swiglpk.doubleArray(1)
+        low_variable, high_variable = swiglpk.intArray(1), swiglpk.intArray(1)
+    else:
+        print("WARNING: ranging needs GLPK, the ranges and gains are nan with {}".format(model.solver.interface.__name__))
+    rows = []
+    for reaction in (model.reactions.get_by_id(reaction) for reaction in reactions):
+        # (bound, value, rate, range) for every bound of the net flux at which a variable of the reaction is. the
+        # forward variable carries the upper bound (and a positive lower one), the reverse variable the lower bound (as
+        # minus its upper bound) and a negative upper one, so a range of the reverse variable is flipped
+        sides = []
+        for variable, direction in ((reaction.forward_variable, 1), (reaction.reverse_variable, -1)):
+            if glpk:
+                column = swiglpk.glp_find_col(problem, variable.name)
+                variable_status = swiglpk.glp_get_col_stat(problem, column)
+                at_upper = variable_status in (swiglpk.GLP_NU, swiglpk.GLP_NS)
+                at_lower = variable_status == swiglpk.GLP_NL
+            else:
+                at_upper = variable.ub is not None and abs(variable.primal - variable.ub) <= tolerance
+                at_lower = not at_upper and abs(variable.primal - variable.lb) <= tolerance
+            value = variable.ub if at_upper else variable.lb
+            # a variable at a bound of 0 can be only the split of the flux in two (the reverse variable of a forward
+            # flux), it is a bound of the reaction when the net flux is there
+            if not (at_upper or at_lower) or abs(direction * value - reaction.flux) > tolerance:
+                continue
+            bound = 'upper' if (direction == 1) == at_upper else 'lower'
+            rate = sign * variable.dual * (1 if at_upper else -1)
+            ranges = (np.nan, np.nan)
+            if glpk:
+                # GLPK aborts for a basic variable, only the ones at a bound get here
+                swiglpk.glp_analyze_bound(problem, n_rows + column, low, low_variable, high, high_variable)
+                ranges = (low[0], high[0]) if direction == 1 else (-high[0], -low[0])
+            # how far the bound of the variable can be relaxed with the same rate
+            room = (high[0] - value if at_upper else value - low[0]) if glpk else np.nan
+            sides.append((bound, direction * value + 0.0, rate, ranges, rate * room))
+        bound, value, rate, (range_low, range_high), gain = max(
+            sides, key=lambda side: side[2], default=(None, np.nan, 0.0, (np.nan, np.nan), 0.0))
+        metabolites = list(reaction.metabolites)
+        shadow_price = model.constraints[metabolites[0].id].dual + 0.0 if len(metabolites) == 1 else np.nan
+        rows.append((reaction.id, reaction.name, bound, value, reaction.flux, rate, range_low, range_high, gain,
+                     shadow_price))
+    report = pd.DataFrame(rows, columns=['reaction', 'name', 'bound', 'value', 'flux', 'rate', 'range_low',
+                                         'range_high', 'gain', 'shadow_price'])
+    report = report.sort_values(['rate', 'gain'], ascending=False, ignore_index=True)
+    print("optimum {:.6g} in {:.1f} ms, {} of {} bounds limit it (ranging in {:.1f} ms)".format(
+        objective, 1000 * solved, int((report['rate'] > tolerance).sum()), len(report),
+        1000 * (time.perf_counter() - start - solved)))
+    return report
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+
+# benchmarks for the GSM workflow helpers, run with: python benchmark_gsm.py
+# the sequences are random, with lengths similar to a yeast proteome (K. phaffii has about 5,000 proteins)
+# the workflow suite (python benchmark_gsm.py --suite) times the steps of the notebook, each one in a fresh process, and
+# keeps the wall time, peak RSS and solver calls of every run in a JSON history. a run is compared with a stored
+# baseline (--save-baseline stores the current run as the baseline) and the steps that got slower are flagged
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+import stoichiometry_gsm
+
+default_history_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_history.json')
+default_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+amino_acids = ''.join(stoichiometry_gsm.sbml_aa.keys())
+
+
+def best_time(function, repeats=5):
+
+    # best wall time of a few runs, the best one is the least disturbed by everything else running on the machine
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def random_proteome(n_proteins=5000, min_length=100, max_length=800, seed=0):
+
+    rng = random.Random(seed)
+    return [''.join(rng.choices(amino_acids, k=rng.randint(min_length, max_length))) for _ in range(n_proteins)]
+
+
+def bench_stoichiometry_batch(n_proteins=10000):
+
+    proteins = random_proteome(n_proteins)
+    names = ['protein_{}'.format(i) for i in range(n_proteins)]
+    loop = best_time(lambda: [stoichiometry_gsm.get_stoichiometry(seq, 'AA', name) for seq, name in zip(proteins, names)], 3)
+    batch = best_time(lambda: stoichiometry_gsm.get_stoichiometry_batch(proteins, 'AA', names))
+    print("get_stoichiometry on {} proteins: {:.3f} s, get_stoichiometry_batch: {:.3f} s ({:.0f}x)".format(n_proteins, loop, batch, loop / batch))
+    return {'loop': loop, 'batch': batch}
+
+
+def bench_back_translation(n_proteins=5000):
+
+    proteins = random_proteome(n_proteins)
+    names = ['protein_{}'.format(i) for i in range(n_proteins)]
+    residues = sum(map(len, proteins))
+    translation = best_time(lambda: stoichiometry_gsm.back_translate_batch(proteins))
+    constructs = best_time(lambda: stoichiometry_gsm.get_construct_stoichiometry_batch(proteins, names))
+    print("back translation of {} proteins ({} aa): {:.3f} s ({:.1e} aa/s), with the DNA/RNA/AA stoichiometries: {:.3f} s".format(
+        n_proteins, residues, translation, residues / translation, constructs))
+    return {'back_translate_batch': translation, 'get_construct_stoichiometry_batch': constructs}
+
+
+def bench_model_load(path=None):
+
+    # cold SBML parse against loading the snapshot, on a copy of the XML so the real snapshot is not touched
+    import model_gsm
+    path = path or model_gsm.default_model_path
+    directory = tempfile.mkdtemp()
+    try:
+        copy = os.path.join(directory, os.path.basename(path))
+        shutil.copy(path, copy)
+        sbml = best_time(lambda: model_gsm.load_model(copy, snapshot=False), 3)
+        start = time.perf_counter()
+        model_gsm.load_model(copy)
+        first = time.perf_counter() - start
+        snapshot = best_time(lambda: model_gsm.load_model(copy), 3)
+    finally:
+        shutil.rmtree(directory)
+    print("model load: SBML {:.3f} s, first load writing the snapshot {:.3f} s, snapshot {:.3f} s ({:.1f}x)".format(
+        sbml, first, snapshot, sbml / snapshot))
+    return {'sbml': sbml, 'snapshot_write': first, 'snapshot': snapshot}
+
+
+def bench_scenarios(n_scenarios=20, path=None):
+
+    # one gene knocked out per scenario, with model copies (what the notebook did) against model_gsm.scenario
+    import model_gsm
+    model = model_gsm.load_model(path or model_gsm.default_model_path)
+    genes = [gene.id for gene in model.genes][:n_scenarios]
+
+    def with_copies():
+        for gene in genes:
+            knock_out = model.copy()
+            knock_out.genes.get_by_id(gene).knock_out()
+            knock_out.slim_optimize()
+
+    def with_scenarios():
+        for gene in genes:
+            with model_gsm.scenario(model, knockouts=[gene]):
+                model.slim_optimize()
+
+    copies = best_time(with_copies, 1)
+    scenarios = best_time(with_scenarios, 3)
+    print("{} knockout scenarios: model copies {:.3f} s, scenarios {:.3f} s ({:.0f}x)".format(
+        n_scenarios, copies, scenarios, copies / scenarios))
+    return {'copies': copies, 'scenarios': scenarios}
+
+
+def add_construct_like_notebook(model, name, aa_seq):
+
+    # what the notebook does for one protein: every species, reaction and coefficient added on its own
+    import cobra
+    RNA_seq, DNA_seq = stoichiometry_gsm.back_translate(aa_seq)
+    for seq_type in ('DNA', 'RNA', 'AA'):
+        model.add_metabolites([cobra.Metabolite('{}_{}'.format(name, seq_type), compartment='C_c')])
+    for seq, seq_type in ((DNA_seq, 'DNA'), (RNA_seq, 'RNA'), (aa_seq, 'AA')):
+        stoichiometry = stoichiometry_gsm.get_stoichiometry(seq, seq_type, name)
+        reaction = cobra.Reaction('{}_{}_reaction'.format(name, seq_type), lower_bound=0, upper_bound=1000)
+        for molecule in stoichiometry:
+            reaction.add_metabolites({getattr(model.metabolites, molecule): stoichiometry[molecule]})
+        model.add_reactions([reaction])
+    model.add_metabolites([cobra.Metabolite(name + '_c', compartment='C_c'), cobra.Metabolite(name + '_e', compartment='C_e')])
+    for reaction_id, stoichiometry, lower_bound in (
+            (name + '_Biosynthesis', {name + '_DNA': -2.8e-05, name + '_RNA': -0.0029, name + '_AA': -0.997, name + '_c': 1.0}, 0),
+            ('c_{}_e'.format(name), {name + '_c': -1.0, name + '_e': 1.0}, 0),
+            ('EX_' + name, {name + '_e': -1.0}, -1000)):
+        reaction = cobra.Reaction(reaction_id, lower_bound=lower_bound, upper_bound=1000)
+        reaction.add_metabolites({model.metabolites.get_by_id(molecule): value for molecule, value in stoichiometry.items()})
+        model.add_reactions([reaction])
+
+
+def bench_construct_insertion(n_constructs=1000, n_loop=100, path=None):
+
+    # model_gsm.add_constructs on n_constructs proteins against the notebook way on n_loop of them (it is too slow for all)
+    import model_gsm
+    path = path or model_gsm.default_model_path
+    proteins = random_proteome(n_constructs, max_length=400)
+    model = model_gsm.load_model(path)
+    start = time.perf_counter()
+    for i, protein in enumerate(proteins[:n_loop]):
+        add_construct_like_notebook(model, 'construct_{}'.format(i), protein)
+    loop = time.perf_counter() - start
+    model = model_gsm.load_model(path)
+    start = time.perf_counter()
+    model_gsm.add_constructs(model, [{'name': 'construct_{}'.format(i), 'aa': protein} for i, protein in enumerate(proteins)])
+    bulk = time.perf_counter() - start
+    print("construct insertion: notebook way {:.1f} ms per construct ({} constructs), add_constructs {:.1f} ms per construct "
+          "({} constructs in {:.2f} s)".format(1000 * loop / n_loop, n_loop, 1000 * bulk / n_constructs, n_constructs, bulk))
+    return {'loop': loop / n_loop, 'add_constructs': bulk / n_constructs}
+
+
+def bench_sparse_lp(n_points=15, path=None):
+
+    # the same methane/oxygen grid with the HiGHS path of lp_gsm.SparseLP and with the warm started GLPK sweep
+    import numpy as np
+    import lp_gsm
+    import model_gsm
+    import sweep_gsm
+    model = model_gsm.load_model(path or model_gsm.default_model_path)
+    exchange_x, exchange_y = 'r1145', 'r1160'
+    values_x = np.linspace(0, 10, n_points)
+    values_y = np.linspace(0, 20, n_points)
+    start = time.perf_counter()
+    lp = lp_gsm.SparseLP.from_model(model)
+    export = time.perf_counter() - start
+    grid = np.array([(x, y) for y in values_y for x in values_x])
+    start = time.perf_counter()
+    objective, _ = lp.solve_many([exchange_x, exchange_y], grid, grid)
+    highs = time.perf_counter() - start
+    start = time.perf_counter()
+    result = sweep_gsm.sweep(model, exchange_x, values_x, exchange_y, values_y, processes=1)
+    glpk = time.perf_counter() - start
+    difference = np.nanmax(np.abs(objective - result['objective'].ravel()))
+    print("{} LPs: export {:.3f} s, HiGHS through scipy {:.1f} ms per LP, warm started GLPK {:.1f} ms per LP "
+          "(largest difference {:.1e})".format(len(grid), export, 1000 * highs / len(grid), 1000 * glpk / len(grid), difference))
+    assert np.allclose(objective, result['objective'].ravel(), rtol=1e-6, atol=1e-9, equal_nan=True), \
+        "SparseLP and GLPK differ by {:.1e} on the grid".format(difference)
+    check_sparse_lp(workflow_model(path))
+    return {'export': export, 'highs': highs / len(grid), 'glpk': glpk / len(grid)}
+
+
+# the scenarios of the notebook on pheast_final: the pMMO and the AOX knockouts (both infeasible there), the methane
+# uptake of the max yield and knockouts that lower the optimum without making it infeasible
+workflow_scenarios = [{}, {'knockouts': ['pMMO_C']}, {'knockouts': ['PAS_chr4_0821', 'PAS_chr4_0152']},
+                      {'bounds': {'r_uptake_methane': (0, 1.8)}}, {'knockouts': ['PAS_chr2-1_0437']},
+                      {'knockouts': ['PAS_chr3_0951']}, {'knockouts': ['PAS_chr3_0082', 'PAS_chr2-1_0769']}]
+
+
+def check_sparse_lp(model, scenarios=None):
+
+    # lp_gsm.SparseLP of model (exported once, the scenarios only change its bounds) gives the optimum of
+    # model.slim_optimize in every scenario (model_gsm.scenario arguments, workflow_scenarios by default)
+    import numpy as np
+    import lp_gsm
+    import model_gsm
+    lp = lp_gsm.SparseLP.from_model(model)
+    for changes in workflow_scenarios if scenarios is None else scenarios:
+        with model_gsm.scenario(model, **changes):
+            expected = model.slim_optimize()
+            status = model.solver.status
+            bounds = {reaction.id: reaction.bounds for reaction in model.reactions
+                      if reaction.bounds != (lp.lower_bounds[lp.reaction_index[reaction.id]],
+                                             lp.upper_bounds[lp.reaction_index[reaction.id]])}
+        solution = lp.solve(*lp.bounds(bounds))
+        assert solution['status'] == status and np.isclose(solution['objective'], expected, rtol=1e-6, atol=1e-9,
+                                                           equal_nan=True), \
+            "SparseLP gives {} ({}) and slim_optimize {} ({}) with {}".format(
+                solution['objective'], solution['status'], expected, status, changes)
+        print("{}: {} {:.6g} with both".format(changes or 'no changes', status, expected))
+
+
+def workflow_model(path=None):
+
+    # the model of the notebook: pheast growing on methane with the pMMO and leghemoglobin constructs, optimizing the
+    # leghemoglobin biosynthesis (pheast_final)
+    import cobra
+    import model_gsm
+    import sequences
+    model = model_gsm.load_model(path or model_gsm.default_model_path)
+    model.remove_reactions([model.reactions.get_by_id(reaction)
+                            for reaction in ['r1337', 'r1338', 'r1100', 'r1101', 'r1102', 'r1103']])
+    model.remove_metabolites([model.metabolites.get_by_id(metabolite)
+                              for metabolite in ['m1360', 'm1361', 'm1362', 'm1363', 'm1364']])
+    model.reactions.r1145.bounds = 0, 0
+    model.reactions.r1158.bounds = 0, 0
+    e_methane = cobra.Metabolite('e_methane', formula='CH4', name='extracellular_methane', compartment='C_e')
+    uptake = cobra.Reaction('r_uptake_methane', name='Methane Uptake from Environment', lower_bound=0, upper_bound=10.0)
+    uptake.add_metabolites({e_methane: 1.0})
+    oxidation = cobra.Reaction('r_methane_oxidation', name='Methane Oxidation', lower_bound=0, upper_bound=221.84)
+    oxidation.add_metabolites({e_methane: -1.0, model.metabolites.m1232: -1.0, model.metabolites.m1215: 1.0,
+                               model.metabolites.m139: 1.0})
+    oxidation.gene_reaction_rule = '( pMMO_A and pMMO_B and pMMO_C )'
+    model.add_reactions([uptake, oxidation])
+    model_gsm.add_constructs(model, [
+        {'name': 'pMMO', 'aa': sequences.pMMO_aa_seq, 'dna': sequences.pMMO_dna_seq, 'rna': sequences.pMMO_rna_seq,
+         'lower_bound': 0.0069, 'upper_bound': 0.0069},
+        {'name': 'hemo', 'aa': sequences.hemo_aa_seq, 'dna': sequences.hemo_dna_seq, 'rna': sequences.hemo_rna_seq}])
+    model.objective = 'hemo_Biosynthesis'
+    return model
+
+
+def bench_solution_cache(repeats=20, path=None):
+
+    # a hit of lp_gsm.SolutionCache (the key and the copy of the cached solution) against solving the LP, on the model
+    # of the notebook. the first key also hashes the stoichiometry, later ones only read the bounds and the objective.
+    # a solve is timed from the standard basis (cold, like after a change of the model) and from the last optimal basis
+    # (warm, the same LP again)
+    import swiglpk
+    import lp_gsm
+    model = workflow_model(path)
+    cache = lp_gsm.SolutionCache()
+    start = time.perf_counter()
+    cache.key(model)
+    first_key = time.perf_counter() - start
+
+    def cold_solve():
+        swiglpk.glp_std_basis(model.solver.problem)
+        model.slim_optimize()
+
+    cold = best_time(cold_solve, repeats)
+    warm = best_time(lambda: model.slim_optimize(), repeats)
+    cache.optimize(model)
+    key = best_time(lambda: cache.key(model), repeats)
+    hit = best_time(lambda: cache.optimize(model), repeats)
+    print("solution cache: cold solve {:.1f} ms, warm solve {:.1f} ms, first key {:.1f} ms, key {:.2f} ms, hit {:.2f} ms "
+          "({:.0%} of a cold solve)".format(1000 * cold, 1000 * warm, 1000 * first_key, 1000 * key, 1000 * hit,
+                                           hit / cold))
+    return {'cold': cold, 'warm': warm, 'first_key': first_key, 'key': key, 'hit': hit}
+
+
+def step_sbml_load():
+
+    import model_gsm
+    directory = tempfile.mkdtemp()
+    try:
+        copy = os.path.join(directory, os.path.basename(model_gsm.default_model_path))
+        shutil.copy(model_gsm.default_model_path, copy)
+        start = time.perf_counter()
+        model_gsm.load_model(copy, snapshot=False)
+        return time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory)
+
+
+def step_stoichiometry():
+
+    import sequences
+    start = time.perf_counter()
+    for name in ('pMMO', 'hemo'):
+        for sequence_type in ('dna', 'rna', 'aa'):
+            stoichiometry_gsm.get_stoichiometry(getattr(sequences, '{}_{}_seq'.format(name, sequence_type)),
+                                                sequence_type, name)
+    return time.perf_counter() - start
+
+
+def step_construct_insertion():
+
+    # everything of workflow_model but the constructs is done before the timing starts
+    import model_gsm
+    import sequences
+    model = model_gsm.load_model()
+    specs = [{'name': name, 'aa': getattr(sequences, name + '_aa_seq'), 'dna': getattr(sequences, name + '_dna_seq'),
+              'rna': getattr(sequences, name + '_rna_seq')} for name in ('pMMO', 'hemo')]
+    start = time.perf_counter()
+    model_gsm.add_constructs(model, specs)
+    return time.perf_counter() - start
+
+
+def step_optimize():
+
+    model = workflow_model()
+    start = time.perf_counter()
+    model.optimize()
+    return time.perf_counter() - start
+
+
+def step_environment_sweep():
+
+    # optimal_conditions(pheast_final, precision=100, max_met=5, max_ox=20) of the notebook, in this process
+    import sweep_gsm
+    model = workflow_model()
+    start = time.perf_counter()
+    sweep_gsm.environment_sweep(model, 'r_uptake_methane', 5, 'r1160', 20, 100, processes=1)
+    return time.perf_counter() - start
+
+
+def step_single_deletion(n_genes=50):
+
+    from cobra.flux_analysis import single_gene_deletion
+    model = workflow_model()
+    genes = [gene.id for gene in model.genes][:n_genes]
+    start = time.perf_counter()
+    single_gene_deletion(model, genes, processes=1)
+    return time.perf_counter() - start
+
+
+workflow_steps = {
+    'sbml_load': step_sbml_load,
+    'stoichiometry': step_stoichiometry,
+    'construct_insertion': step_construct_insertion,
+    'optimize': step_optimize,
+    'environment_sweep': step_environment_sweep,
+    'single_deletion': step_single_deletion,
+}
+
+
+def count_solver_calls():
+
+    # counts the LPs solved in this process from now on, returns the list whose first element is the count
+    import optlang.interface
+    calls = [0]
+    optimize = optlang.interface.Model.optimize
+
+    def counted(self):
+        calls[0] += 1
+        return optimize(self)
+
+    optlang.interface.Model.optimize = counted
+    return calls
+
+
+def run_step(name, queue):
+
+    # runs in a fresh process so the peak RSS is the one of the step only
+    calls = count_solver_calls()
+    wall_time = workflow_steps[name]()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if platform.system() == 'Darwin' else 1024)
+    queue.put({'wall_time': wall_time, 'peak_rss_mb': peak_rss / 2 ** 20, 'solver_calls': calls[0]})
+
+
+def measure_step(name):
+
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=run_step, args=(name, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def git_commit():
+
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_json(path, default):
+
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path, data):
+
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'w') as handle:
+        json.dump(data, handle, indent=1)
+    os.replace(temporary, path)
+
+
+def compare_to_baseline(results, baseline, time_tolerance=0.2, memory_tolerance=0.2):
+
+    # names of the steps that are slower (or use more memory, or more LPs) than the baseline by more than the tolerances
+    regressions = {}
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        reasons = []
+        if result['wall_time'] > reference['wall_time'] * (1 + time_tolerance):
+            reasons.append('wall time {:.3f} s, baseline {:.3f} s'.format(result['wall_time'], reference['wall_time']))
+        if result['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + memory_tolerance):
+            reasons.append('peak RSS {:.0f} MB, baseline {:.0f} MB'.format(result['peak_rss_mb'], reference['peak_rss_mb']))
+        if result['solver_calls'] > reference['solver_calls']:
+            reasons.append('{} solver calls, baseline {}'.format(result['solver_calls'], reference['solver_calls']))
+        if reasons:
+            regressions[name] = reasons
+    return regressions
+
+
+def run_suite(steps=None, history_path=default_history_path, baseline_path=default_baseline_path, save_baseline=False,
+              time_tolerance=0.2, memory_tolerance=0.2):
+
+    # runs the workflow steps (all by default), appends the run to the history and flags the regressions against the
+    # baseline, returns the run as it was stored
+    results = {}
+    for name in steps or workflow_steps:
+        results[name] = measure_step(name)
+        print("{:20s} {:9.3f} s {:7.0f} MB {:7d} LPs".format(name, results[name]['wall_time'],
+                                                             results[name]['peak_rss_mb'], results[name]['solver_calls']))
+    baseline = read_json(baseline_path, {})
+    regressions = compare_to_baseline(results, baseline, time_tolerance, memory_tolerance)
+    for name, reasons in regressions.items():
+        print("REGRESSION: {}: {}".format(name, '; '.join(reasons)))
+    run = {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+           'python': platform.python_version(), 'machine': platform.node(), 'results': results,
+           'regressions': regressions}
+    history = read_json(history_path, [])
+    history.append(run)
+    write_json(history_path, history)
+    if save_baseline:
+        baseline.update(results)
+        write_json(baseline_path, baseline)
+    return run
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="benchmarks of the GSM workflow")
+    parser.add_argument('--suite', action='store_true', help="run the workflow suite instead of the helper benchmarks")
+    parser.add_argument('--steps', nargs='*', choices=list(workflow_steps), help="workflow steps to run (all by default)")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    parser.add_argument('--history', default=default_history_path)
+    parser.add_argument('--baseline', default=default_baseline_path)
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown against the baseline (0.2 = 20%%)")
+    arguments = parser.parse_args()
+    if arguments.suite:
+        regressions = run_suite(arguments.steps, arguments.history, arguments.baseline, arguments.save_baseline,
+                                arguments.tolerance)['regressions']
+        raise SystemExit(1 if regressions else 0)
+    bench_stoichiometry_batch()
+    bench_back_translation()
+    bench_model_load()
+    bench_scenarios()
+    bench_construct_insertion()
+    bench_sparse_lp()
+    bench_solution_cache()
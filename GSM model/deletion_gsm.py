@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+
+# single and double gene deletions of the model, in parallel and skipping the ones that cannot change the optimum
+# a reference optimum is solved first with pFBA, which gives an optimal flux distribution with as few active reactions
+# as possible. a knockout that only disables reactions without flux in it leaves that flux distribution feasible, so
+# the optimum stays the same and no LP is needed. the other knockouts are solved by a process pool and the results are
+# written to a CSV file (ids, objective, status, solved) as they come, so a long run can be followed and is not lost
+# the GPRs are compiled to bitsets (CompiledGPR) to find the disabled reactions of a whole batch of knockouts at once,
+# knockouts that disable the same reactions are the same LP and it is only solved once
+# knockout_search looks for sets of knockouts that raise the production when the cell maximizes its growth (OptKnock),
+# with a beam search over the number of knockouts: the best designs of every size are extended by one more gene.
+# designs are evaluated by a process pool and cached by the reactions they disable, and the frontier and the cache go
+# to a checkpoint file so a long search can be stopped and started again
+
+import ast
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from cobra.exceptions import Infeasible
+from cobra.flux_analysis import pfba
+
+import sweep_gsm
+
+# model of the worker process, set once by worker_init (and the settings of knockout_search, by worker_design_init)
+worker_model = None
+worker_settings = None
+
+
+def worker_init(model):
+
+    global worker_model
+    worker_model = model
+
+
+def gpr_clauses(node):
+
+    # GPR as a list of sets of genes (or of ands), the reaction works if all the genes of one of the sets work
+    if isinstance(node, ast.Name):
+        return [frozenset([node.id])]
+    if isinstance(node, ast.BoolOp):
+        parts = [gpr_clauses(value) for value in node.values]
+        if isinstance(node.op, ast.Or):
+            return list({clause for part in parts for clause in part})
+        clauses = [frozenset()]
+        for part in parts:
+            clauses = list({clause | other for clause in clauses for other in part})
+        return clauses
+    raise ValueError("unexpected GPR element {}".format(ast.dump(node)))
+
+
+class CompiledGPR:
+
+    # all the GPRs of a model as bitsets: for every gene, the bits of the clauses (ands of genes) it is in.
+    # a knockout breaks the clauses of its genes (or of their bitsets) and a reaction is disabled when all its clauses
+    # are broken, which is checked for a whole batch of knockouts with a few numpy operations
+
+    def __init__(self, model):
+        self.genes = [gene.id for gene in model.genes]
+        self.gene_index = {gene: index for index, gene in enumerate(self.genes)}
+        self.reactions = []
+        clause_genes = []
+        # clauses of the same reaction are next to each other, starts[i] is the first clause of self.reactions[i]
+        starts = []
+        for reaction in model.reactions:
+            if reaction.gpr.body is None:
+                continue
+            starts.append(len(clause_genes))
+            self.reactions.append(reaction.id)
+            clause_genes.extend(gpr_clauses(reaction.gpr.body))
+        self.starts = np.array(starts, dtype=np.intp)
+        self.n_clauses = len(clause_genes)
+        bits = np.zeros((len(self.genes) + 1, self.n_clauses), dtype=bool)
+        for clause, genes in enumerate(clause_genes):
+            bits[[self.gene_index[gene] for gene in genes], clause] = True
+        # the last row is empty, it pads knockouts with fewer genes
+        self.gene_clauses = np.packbits(bits, axis=1)
+
+    def disabled(self, knockouts):
+        # boolean array (knockout x reaction of self.reactions), True where the reaction does not work
+        knockouts = [list(knockout) for knockout in knockouts]
+        width = max([len(knockout) for knockout in knockouts] + [1])
+        padding = len(self.genes)
+        indices = np.full((len(knockouts), width), padding, dtype=np.intp)
+        for row, knockout in enumerate(knockouts):
+            indices[row, :len(knockout)] = [self.gene_index[gene] for gene in knockout]
+        broken = np.bitwise_or.reduce(self.gene_clauses[indices], axis=1)
+        working = np.unpackbits(~broken, axis=1, count=self.n_clauses).astype(bool)
+        return ~np.logical_or.reduceat(working, self.starts, axis=1)
+
+    def disabled_reactions(self, knockouts):
+        # list of the disabled reaction ids of every knockout
+        return [[self.reactions[index] for index in np.flatnonzero(row)] for row in self.disabled(knockouts)]
+
+    def group(self, knockouts, chunk_size=10000):
+        # knockouts that disable the same reactions, as a list of (disabled reaction ids, [knockouts])
+        groups = {}
+        for start in range(0, len(knockouts), chunk_size):
+            chunk = knockouts[start:start + chunk_size]
+            rows = np.packbits(self.disabled(chunk), axis=1)
+            for knockout, row in zip(chunk, rows):
+                groups.setdefault(row.tobytes(), []).append(knockout)
+        return [([self.reactions[index] for index in np.flatnonzero(np.unpackbits(np.frombuffer(key, dtype=np.uint8),
+                                                                                   count=len(self.reactions)))],
+                 members) for key, members in groups.items()]
+
+
+def active_reactions(model, tolerance=1e-9):
+
+    # optimum of the model, its solver status and the reactions that carry flux in the pFBA solution. an infeasible
+    # model has no active reactions, every knockout of it is infeasible too (it only takes flux away). with any other
+    # status the knockouts cannot be pruned
+    objective = model.slim_optimize(error_value=np.nan)
+    status = model.solver.status
+    if status == 'infeasible':
+        print("WARNING: the reference model is infeasible, so are all its knockouts")
+        return objective, status, set()
+    if status != 'optimal':
+        raise ValueError("the reference model is {}, the knockouts cannot be compared to it".format(status))
+    try:
+        fluxes = pfba(model).fluxes
+    except Infeasible:
+        # pFBA fixes the objective to its optimum and can fail on the solver tolerance, the FBA fluxes are an optimal
+        # solution too, only with more active reactions
+        print("WARNING: pFBA failed, the FBA solution is used as reference")
+        fluxes = model.optimize().fluxes
+    return objective, status, set(fluxes.index[fluxes.abs() > tolerance])
+
+
+def solve_knockout(model, reactions):
+
+    # optimum and solver status with the reactions blocked, only the solver variables are changed and put back after
+    blocked = [model.reactions.get_by_id(reaction) for reaction in reactions]
+    for reaction in blocked:
+        sweep_gsm.set_flux_bounds(reaction, 0, 0)
+    try:
+        status = model.solver.optimize()
+        objective = model.solver.objective.value if status == 'optimal' else np.nan
+    finally:
+        for reaction in blocked:
+            sweep_gsm.set_flux_bounds(reaction, *reaction.bounds)
+    return objective, status
+
+
+def worker_knockouts(tasks):
+
+    return [(members,) + solve_knockout(worker_model, reactions) for members, reactions in tasks]
+
+
+def gene_deletions(model, knockouts, output_path, processes=None, chunk_size=20, tolerance=1e-9, compiled=None,
+                   reference=None):
+
+    # knocks out every set of genes of knockouts (lists of gene ids, repeated sets are done once) and writes a CSV line
+    # per set to output_path: the gene ids (separated by ;), the optimum (nan if none), the solver status and whether an
+    # LP was solved (False for the knockouts that cannot change the reference optimum, they get its optimum and status,
+    # all of them if the reference is infeasible). knockouts that disable the same reactions share one LP. compiled is
+    # the CompiledGPR of the model, made here if not given, and reference the active_reactions of the model if they are
+    # already known (pFBA is not run again then)
+    # returns the results read back with read_deletions
+    processes = processes or os.cpu_count()
+    compiled = compiled or CompiledGPR(model)
+    reference, reference_status, active = reference or active_reactions(model, tolerance)
+    # the output file can go to a directory that does not exist yet (results/ is not tracked)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    knockouts = list(dict.fromkeys(tuple(sorted(set(knockout))) for knockout in knockouts))
+    tasks = []
+    with open(output_path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['ids', 'objective', 'status', 'solved'])
+        for reactions, members in compiled.group(knockouts):
+            if active.isdisjoint(reactions):
+                writer.writerows([';'.join(knockout), reference, reference_status, False] for knockout in members)
+            else:
+                tasks.append((members, reactions))
+        handle.flush()
+        print("{} knockouts, {} cannot change the optimum, {} LPs to solve for the other {}".format(
+            len(knockouts), len(knockouts) - sum(len(members) for members, _ in tasks), len(tasks),
+            sum(len(members) for members, _ in tasks)))
+
+        chunks = [tasks[start:start + chunk_size] for start in range(0, len(tasks), chunk_size)]
+        if processes == 1:
+            results = ([(members,) + solve_knockout(model, reactions) for members, reactions in chunk] for chunk in chunks)
+        else:
+            pool = multiprocessing.Pool(processes, initializer=worker_init, initargs=(model,))
+            results = pool.imap_unordered(worker_knockouts, chunks)
+        try:
+            for chunk in results:
+                writer.writerows([';'.join(knockout), objective, status, True]
+                                 for members, objective, status in chunk for knockout in members)
+                handle.flush()
+        finally:
+            if processes != 1:
+                pool.terminate()
+    return read_deletions(output_path)
+
+
+def single_deletions(model, output_path, genes=None, processes=None):
+
+    # every gene of the model (or of genes) knocked out on its own
+    genes = [gene.id for gene in model.genes] if genes is None else list(genes)
+    return gene_deletions(model, [[gene] for gene in genes], output_path, processes)
+
+
+def double_deletions(model, output_path, genes=None, processes=None, tolerance=1e-9):
+
+    # every pair of genes knocked out together, each pair once. a pair can only change the optimum if one of its genes
+    # is in the GPR of a reaction with flux, the other pairs are written as the reference without looking at their GPRs
+    genes = [gene.id for gene in model.genes] if genes is None else list(genes)
+    reference, reference_status, active = active_reactions(model, tolerance)
+    relevant = {gene.id for reaction in active for gene in model.reactions.get_by_id(reaction).genes}
+    pairs = [pair for pair in itertools.combinations(genes, 2) if relevant.intersection(pair)]
+    gene_deletions(model, pairs, output_path, processes, tolerance=tolerance,
+                   reference=(reference, reference_status, active))
+    # the pairs skipped without looking at them go at the end of the same file
+    with open(output_path, 'a', newline='') as handle:
+        csv.writer(handle).writerows([';'.join(pair), reference, reference_status, False]
+                                     for pair in itertools.combinations(genes, 2) if not relevant.intersection(pair))
+    return read_deletions(output_path)
+
+
+def read_deletions(path):
+
+    # results of gene_deletions as a pandas DataFrame, ids as tuples of gene ids
+    import pandas as pd
+    results = pd.read_csv(path, keep_default_na=False, na_values=['nan'])
+    results['ids'] = results['ids'].map(lambda ids: tuple(ids.split(';')) if ids else ())
+    return results
+
+
+def design_problem(model, growth, product):
+
+    # prepares the model for evaluate_design: an empty objective (the LPs only change its coefficients) and a
+    # constraint that keeps the growth at least at the value it is set to. use it inside `with model:`
+    model.objective = model.problem.Objective(0, direction='max')
+    growth_reaction = model.reactions.get_by_id(growth)
+    model.add_cons_vars([model.problem.Constraint(growth_reaction.flux_expression, lb=None, name='design_growth')])
+    return growth_reaction, model.reactions.get_by_id(product)
+
+
+def evaluate_design(model, reactions, growth_reaction, product_reaction, fraction=1.0, tolerance=1e-9):
+
+    # the reactions blocked (a knockout): maximum growth and the lowest and highest production when the growth is kept at
+    # fraction of its maximum, and the solver status (of the first LP that is not optimal). the model is prepared by
+    # design_problem, which gives the growth and product reactions, and is left as it was
+    floor = model.constraints.design_growth
+    blocked = [model.reactions.get_by_id(reaction) for reaction in reactions]
+    result = [np.nan, np.nan, np.nan, 'optimal']
+    for reaction in blocked:
+        sweep_gsm.set_flux_bounds(reaction, 0, 0)
+    try:
+        for row, (reaction, direction) in enumerate([(growth_reaction, 'max'), (product_reaction, 'min'),
+                                                     (product_reaction, 'max')]):
+            coefficients = {reaction.forward_variable: 1, reaction.reverse_variable: -1}
+            model.solver.objective.set_linear_coefficients(coefficients)
+            model.solver.objective.direction = direction
+            status = model.solver.optimize()
+            model.solver.objective.set_linear_coefficients({variable: 0 for variable in coefficients})
+            if status != 'optimal':
+                result[3] = status
+                break
+            result[row] = model.solver.objective.value
+            if row == 0:
+                floor.lb = fraction * result[0] - tolerance
+    finally:
+        floor.lb = None
+        for reaction in blocked:
+            sweep_gsm.set_flux_bounds(reaction, *reaction.bounds)
+    return result
+
+
+def worker_design_init(model, growth, product, fraction):
+
+    # the model is already prepared by design_problem
+    global worker_model, worker_settings
+    worker_model = model
+    worker_settings = (model.reactions.get_by_id(growth), model.reactions.get_by_id(product), fraction)
+
+
+def worker_designs(tasks):
+
+    return [(key, evaluate_design(worker_model, reactions, *worker_settings)) for key, reactions in tasks]
+
+
+def dominates(first, second, column, tolerance):
+
+    # whether the design evaluation first is at least as good as second in growth and in the score (column of the
+    # evaluation), and better in one of them
+    pairs = [(first[0], second[0]), (first[column], second[column])]
+    return all(a >= b - tolerance for a, b in pairs) and any(a > b + tolerance for a, b in pairs)
+
+
+def read_checkpoint(path, settings):
+
+    # state of a search saved by write_checkpoint, None if there is no file. a checkpoint of a search with other
+    # settings is not used
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        state = json.load(handle)
+    if state['settings'] != settings:
+        raise ValueError("the checkpoint {} is of a search with other settings: {}".format(path, state['settings']))
+    return state
+
+
+def write_checkpoint(path, state):
+
+    # written to a temporary file first, a search stopped while writing keeps the checkpoint before
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'w') as handle:
+        json.dump(state, handle)
+    os.replace(temporary, path)
+
+
+def knockout_search(model, output_path=None, product='hemo_Biosynthesis', growth='r1339', min_growth=0.01, genes=None,
+                    max_knockouts=3, beam_width=20, fraction=1.0, robust=False, processes=None, chunk_size=20,
+                    checkpoint=None, checkpoint_interval=300, compiled=None, tolerance=1e-7):
+
+    # beam search of sets of up to max_knockouts genes (of genes, all the genes of the model by default) that raise the
+    # production of product when the cell maximizes its growth. every design is scored by the highest production with
+    # the growth at fraction of its maximum (OptKnock), or by the lowest one with robust=True (the production the
+    # design guarantees). designs that grow less than min_growth are dropped with all the designs that contain them
+    # (a knockout can only lower the growth), and so are the designs that are dominated by the designs they come from
+    # (worse in production or growth and better in neither, by more than tolerance). the beam_width best designs of
+    # every size are extended by one more gene
+    # designs that disable the same reactions are evaluated once (the cache is keyed by the disabled reactions).
+    # checkpoint is a JSON file with the frontier and the cache, written every checkpoint_interval seconds and after
+    # every size: a search started again with the same checkpoint and settings goes on where it was
+    # returns a pandas DataFrame of all the designs that grow enough, best first (ids, knockouts, growth, minimum and
+    # maximum production and status), also written to output_path as CSV if given
+    import pandas as pd
+    processes = processes or os.cpu_count()
+    compiled = compiled or CompiledGPR(model)
+    genes = [gene.id for gene in model.genes] if genes is None else list(genes)
+    # max_knockouts is not a setting of the checkpoint, a finished search can go on with more knockouts
+    settings = {'product': product, 'growth': growth, 'min_growth': min_growth, 'genes': sorted(genes),
+                'beam_width': beam_width, 'fraction': fraction, 'robust': robust}
+    state = read_checkpoint(checkpoint, settings) or {'settings': settings, 'size': 0, 'frontier': [[]], 'cache': {},
+                                                      'designs': {}}
+    cache, designs = state['cache'], state['designs']
+    score_column = 1 if robust else 2
+    last_checkpoint = time.perf_counter()
+
+    def key_of(row):
+        return ';'.join(compiled.reactions[index] for index in np.flatnonzero(row))
+
+    def save(force=False):
+        nonlocal last_checkpoint
+        if checkpoint is not None and (force or time.perf_counter() - last_checkpoint > checkpoint_interval):
+            write_checkpoint(checkpoint, state)
+            last_checkpoint = time.perf_counter()
+
+    def evaluate(keys, pool):
+        # evaluates the keys that are not in the cache yet
+        tasks = [(key, key.split(';') if key else []) for key in dict.fromkeys(keys) if key not in cache]
+        chunks = [tasks[start:start + chunk_size] for start in range(0, len(tasks), chunk_size)]
+        if pool is None:
+            results = ([(key, evaluate_design(model, reactions, growth_reaction, product_reaction, fraction))
+                        for key, reactions in chunk] for chunk in chunks)
+        else:
+            results = pool.imap_unordered(worker_designs, chunks)
+        for chunk in results:
+            cache.update(chunk)
+            save()
+        return len(tasks)
+
+    def viable(key):
+        growth_flux, _, _, status = cache[key]
+        return status == 'optimal' and growth_flux >= min_growth
+
+    with model:
+        growth_reaction, product_reaction = design_problem(model, growth, product)
+        pool = None
+        if processes != 1:
+            pool = multiprocessing.Pool(processes, initializer=worker_design_init,
+                                        initargs=(model, growth, product, fraction))
+        try:
+            evaluate([''], None)
+            # genes that disable no reaction cannot change anything, genes that kill the cell on their own are dropped at
+            # the first size and never tried again
+            singles = [gene for gene, row in zip(genes, compiled.disabled([[gene] for gene in genes])) if row.any()]
+            if state['size'] > 0:
+                singles = [gene for gene in singles if viable(designs.get(gene, ''))]
+            while state['size'] < max_knockouts and state['frontier']:
+                start = time.perf_counter()
+                parents = [tuple(parent) for parent in state['frontier']]
+                children = list(dict.fromkeys(tuple(sorted(parent + (gene,))) for parent in parents
+                                              for gene in singles if gene not in parent))
+                keys = [key_of(row) for row in compiled.disabled(children)] if children else []
+                parent_keys = dict(zip(parents, [key_of(row) for row in compiled.disabled(parents)]))
+                solved = evaluate(keys, pool)
+                candidates = {}
+                for child, key in zip(children, keys):
+                    designs[';'.join(child)] = key
+                    if not viable(key):
+                        continue
+                    # the child is dominated if the gene it adds makes the production or the growth worse and neither
+                    # of them better than in all its parents (the designs of one size less it comes from). knockouts
+                    # that change nothing on their own are kept, they can still matter with the next ones
+                    dominated = all(dominates(cache[parent_keys[parent]], cache[key], score_column, tolerance)
+                                    for parent in itertools.combinations(child, len(child) - 1)
+                                    if parent in parent_keys)
+                    # designs that disable the same reactions are the same design, only one of them goes on
+                    if not dominated and key not in candidates:
+                        candidates[key] = child
+                best = sorted(candidates.items(), key=lambda item: (-cache[item[0]][score_column], -cache[item[0]][0]))
+                state['size'] += 1
+                state['frontier'] = [list(child) for _, child in best[:beam_width]]
+                if state['size'] == 1:
+                    singles = [gene for gene in singles if viable(designs[gene])]
+                save(force=True)
+                print("{} knockouts: {} designs, {} evaluated, {} kept, best {:.6g} ({:.0f} s)".format(
+                    state['size'], len(children), solved, len(state['frontier']),
+                    cache[best[0][0]][score_column] if best else np.nan, time.perf_counter() - start))
+        finally:
+            if pool is not None:
+                pool.terminate()
+    rows = [(tuple(ids.split(';')),) + tuple(cache[key]) for ids, key in designs.items() if viable(key)]
+    results = pd.DataFrame(rows, columns=['ids', 'growth', 'minimum', 'maximum', 'status'])
+    results.insert(1, 'knockouts', results['ids'].map(len))
+    results = results.sort_values(['minimum' if robust else 'maximum', 'growth'], ascending=False, ignore_index=True)
+    if output_path is not None:
+        results.assign(ids=results['ids'].map(';'.join)).to_csv(output_path, index=False)
+    return results
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+
+# helpers at the level of the LP of the model
+# SolutionCache keeps the solutions of LPs that were already solved, keyed by everything the optimum depends on: the
+# stoichiometry, the bounds in the solver, the objective and the solver settings. the same model in the same state
+# gives the cached fluxes, reduced costs and shadow prices without calling the solver. the stoichiometry is hashed once
+# per model and only again when its fingerprint (order of the reactions, numbers of metabolites and matrix entries)
+# changes, so a lookup only reads the bounds and the objective
+# SparseLP is the LP of the model as plain arrays (CSR stoichiometric matrix, bounds, objective, ids), saved to an .npz
+# that can be memory mapped, and solved with HiGHS through scipy without cobra and optlang in between
+
+import hashlib
+import os
+import pickle
+import time
+import weakref
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse
+from cobra.core import get_solution
+from cobra.util.solver import linear_reaction_coefficients
+from scipy.optimize import linprog
+
+# scipy.optimize.linprog status codes as the optlang status names
+linprog_status = {0: 'optimal', 1: 'iteration_limit', 2: 'infeasible', 3: 'unbounded', 4: 'numeric'}
+
+
+def structure_hash(model):
+
+    # hash of the reactions and their stoichiometry as cobra has them (changes made only in the solver are not seen)
+    digest = hashlib.sha256()
+    ids = []
+    coefficients = []
+    for reaction in model.reactions:
+        ids.append(reaction.id)
+        for metabolite, coefficient in reaction.metabolites.items():
+            ids.append(metabolite.id)
+            coefficients.append(coefficient)
+    digest.update('\0'.join(ids).encode())
+    digest.update(np.array(coefficients, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def structure_fingerprint(model):
+
+    # cheap to get and changes when reactions or metabolites are added, removed or put back in another order (a context
+    # puts removed reactions back at the end). a coefficient changed in place (like reaction.add_metabolites on a
+    # metabolite it already has) keeps it, SolutionCache.invalidate is needed then
+    entries = None
+    if model.solver.interface.__name__ == 'optlang.glpk_interface':
+        import swiglpk
+        model.solver.update()
+        entries = swiglpk.glp_get_num_nz(model.solver.problem)
+    return hash(tuple([reaction.id for reaction in model.reactions])), len(model.metabolites), len(model.constraints), entries
+
+
+def variable_bounds(model):
+
+    # (lower, upper) of every variable of the solver in its order, with GLPK read from the problem without optlang
+    if model.solver.interface.__name__ == 'optlang.glpk_interface':
+        import swiglpk
+        model.solver.update()
+        problem = model.solver.problem
+        bounds = [(swiglpk.glp_get_col_lb(problem, column), swiglpk.glp_get_col_ub(problem, column))
+                  for column in range(1, swiglpk.glp_get_num_cols(problem) + 1)]
+        return np.array(bounds, dtype=float)
+    bounds = np.array([(variable.lb, variable.ub) for variable in model.variables], dtype=float)
+    return np.nan_to_num(bounds, nan=np.inf)
+
+
+def solver_options(model):
+
+    # the solver settings that can change the solution
+    configuration = model.solver.configuration
+    options = [model.solver.interface.__name__]
+    for tolerance in ('feasibility', 'optimality', 'integrality'):
+        try:
+            options.append((tolerance, getattr(configuration.tolerances, tolerance)))
+        except AttributeError:
+            pass
+    options.append(('presolve', configuration.presolve))
+    return repr(options)
+
+
+class SolutionCache:
+
+    # LRU of cobra solutions in front of an optional directory with one pickle per solution (only load directories you
+    # made yourself). the key is the hash of structure_hash, the bounds of the solver variables (so bounds changed only
+    # in the solver, like sweep_gsm does, are seen), the objective coefficients and direction, the constraints that are
+    # not metabolites (like the fixed objective of pFBA or lexicographic_optimize) and the solver options
+    # structure_hash is kept for every model with its structure_fingerprint and only made again when that changes. after
+    # changing a coefficient of a reaction in place call invalidate(model), nothing cheap sees that
+    # hits, disk_hits and misses count the lookups, solver_time is the time spent solving the misses and saved_time the
+    # solving time the hits did not need (the time their first solve took)
+
+    def __init__(self, directory=None, maxsize=256):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.solver_time = 0.0
+        self.saved_time = 0.0
+        # model: (structure_fingerprint, structure_hash, ids of the constraints that are not metabolites)
+        self.structures = weakref.WeakKeyDictionary()
+
+    def structure(self, model):
+        fingerprint = structure_fingerprint(model)
+        cached = self.structures.get(model)
+        if cached is None or cached[0] != fingerprint:
+            metabolites = set(model.metabolites.list_attr('id'))
+            extra = [constraint.name for constraint in model.constraints if constraint.name not in metabolites]
+            cached = (fingerprint, structure_hash(model), extra)
+            self.structures[model] = cached
+        return cached[1], cached[2]
+
+    def invalidate(self, model):
+        # the structure of model is hashed again at its next lookup
+        self.structures.pop(model, None)
+
+    def key(self, model):
+        structure, extra = self.structure(model)
+        digest = hashlib.sha256(structure.encode())
+        digest.update(variable_bounds(model).tobytes())
+        objective = model.solver.objective
+        coefficients = sorted((str(variable), float(coefficient))
+                              for variable, coefficient in objective.expression.as_coefficients_dict().items())
+        digest.update(repr((objective.direction, coefficients)).encode())
+        # the constraints that are not metabolites can change their bounds (a new optimum of lexicographic_optimize)
+        # without changing the structure
+        constraints = [model.constraints[name] for name in extra]
+        digest.update(repr([(constraint.name, str(constraint.expression), constraint.lb, constraint.ub)
+                            for constraint in constraints]).encode())
+        digest.update(solver_options(model).encode())
+        return digest.hexdigest()
+
+    def optimize(self, model):
+        # same as model.optimize() but from the cache when the model is in a state that was solved before
+        # the returned solution is shared with the cache, do not modify it
+        key = self.key(model)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            solution, solve_time = self.memory[key]
+            self.saved_time += solve_time
+            return solution
+        entry = self.load(key)
+        if entry is not None:
+            self.disk_hits += 1
+            self.saved_time += entry[1]
+        else:
+            self.misses += 1
+            start = time.perf_counter()
+            model.slim_optimize()
+            entry = (get_solution(model, raise_error=False), time.perf_counter() - start)
+            self.solver_time += entry[1]
+            self.save(key, entry)
+        self.memory[key] = entry
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+        return entry[0]
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pickle')
+
+    def load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), 'rb') as handle:
+                return pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def save(self, key, entry):
+        if self.directory is None:
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first so parallel runs never read half written entries
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary, 'wb') as handle:
+            pickle.dump(entry, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+    def report(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        print("{} lookups: {} hits, {} from disk, {} solved in {:.2f} s, {:.2f} s of solving saved".format(
+            lookups, self.hits, self.disk_hits, self.misses, self.solver_time, self.saved_time))
+
+    def clear(self):
+        self.memory.clear()
+        self.structures.clear()
+        if self.directory is not None and os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    os.remove(os.path.join(root, name))
+
+
+default_cache = SolutionCache()
+
+
+def cached_optimize(model):
+
+    # drop-in replacement of model.optimize() that goes through default_cache
+    return default_cache.optimize(model)
+
+
+def memmap_npz(path):
+
+    # the arrays of an uncompressed .npz as read-only memory maps (np.load only memory maps .npy files)
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as handle:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError("{} is compressed, it cannot be memory mapped".format(path))
+            # the data starts after the local file header (30 bytes, the name and the extra field)
+            handle.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(handle.read(4), dtype='<u2')
+            handle.seek(info.header_offset + 30 + int(name_length) + int(extra_length))
+            version = np.lib.format.read_magic(handle)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(handle)
+            if dtype.hasobject:
+                raise ValueError("{} in {} has python objects, it cannot be memory mapped".format(info.filename, path))
+            arrays[info.filename[:-4]] = np.memmap(path, dtype=dtype, mode='r', offset=handle.tell(), shape=shape,
+                                                   order='F' if fortran_order else 'C')
+    return arrays
+
+
+class SparseLP:
+
+    # the flux balance LP of a model: maximize (or minimize) objective . v with S v = 0 and lower_bounds <= v <=
+    # upper_bounds, with one net flux per reaction (cobra splits it in forward and reverse variables, the optimum is
+    # the same). constraints of the solver that are not metabolites (pFBA, lexicographic_optimize...) are not included
+
+    def __init__(self, S, lower_bounds, upper_bounds, objective, maximize, reaction_ids, metabolite_ids):
+        self.S = S
+        self.lower_bounds = lower_bounds
+        self.upper_bounds = upper_bounds
+        self.objective = objective
+        self.maximize = maximize
+        self.reaction_ids = reaction_ids
+        self.metabolite_ids = metabolite_ids
+        self.reaction_index = {reaction: index for index, reaction in enumerate(reaction_ids)}
+        self.metabolite_index = {metabolite: index for index, metabolite in enumerate(metabolite_ids)}
+
+    @classmethod
+    def from_model(cls, model):
+        metabolite_index = {metabolite.id: index for index, metabolite in enumerate(model.metabolites)}
+        rows, columns, values = [], [], []
+        for column, reaction in enumerate(model.reactions):
+            for metabolite, coefficient in reaction.metabolites.items():
+                rows.append(metabolite_index[metabolite.id])
+                columns.append(column)
+                values.append(coefficient)
+        S = scipy.sparse.csr_matrix((values, (rows, columns)), shape=(len(model.metabolites), len(model.reactions)))
+        extra = [constraint.name for constraint in model.constraints if constraint.name not in metabolite_index]
+        if extra:
+            print("WARNING: the constraints {} are not metabolites and are left out of the LP".format(', '.join(extra)))
+        coefficients = linear_reaction_coefficients(model)
+        return cls(S, np.array([reaction.lower_bound for reaction in model.reactions], dtype=float),
+                   np.array([reaction.upper_bound for reaction in model.reactions], dtype=float),
+                   np.array([coefficients.get(reaction, 0) for reaction in model.reactions], dtype=float),
+                   model.objective.direction == 'max', np.array(model.reactions.list_attr('id'), dtype=str),
+                   np.array(model.metabolites.list_attr('id'), dtype=str))
+
+    def save(self, path):
+        # uncompressed so load can memory map it
+        np.savez(path, data=self.S.data, indices=self.S.indices, indptr=self.S.indptr, shape=np.array(self.S.shape),
+                 lower_bounds=self.lower_bounds, upper_bounds=self.upper_bounds, objective=self.objective,
+                 maximize=np.array(self.maximize), reaction_ids=self.reaction_ids, metabolite_ids=self.metabolite_ids)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        # with mmap the arrays are read from the file when they are used, so many processes share the same pages
+        arrays = memmap_npz(path) if mmap else dict(np.load(path))
+        S = scipy.sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(arrays['shape']))
+        return cls(S, arrays['lower_bounds'], arrays['upper_bounds'], arrays['objective'], bool(arrays['maximize']),
+                   arrays['reaction_ids'], arrays['metabolite_ids'])
+
+    def indices(self, reactions):
+        return np.array([self.reaction_index[reaction] for reaction in reactions], dtype=np.intp)
+
+    def bounds(self, changes=None):
+        # copies of the bound vectors with changes {reaction id: (lower, upper)} applied
+        lower_bounds = np.array(self.lower_bounds, dtype=float)
+        upper_bounds = np.array(self.upper_bounds, dtype=float)
+        if changes:
+            indices = self.indices(changes)
+            lower_bounds[indices], upper_bounds[indices] = np.array(list(changes.values()), dtype=float).T
+        return lower_bounds, upper_bounds
+
+    def solve(self, lower_bounds=None, upper_bounds=None, objective=None):
+        # optimum (nan if there is none), status, fluxes, shadow prices (of the metabolites) and reduced costs (of the
+        # reactions) with the given bound and objective vectors (the ones of the LP by default). the duals are the
+        # change of the optimum per unit of the metabolite balance or of the active flux bound, so that
+        # objective = S.T @ shadow_prices + reduced_costs (cobra gives the duals of the split forward/reverse variables)
+        lower_bounds = self.lower_bounds if lower_bounds is None else lower_bounds
+        upper_bounds = self.upper_bounds if upper_bounds is None else upper_bounds
+        objective = self.objective if objective is None else objective
+        sign = -1 if self.maximize else 1
+        result = linprog(sign * np.asarray(objective), A_eq=self.S, b_eq=np.zeros(self.S.shape[0]),
+                         bounds=np.column_stack([lower_bounds, upper_bounds]), method='highs')
+        status = linprog_status.get(result.status, 'failed')
+        if status != 'optimal':
+            return {'objective': np.nan, 'status': status, 'fluxes': None, 'shadow_prices': None, 'reduced_costs': None}
+        return {'objective': sign * result.fun, 'status': status, 'fluxes': result.x,
+                'shadow_prices': sign * result.eqlin.marginals,
+                'reduced_costs': sign * (result.lower.marginals + result.upper.marginals)}
+
+    def solve_many(self, reactions, lower_bounds, upper_bounds):
+        # optimum and status for every row of lower_bounds and upper_bounds (conditions x reactions), the bounds of the
+        # other reactions are the ones of the LP. only the columns of reactions are written between two solves
+        indices = self.indices(reactions)
+        lower_bounds = np.atleast_2d(np.asarray(lower_bounds, dtype=float))
+        upper_bounds = np.atleast_2d(np.asarray(upper_bounds, dtype=float))
+        current_lower, current_upper = self.bounds()
+        objective = np.full(len(lower_bounds), np.nan)
+        status = []
+        for row, (lower, upper) in enumerate(zip(lower_bounds, upper_bounds)):
+            current_lower[indices] = lower
+            current_upper[indices] = upper
+            result = self.solve(current_lower, current_upper)
+            objective[row] = result['objective']
+            status.append(result['status'])
+        return objective, status
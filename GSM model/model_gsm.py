@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+# helpers to load and handle the cobra model of K. phaffii
+# scenarios (bound changes, knockouts, another objective) are applied to the model itself and undone when leaving them,
+# instead of making a copy of the model and its solver for every one
+# add_constructs adds the species and reactions of many heterologous proteins with one call to the model (and its solver)
+
+import contextlib
+import hashlib
+import multiprocessing
+import os
+import pickle
+import struct
+
+import cobra
+import optlang
+
+import stoichiometry_gsm
+
+default_model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ihGlycopastoris_rewritten.xml')
+
+# the snapshot starts with this header so a stale or foreign file is detected before unpickling anything
+snapshot_magic = b'PHSNAP'
+snapshot_version = 1
+snapshot_header = struct.Struct('<6sHI')
+
+# model of the worker process of run_scenarios, set once by worker_init
+worker_model = None
+
+
+def file_hash(path):
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_key(path):
+
+    # the snapshot is only valid for the same XML and the same cobra/optlang versions (the pickle depends on their classes)
+    return {'xml': file_hash(path), 'cobra': cobra.__version__, 'optlang': optlang.__version__}
+
+
+def read_snapshot(snapshot_path, key):
+
+    # the model stored in the snapshot, or None if there is no snapshot, it was made from something else or it cannot be
+    # read (a corrupt or incompatible pickle can raise almost anything, the SBML is parsed again then)
+    try:
+        with open(snapshot_path, 'rb') as handle:
+            magic, version, key_length = snapshot_header.unpack(handle.read(snapshot_header.size))
+            if magic != snapshot_magic or version != snapshot_version:
+                return None
+            if pickle.loads(handle.read(key_length)) != key:
+                return None
+            return pickle.load(handle)
+    except FileNotFoundError:
+        return None
+    except Exception as err:
+        print("WARNING: could not read the model snapshot {}, the SBML is read again: {!r}".format(snapshot_path, err))
+        return None
+
+
+def write_snapshot(snapshot_path, key, model):
+
+    encoded_key = pickle.dumps(key)
+    # write to a temporary file first so parallel workers never read half written snapshots
+    temporary = '{}.{}.tmp'.format(snapshot_path, os.getpid())
+    with open(temporary, 'wb') as handle:
+        handle.write(snapshot_header.pack(snapshot_magic, snapshot_version, len(encoded_key)))
+        handle.write(encoded_key)
+        pickle.dump(model, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, snapshot_path)
+
+
+def load_model(path=default_model_path, snapshot=True):
+
+    # same as cobra.io.read_sbml_model but the parsed model is kept in a binary snapshot next to the XML (<xml>.snapshot)
+    # the snapshot is keyed by the XML content hash and the cobra/optlang versions, if any of them changed the SBML
+    # is parsed again and the snapshot rewritten. only load snapshots you made yourself, they are pickles
+    if not snapshot:
+        return cobra.io.read_sbml_model(path)
+    snapshot_path = path + '.snapshot'
+    key = snapshot_key(path)
+    model = read_snapshot(snapshot_path, key)
+    if model is not None:
+        return model
+    model = cobra.io.read_sbml_model(path)
+    try:
+        write_snapshot(snapshot_path, key, model)
+    except OSError as err:
+        print("WARNING: could not write the model snapshot:", str(err))
+    return model
+
+
+def add_constructs(model, constructs):
+
+    # adds everything the notebook adds for a heterologous protein for all the constructs, each one a dict with the
+    # protein 'name', its 'aa' sequence and optionally its 'dna' and 'rna' (one is transcribed from the other if only
+    # one is given, both are back translated with the codon optimization of stoichiometry_gsm if neither is), the
+    # 'lower_bound' and 'upper_bound' of its biosynthesis (0 and 1000 by default, a constitutive promoter fixes both)
+    # and the 'compartment' ('C_c') and 'external_compartment' ('C_e')
+    # for every name: the <name>_DNA/_RNA/_AA species and their synthesis reactions (<name>_DNA_reaction, ...),
+    # <name>_c and <name>_e, <name>_Biosynthesis, the transport c_<name>_e and the exchange EX_<name>, the same as
+    # sbml_patcher.add_construct. the stoichiometries of each sequence type are calculated for all the constructs at
+    # once and all the species and reactions are added to the model in one go, returns the new reactions
+    constructs = [dict(construct) for construct in constructs]
+    names = [construct['name'] for construct in constructs]
+    if len(set(names)) != len(names):
+        raise ValueError("construct names must be unique")
+    # a construct with only its DNA (or only its RNA) gets the other one from it, so both describe the same sequence.
+    # the codon optimized back translation is only for the constructs that have neither
+    for construct in constructs:
+        if construct.get('dna') and not construct.get('rna'):
+            construct['rna'] = construct['dna'].replace('T', 'U')
+        elif construct.get('rna') and not construct.get('dna'):
+            construct['dna'] = construct['rna'].replace('U', 'T')
+    untranslated = [construct for construct in constructs if not construct.get('dna') and not construct.get('rna')]
+    if untranslated:
+        RNA_seqs, DNA_seqs = stoichiometry_gsm.back_translate_batch([construct['aa'] for construct in untranslated])
+        for construct, RNA_seq, DNA_seq in zip(untranslated, RNA_seqs, DNA_seqs):
+            construct['rna'] = RNA_seq
+            construct['dna'] = DNA_seq
+
+    metabolites = []
+    for construct in constructs:
+        name, compartment = construct['name'], construct.get('compartment', 'C_c')
+        external_compartment = construct.get('external_compartment', 'C_e')
+        metabolites.extend(cobra.Metabolite('{}_{}'.format(name, seq_type), name='{}_{}'.format(name, seq_type),
+                                            compartment=compartment) for seq_type in ('DNA', 'RNA', 'AA'))
+        metabolites.append(cobra.Metabolite(name + '_c', name=name + '_cytosolic', compartment=compartment))
+        metabolites.append(cobra.Metabolite(name + '_e', name=name + '_extracellular', compartment=external_compartment))
+    existing = [metabolite.id for metabolite in metabolites if metabolite.id in model.metabolites]
+    if existing:
+        raise ValueError("the model already has the species {}".format(', '.join(existing[:5])))
+    species = {metabolite.id: metabolite for metabolite in metabolites}
+
+    reactions = []
+    for seq_type in ('DNA', 'RNA', 'AA'):
+        seqs = [construct[seq_type.lower()].rstrip('*') for construct in constructs]
+        sbml_ids, products, coefficients = stoichiometry_gsm.get_stoichiometry_batch(seqs, seq_type, names)
+        species.update((sbml_id, model.metabolites.get_by_id(sbml_id)) for sbml_id in sbml_ids)
+        for product, row in zip(products, coefficients):
+            stoichiometry = stoichiometry_gsm.batch_to_stoichiometry(sbml_ids, product, row, seq_type)
+            reaction = cobra.Reaction(product + '_reaction', name=product + '_reaction', lower_bound=0, upper_bound=1000)
+            reaction.add_metabolites({species[molecule]: coefficient for molecule, coefficient in stoichiometry.items()})
+            reactions.append(reaction)
+    for construct in constructs:
+        name = construct['name']
+        biosynthesis = cobra.Reaction(name + '_Biosynthesis', name=name + ' Biosynthesis',
+                                      lower_bound=construct.get('lower_bound', 0),
+                                      upper_bound=construct.get('upper_bound', 1000))
+        biosynthesis.add_metabolites({species[name + '_DNA']: -2.8e-05, species[name + '_RNA']: -0.0029,
+                                      species[name + '_AA']: -0.997, species[name + '_c']: 1.0})
+        transport = cobra.Reaction('c_{}_e'.format(name), name='extracellular transport ' + name, lower_bound=0,
+                                   upper_bound=1000)
+        transport.add_metabolites({species[name + '_c']: -1.0, species[name + '_e']: 1.0})
+        exchange = cobra.Reaction('EX_' + name, name=name + ' exchange reaction', lower_bound=-1000, upper_bound=1000)
+        exchange.add_metabolites({species[name + '_e']: -1.0})
+        reactions.extend([biosynthesis, transport, exchange])
+
+    model.add_metabolites(metabolites)
+    model.add_reactions(reactions)
+    return reactions
+
+
+@contextlib.contextmanager
+def scenario(model, bounds=None, knockouts=None, objective=None, direction='max'):
+
+    # the model with the bounds {reaction id: (lower, upper)} set, the genes of knockouts knocked out and objective (a
+    # reaction id) as the objective, all the changes are done on the model and its solver and undone when leaving the
+    # with block. scenarios can be nested, the inner one starts from the changes of the outer one
+    #     with scenario(pheast, knockouts=['pMMO_C']):
+    #         pheast.summary()
+    with model:
+        for reaction, reaction_bounds in (bounds or {}).items():
+            model.reactions.get_by_id(reaction).bounds = reaction_bounds
+        for gene in knockouts or []:
+            model.genes.get_by_id(gene).knock_out()
+        if objective is not None:
+            model.objective = model.problem.Objective(model.reactions.get_by_id(objective).flux_expression,
+                                                      direction=direction)
+        yield model
+
+
+def optimum(model):
+
+    # optimum (nan if there is none) and solver status of the model as it is
+    status = model.solver.optimize()
+    return (model.solver.objective.value if status == 'optimal' else float('nan')), status
+
+
+def worker_init(model):
+
+    global worker_model
+    worker_model = model
+
+
+def worker_scenario(task):
+
+    function, changes = task
+    with scenario(worker_model, **changes):
+        return function(worker_model)
+
+
+def run_scenarios(model, scenarios, function=optimum, processes=None):
+
+    # function(model) for every scenario, given as a dict of the arguments of scenario ({'knockouts': [...], ...})
+    # the scenarios are run by a process pool that gets the model once per process, and every process applies and undoes
+    # its scenarios on that one model. function has to be picklable (defined at the top level of a module)
+    # returns the results in the order of scenarios
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        results = []
+        for changes in scenarios:
+            with scenario(model, **changes):
+                results.append(function(model))
+        return results
+    with multiprocessing.Pool(processes, initializer=worker_init, initargs=(model,)) as pool:
+        return pool.map(worker_scenario, [(function, changes) for changes in scenarios])
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+# smaller LP for sweeps and deletion screens: the reactions that cannot carry flux (blocked) are removed with the
+# metabolites left without reactions, and linear chains (a metabolite made by one reaction and used by one other) are
+# lumped into one reaction. a ReducedModel keeps, for every reaction of the full model, the reaction of the reduced one
+# that carries its flux and the factor between both, so reduced fluxes can be expanded back to full-model ids
+# blocked reactions are found at the widest bounds the reduced model will be used with (a sweep only makes bounds
+# narrower), first with LPs that push flux through as many reactions as possible and then FVA on the few left
+
+import ast
+
+from cobra.util.solver import linear_reaction_coefficients
+
+
+def flux_carrying(model, epsilon=1.0, tolerance=1e-6):
+
+    # the reactions that can carry flux forward and the ones that can carry it in reverse, found with LPs that maximize
+    # the flux of all of them at the same time, each one capped at epsilon (LP7 of FASTCORE). the capped fluxes have no
+    # lower bound so a reaction can still go the other way. the problem is built once, after every LP the reactions
+    # found are taken out of the objective and it is solved again until it finds no more. a capped flux only counts
+    # above tolerance (relative to epsilon), smaller ones can be solver noise of a blocked reaction
+    found = {1: set(), -1: set()}
+    with model:
+        capped = {}
+        constraints = []
+        for reaction in model.reactions:
+            for direction in (1, -1):
+                if (reaction.upper_bound if direction == 1 else -reaction.lower_bound) <= 0:
+                    continue
+                variable = model.problem.Variable('capped_{}_{}'.format(len(capped), direction), ub=epsilon)
+                capped[reaction, direction] = variable
+                constraints.append(model.problem.Constraint(direction * reaction.flux_expression - variable, lb=0,
+                                                            name='capped_flux_{}'.format(len(constraints))))
+        model.add_cons_vars(list(capped.values()) + constraints)
+        model.objective = model.problem.Objective(0, direction='max')
+        model.solver.objective.set_linear_coefficients({variable: 1 for variable in capped.values()})
+        while capped and model.solver.optimize() == 'optimal':
+            new = [key for key, variable in capped.items() if variable.primal > tolerance * epsilon]
+            if not new:
+                break
+            model.solver.objective.set_linear_coefficients({capped[key]: 0 for key in new})
+            for reaction, direction in new:
+                found[direction].add(reaction)
+                del capped[reaction, direction]
+    return found[1], found[-1]
+
+
+def find_blocked(model, bounds=None, tolerance=1e-9):
+
+    # ids of the reactions that cannot carry flux with the bounds {reaction id: (lower, upper)} (the ones of the model
+    # for the rest). the reactions found by flux_carrying are not blocked, the rest are checked with a min and a max LP
+    # and are blocked if neither has a flux above tolerance
+    with model:
+        for reaction, reaction_bounds in (bounds or {}).items():
+            model.reactions.get_by_id(reaction).bounds = reaction_bounds
+        forward, reverse = flux_carrying(model)
+        blocked = []
+        model.objective = model.problem.Objective(0, direction='max')
+        for reaction in model.reactions:
+            if reaction in forward or reaction in reverse:
+                continue
+            directions = (['max'] if reaction.upper_bound > 0 else []) + (['min'] if reaction.lower_bound < 0 else [])
+            coefficients = {reaction.forward_variable: 1, reaction.reverse_variable: -1}
+            model.solver.objective.set_linear_coefficients(coefficients)
+            carries = False
+            for direction in directions:
+                model.solver.objective.direction = direction
+                if model.solver.optimize() == 'optimal' and abs(model.solver.objective.value) > tolerance:
+                    carries = True
+                    break
+            model.solver.objective.set_linear_coefficients({variable: 0 for variable in coefficients})
+            if not carries:
+                blocked.append(reaction.id)
+    return blocked
+
+
+class ReducedModel:
+
+    # a reduced copy of a model (model) and the map of every reaction of the full model to (reaction of the reduced
+    # model, factor): the full flux is factor times the reduced flux, blocked reactions map to (None, 0)
+
+    def __init__(self, model, mapping):
+        self.model = model
+        self.mapping = mapping
+
+    def expand(self, fluxes):
+        # fluxes of the reduced model (a pandas Series or a cobra solution) as fluxes of the full model
+        import pandas as pd
+        fluxes = getattr(fluxes, 'fluxes', fluxes)
+        return pd.Series({reaction: factor * fluxes[reduced] if reduced is not None else 0.0
+                          for reaction, (reduced, factor) in self.mapping.items()})
+
+    def members(self, reduced):
+        # the full-model reactions whose flux is carried by the reduced reaction, with their factors
+        return {reaction: factor for reaction, (target, factor) in self.mapping.items() if target == reduced}
+
+
+def conjuncts(reaction):
+
+    # the parts of the GPR of a reaction that are joined by and (the whole GPR if it is not an and), as strings
+    body = reaction.gpr.body
+    if body is None:
+        return []
+    parts = body.values if isinstance(body, ast.BoolOp) and isinstance(body.op, ast.And) else [body]
+    return [ast.unparse(part) for part in parts]
+
+
+def combine_rules(first, second):
+
+    # GPR of a lumped reaction, it needs the genes of both reactions. parts both GPRs have are written once, so a long
+    # chain of reactions of the same enzyme keeps its GPR
+    parts = list(dict.fromkeys(conjuncts(first) + conjuncts(second)))
+    return ' and '.join(part if len(parts) == 1 or ' or ' not in part else '({})'.format(part) for part in parts)
+
+
+def lump_chains(model, mapping, keep=(), tolerance=1e-12):
+
+    # lumps every pair of reactions linked by a metabolite only they have, until there are none left. the reaction that
+    # is kept carries the flux of both (the other one is factor times it), takes the bounds that satisfy both and needs
+    # the genes of both. reactions in keep are never lumped. mapping is updated, returns how many were lumped
+    keep = set(keep)
+    lumped = 0
+    changed = True
+    while changed:
+        changed = False
+        for metabolite in list(model.metabolites):
+            reactions = list(metabolite.reactions)
+            if len(reactions) != 2 or keep.intersection(reaction.id for reaction in reactions):
+                continue
+            first, second = sorted(reactions, key=lambda reaction: reaction.id)
+            # second = factor * first, so the metabolite cancels in first + factor * second
+            factor = - first.metabolites[metabolite] / second.metabolites[metabolite]
+            if factor > 0:
+                lower_bound, upper_bound = second.lower_bound / factor, second.upper_bound / factor
+            else:
+                lower_bound, upper_bound = second.upper_bound / factor, second.lower_bound / factor
+            lower_bound, upper_bound = max(first.lower_bound, lower_bound), min(first.upper_bound, upper_bound)
+            if lower_bound > upper_bound:
+                continue
+            stoichiometry = {other: first.metabolites.get(other, 0) + factor * second.metabolites.get(other, 0)
+                             for other in set(first.metabolites) | set(second.metabolites)}
+            first.subtract_metabolites(first.metabolites, combine=True)
+            first.add_metabolites({other: coefficient for other, coefficient in stoichiometry.items()
+                                   if abs(coefficient) > tolerance})
+            first.bounds = lower_bound, upper_bound
+            first.gene_reaction_rule = combine_rules(first, second)
+            for reaction, (target, scale) in mapping.items():
+                if target == second.id:
+                    mapping[reaction] = (first.id, scale * factor)
+            model.remove_reactions([second])
+            model.remove_metabolites([metabolite])
+            lumped += 1
+            changed = True
+    return lumped
+
+
+def reduce_model(model, bounds=None, keep=(), lump=True, tolerance=1e-9):
+
+    # reduced copy of model for the bounds {reaction id: (lower, upper)} it will be used with at most (a sweep of
+    # r_uptake_methane up to 5 and r1160 up to 20 needs {'r_uptake_methane': (0, 5), 'r1160': (0, 20)}), the model keeps
+    # its own bounds. keep are reactions that are never lumped (the ones whose bounds a sweep changes, the objective is
+    # always kept). returns a ReducedModel
+    objective = {reaction.id: coefficient for reaction, coefficient in linear_reaction_coefficients(model).items()}
+    keep = set(keep) | set(objective) | set(bounds or {})
+    # the reactions in keep stay even if they are blocked, so the reduced model can still be changed like the full one
+    blocked = set(find_blocked(model, bounds, tolerance)) - keep
+    reduced = model.copy()
+    mapping = {reaction.id: (None, 0.0) if reaction.id in blocked else (reaction.id, 1.0) for reaction in reduced.reactions}
+    reduced.remove_reactions([reduced.reactions.get_by_id(reaction) for reaction in blocked], remove_orphans=True)
+    lumped = lump_chains(reduced, mapping, keep) if lump else 0
+    print("{} reactions: {} blocked, {} lumped, {} left ({} metabolites of {})".format(
+        len(model.reactions), len(blocked), lumped, len(reduced.reactions), len(reduced.metabolites),
+        len(model.metabolites)))
+    return ReducedModel(reduced, mapping)
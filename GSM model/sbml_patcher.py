@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+
+# streaming SBML patcher: adds, removes and re-parameterizes reactions and species of an SBML model without loading it
+# with cobra. the XML is parsed incrementally (SAX) and every element is written to the output as it is read, changed or
+# skipped, so memory does not grow with the model and one read of the input can write many patched models at once
+# ids are given like in cobra (m1, r1339, pMMO_AA, ...), the M_/R_/G_ prefixes of the SBML are added here
+# XML comments are not kept (SAX does not report them), cobra does not write any
+
+import os
+import re
+import xml.sax
+from collections import OrderedDict
+from xml.sax.saxutils import XMLGenerator
+
+import stoichiometry_gsm
+
+# bounds with one of these values point to the parameters cobra always writes, others get their own parameter
+default_bound_parameters = {
+    -1000.0: 'cobra_default_lb',
+    1000.0: 'cobra_default_ub',
+    0.0: 'cobra_0_bound',
+    float('-inf'): 'minus_inf',
+    float('inf'): 'plus_inf'
+}
+
+# children of a reaction that come before its listOfReactants/listOfProducts
+reaction_header = ('notes', 'annotation')
+
+
+def sbml_id(prefix, cobra_id):
+
+    # same escaping cobra uses when writing SBML, e.g. PAS_chr2-1_0437 --> G_PAS_chr2__45__1_0437
+    return prefix + re.sub(r'[^0-9a-zA-Z_]', lambda match: '__{}__'.format(ord(match.group())), cobra_id)
+
+
+def number(value):
+
+    value = float(value)
+    if value in (float('inf'), float('-inf')):
+        return 'INF' if value > 0 else '-INF'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class SBMLPatch:
+
+    # the changes to make to a model. adding a species or reaction that is already in the model replaces it
+
+    def __init__(self):
+        self.new_species = OrderedDict()
+        self.new_reactions = OrderedDict()
+        self.removed_species = set()
+        self.removed_reactions = set()
+        self.stoichiometries = {}
+        self.bounds = {}
+
+    def add_species(self, species_id, name=None, compartment='C_c', formula=None, charge=None):
+        attrs = OrderedDict([('id', sbml_id('M_', species_id)), ('name', name or species_id), ('compartment', compartment),
+                             ('hasOnlySubstanceUnits', 'false'), ('boundaryCondition', 'false'), ('constant', 'false')])
+        if charge is not None:
+            attrs['fbc:charge'] = str(int(charge))
+        if formula:
+            attrs['fbc:chemicalFormula'] = formula
+        self.new_species[attrs['id']] = attrs
+        return self
+
+    def add_reaction(self, reaction_id, stoichiometry, lower_bound=0, upper_bound=1000, name=None, genes=None):
+        # stoichiometry as given by get_stoichiometry ({species: coefficient}, negative for reactants)
+        # genes is a list of genes that are all needed for the reaction (like pMMO_A and pMMO_B and pMMO_C)
+        self.new_reactions[sbml_id('R_', reaction_id)] = {
+            'name': name or reaction_id,
+            'stoichiometry': OrderedDict((sbml_id('M_', species), float(coefficient)) for species, coefficient in stoichiometry.items()),
+            'bounds': (float(lower_bound), float(upper_bound)),
+            'genes': list(genes or [])
+        }
+        return self
+
+    def remove_species(self, *species_ids):
+        self.removed_species.update(sbml_id('M_', species) for species in species_ids)
+        return self
+
+    def remove_reactions(self, *reaction_ids):
+        self.removed_reactions.update(sbml_id('R_', reaction) for reaction in reaction_ids)
+        return self
+
+    def set_stoichiometry(self, reaction_id, stoichiometry):
+        # new coefficients of some species of a reaction that is in the model, the ones not given are not touched,
+        # a coefficient of 0 takes the species out of the reaction
+        changes = self.stoichiometries.setdefault(sbml_id('R_', reaction_id), OrderedDict())
+        changes.update((sbml_id('M_', species), float(coefficient)) for species, coefficient in stoichiometry.items())
+        return self
+
+    def set_bounds(self, reaction_id, lower_bound, upper_bound):
+        self.bounds[sbml_id('R_', reaction_id)] = (float(lower_bound), float(upper_bound))
+        return self
+
+    def skipped_species(self):
+        return self.removed_species | set(self.new_species)
+
+    def skipped_reactions(self):
+        return self.removed_reactions | set(self.new_reactions)
+
+
+def add_protein_reaction(patch, reaction, lb, ub, seq, seq_type, protein_name):
+
+    # same as add_protein_reaction in the notebook, the <protein_name>_<seq_type> species has to be in the patch or the model
+    stoichiometry = stoichiometry_gsm.cached_stoichiometry(seq, seq_type, protein_name)
+    return patch.add_reaction(reaction, stoichiometry, lb, ub)
+
+
+def add_construct(patch, protein_name, dna_seq, rna_seq, aa_seq, lower_bound=0, upper_bound=1000):
+
+    # everything the notebook adds for one heterologous protein: DNA/RNA/AA species and their synthesis reactions,
+    # the biosynthesis of the protein (bounded by lower_bound and upper_bound), its transport out and its exchange
+    for seq, seq_type in ((dna_seq, 'DNA'), (rna_seq, 'RNA'), (aa_seq, 'AA')):
+        product = '{}_{}'.format(protein_name, seq_type)
+        patch.add_species(product, product)
+        add_protein_reaction(patch, '{}_reaction'.format(product), 0, 1000, seq, seq_type, protein_name)
+    patch.add_species(protein_name + '_c', protein_name + '_cytosolic', 'C_c')
+    patch.add_species(protein_name + '_e', protein_name + '_extracellular', 'C_e')
+    patch.add_reaction(protein_name + '_Biosynthesis', {
+        protein_name + '_DNA': -2.8e-05,
+        protein_name + '_RNA': -0.0029,
+        protein_name + '_AA': -0.997,
+        protein_name + '_c': 1.0
+    }, lower_bound, upper_bound, protein_name + ' Biosynthesis')
+    patch.add_reaction('c_{}_e'.format(protein_name), {protein_name + '_c': -1.0, protein_name + '_e': 1.0}, 0, 1000,
+                       'extracellular transport ' + protein_name)
+    patch.add_reaction('EX_' + protein_name, {protein_name + '_e': -1.0}, -1000, 1000, protein_name + ' exchange reaction')
+    return patch
+
+
+class SBMLPatcher(xml.sax.ContentHandler):
+
+    # SAX handler that writes the document it receives to out with the changes of patch
+
+    def __init__(self, patch, out):
+        super().__init__()
+        self.patch = patch
+        self.writer = XMLGenerator(out, encoding='UTF-8', short_empty_elements=True)
+        self.skipped_species = patch.skipped_species()
+        self.skipped_reactions = patch.skipped_reactions()
+        self.stack = []
+        # depth inside an element that is being left out
+        self.skipping = 0
+        # whitespace is held until the next element to indent what we add the same way as the rest of the file
+        self.pending = ''
+        self.parameters = OrderedDict()
+        self.parameters_written = False
+        self.gene_products = set()
+        self.gene_products_written = False
+        # state of the reaction being copied
+        self.reaction = None
+        self.changes = None
+        self.written = None
+        self.lists_seen = None
+
+        # every bound that is not a default one gets a parameter, like cobra does (R_r1145_upper_bound)
+        bounds = dict(patch.bounds)
+        bounds.update((reaction, new['bounds']) for reaction, new in patch.new_reactions.items())
+        self.bound_parameters = {}
+        for reaction, (lower_bound, upper_bound) in bounds.items():
+            self.bound_parameters[reaction] = (self.bound_parameter(reaction, 'lower', lower_bound),
+                                               self.bound_parameter(reaction, 'upper', upper_bound))
+
+    def bound_parameter(self, reaction, side, value):
+        if value in default_bound_parameters:
+            return default_bound_parameters[value]
+        parameter = '{}_{}_bound'.format(reaction, side)
+        self.parameters[parameter] = OrderedDict([('sboTerm', 'SBO:0000625'), ('id', parameter), ('value', number(value)),
+                                                  ('units', 'mmol_per_gDW_per_hr'), ('constant', 'true')])
+        return parameter
+
+    # writing
+
+    def flush(self):
+        if self.pending:
+            self.writer.characters(self.pending)
+            self.pending = ''
+
+    def indent(self):
+        # indentation of the element that comes next, taken from the whitespace held before it
+        return self.pending if self.pending.startswith('\n') else '\n' + '  ' * len(self.stack)
+
+    def write_tree(self, name, attrs, children, indent):
+        # children are (name, attrs, children) tuples, written one per line below their parent
+        self.writer.characters(indent)
+        self.writer.startElement(name, attrs)
+        for child in children:
+            self.write_tree(*child, indent + '  ')
+        if children:
+            self.writer.characters(indent)
+        self.writer.endElement(name)
+
+    def write_children(self, children):
+        # children added at the end of the element that is being closed
+        indent = self.indent()
+        for child in children:
+            self.write_tree(*child, indent + '  ')
+        self.pending = indent
+
+    def species_reference(self, species, coefficient):
+        return ('speciesReference', OrderedDict([('species', species), ('stoichiometry', number(abs(coefficient))),
+                                                 ('constant', 'true')]), [])
+
+    def reaction_tree(self, reaction, new):
+        lower_bound, upper_bound = self.bound_parameters[reaction]
+        attrs = OrderedDict([('id', reaction), ('name', new['name']), ('reversible', 'true' if new['bounds'][0] < 0 else 'false'),
+                             ('fast', 'false'), ('fbc:lowerFluxBound', lower_bound), ('fbc:upperFluxBound', upper_bound)])
+        stoichiometry = new['stoichiometry']
+        children = []
+        reactants = [self.species_reference(species, c) for species, c in stoichiometry.items() if c < 0]
+        products = [self.species_reference(species, c) for species, c in stoichiometry.items() if c > 0]
+        if reactants:
+            children.append(('listOfReactants', {}, reactants))
+        if products:
+            children.append(('listOfProducts', {}, products))
+        genes = [('fbc:geneProductRef', {'fbc:geneProduct': sbml_id('G_', gene)}, []) for gene in new['genes']]
+        if len(genes) > 1:
+            genes = [('fbc:and', {}, genes)]
+        if genes:
+            children.append(('fbc:geneProductAssociation', {}, genes))
+        return ('reaction', attrs, children)
+
+    def missing_references(self, list_name):
+        # species of the changed stoichiometry that go in list_name and were not in the reaction yet
+        sign = -1 if list_name == 'listOfReactants' else 1
+        return [self.species_reference(species, c) for species, c in self.changes.items()
+                if c * sign > 0 and species not in self.written]
+
+    def write_missing_lists(self, before, indent):
+        # a reaction may have no listOfReactants/listOfProducts at all, they are added when we get past where they go
+        for list_name in ('listOfReactants', 'listOfProducts'):
+            if list_name == before:
+                return
+            if list_name not in self.lists_seen:
+                self.lists_seen.add(list_name)
+                references = self.missing_references(list_name)
+                if references:
+                    self.write_tree(list_name, {}, references, indent)
+
+    # SAX events
+
+    def startDocument(self):
+        self.writer.startDocument()
+
+    def endDocument(self):
+        # the whitespace after the root element is not reported, the file still ends with a newline
+        self.flush()
+        self.writer.characters('\n')
+        self.writer.endDocument()
+
+    def characters(self, content):
+        if self.skipping:
+            return
+        if content.isspace():
+            self.pending += content
+            return
+        self.flush()
+        self.writer.characters(content)
+
+    def ignorableWhitespace(self, content):
+        self.characters(content)
+
+    def processingInstruction(self, target, data):
+        self.flush()
+        self.writer.processingInstruction(target, data)
+
+    def startElement(self, name, attrs):
+        if self.skipping:
+            self.skipping += 1
+            return
+        parent = self.stack[-1] if self.stack else None
+        if self.skip(name, attrs, parent):
+            self.skipping = 1
+            self.pending = ''
+            return
+
+        if name == 'listOfReactions' and not self.parameters_written:
+            # a model without listOfParameters, it goes right before the reactions
+            self.write_parameters_list()
+        if parent == 'reaction' and self.changes is not None and name not in reaction_header:
+            self.write_missing_lists(name, self.indent())
+
+        if name == 'reaction':
+            attrs = self.start_reaction(attrs)
+        elif name == 'speciesReference' and self.changes is not None and attrs.get('species') in self.changes:
+            species = attrs['species']
+            attrs = OrderedDict(attrs.items())
+            attrs['stoichiometry'] = number(abs(self.changes[species]))
+            self.written.add(species)
+        elif name == 'parameter' and attrs.get('id') in self.parameters:
+            # the model already has a parameter for this bound (cobra names them the same way), it gets the new value
+            attrs = self.parameters.pop(attrs['id'])
+        elif name == 'fbc:geneProduct':
+            self.gene_products.add(attrs.get('fbc:id'))
+        self.flush()
+        self.writer.startElement(name, attrs)
+        self.stack.append(name)
+
+    def skip(self, name, attrs, parent):
+        if name == 'species':
+            return attrs.get('id') in self.skipped_species
+        if name == 'reaction':
+            return attrs.get('id') in self.skipped_reactions
+        if name == 'speciesReference':
+            species = attrs.get('species')
+            if species in self.patch.removed_species:
+                print("WARNING: {} was removed but is still in {}, it is taken out of the reaction".format(species, self.reaction))
+                return True
+            # a changed coefficient that now has the other sign moves the species to the other list, a 0 removes it
+            if self.changes is not None and species in self.changes:
+                coefficient = self.changes[species]
+                return coefficient == 0 or (coefficient < 0) != (parent == 'listOfReactants')
+            return False
+        if name == 'fbc:fluxObjective':
+            return attrs.get('fbc:reaction') in self.patch.removed_reactions
+        if name == 'groups:member':
+            return attrs.get('groups:idRef') in self.patch.removed_reactions | self.patch.removed_species
+        return False
+
+    def start_reaction(self, attrs):
+        self.reaction = attrs.get('id')
+        self.changes = self.patch.stoichiometries.get(self.reaction)
+        self.written = set()
+        self.lists_seen = set()
+        if self.reaction in self.patch.bounds:
+            lower_bound, upper_bound = self.bound_parameters[self.reaction]
+            attrs = OrderedDict(attrs.items())
+            attrs['fbc:lowerFluxBound'] = lower_bound
+            attrs['fbc:upperFluxBound'] = upper_bound
+            if 'reversible' in attrs:
+                attrs['reversible'] = 'true' if self.patch.bounds[self.reaction][0] < 0 else 'false'
+        return attrs
+
+    def endElement(self, name):
+        if self.skipping:
+            self.skipping -= 1
+            return
+        self.stack.pop()
+        if name == 'listOfSpecies':
+            self.write_children([('species', attrs, []) for attrs in self.patch.new_species.values()])
+        elif name == 'listOfParameters':
+            self.write_children([('parameter', attrs, []) for attrs in self.parameters.values()])
+            self.parameters_written = True
+        elif name == 'listOfReactions':
+            self.write_children([self.reaction_tree(reaction, new) for reaction, new in self.patch.new_reactions.items()])
+        elif name == 'fbc:listOfGeneProducts':
+            self.write_children(self.gene_product_trees())
+            self.gene_products_written = True
+        elif name == 'model' and not self.gene_products_written and self.gene_product_trees():
+            self.write_children([('fbc:listOfGeneProducts', {}, self.gene_product_trees())])
+        elif name in ('listOfReactants', 'listOfProducts') and self.changes is not None:
+            self.lists_seen.add(name)
+            self.write_children(self.missing_references(name))
+        elif name == 'reaction':
+            if self.changes is not None:
+                self.write_missing_lists(None, self.indent() + '  ')
+            self.reaction = None
+            self.changes = None
+        self.flush()
+        self.writer.endElement(name)
+
+    def write_parameters_list(self):
+        self.parameters_written = True
+        if self.parameters:
+            indent = self.indent()
+            self.write_tree('listOfParameters', {}, [('parameter', attrs, []) for attrs in self.parameters.values()], indent)
+
+    def gene_product_trees(self):
+        genes = OrderedDict()
+        for new in self.patch.new_reactions.values():
+            for gene in new['genes']:
+                gene_id = sbml_id('G_', gene)
+                if gene_id not in self.gene_products:
+                    genes[gene_id] = ('fbc:geneProduct', OrderedDict([('fbc:id', gene_id), ('fbc:name', gene), ('fbc:label', gene_id)]), [])
+        return list(genes.values())
+
+
+class Broadcast(xml.sax.ContentHandler):
+
+    # passes the events of one parse to several handlers, so the input is read once for all of them
+
+    def __init__(self, handlers):
+        super().__init__()
+        self.handlers = handlers
+
+    def startDocument(self):
+        for handler in self.handlers:
+            handler.startDocument()
+
+    def endDocument(self):
+        for handler in self.handlers:
+            handler.endDocument()
+
+    def startElement(self, name, attrs):
+        for handler in self.handlers:
+            handler.startElement(name, attrs)
+
+    def endElement(self, name):
+        for handler in self.handlers:
+            handler.endElement(name)
+
+    def characters(self, content):
+        for handler in self.handlers:
+            handler.characters(content)
+
+    def ignorableWhitespace(self, content):
+        for handler in self.handlers:
+            handler.ignorableWhitespace(content)
+
+    def processingInstruction(self, target, data):
+        for handler in self.handlers:
+            handler.processingInstruction(target, data)
+
+
+def parse(input_path, handler, chunk_size=1 << 16):
+
+    # the file is fed to the parser in pieces of chunk_size bytes
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_namespaces, False)
+    parser.setFeature(xml.sax.handler.feature_external_ges, False)
+    parser.setContentHandler(handler)
+    with open(input_path, 'rb') as handle:
+        for block in iter(lambda: handle.read(chunk_size), b''):
+            parser.feed(block)
+    parser.close()
+
+
+def patch_sbml(input_path, output_path, patch, chunk_size=1 << 16):
+
+    with open(output_path, 'w', encoding='utf-8') as out:
+        parse(input_path, SBMLPatcher(patch, out), chunk_size)
+    return output_path
+
+
+def patch_sbml_batch(input_path, patches, output_directory, open_files=64, chunk_size=1 << 16):
+
+    # patches: {name: SBMLPatch}, every patched model is written to <output_directory>/<name>.xml
+    # one read of the input writes up to open_files models
+    os.makedirs(output_directory, exist_ok=True)
+    names = list(patches)
+    paths = {}
+    for start in range(0, len(names), open_files):
+        group = names[start:start + open_files]
+        outs = [open(os.path.join(output_directory, name + '.xml'), 'w', encoding='utf-8') for name in group]
+        try:
+            parse(input_path, Broadcast([SBMLPatcher(patches[name], out) for name, out in zip(group, outs)]), chunk_size)
+        finally:
+            for out in outs:
+                out.close()
+        paths.update((name, out.name) for name, out in zip(group, outs))
+    return paths
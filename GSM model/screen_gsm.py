@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+# screening of protein libraries: the maximum production of every protein in the engineered model (pheast_final)
+# one construct (the template, screen_*) is added to the model once, for every protein only the coefficients of the
+# DNA/RNA/AA synthesis reactions of the template are changed in the solver before solving, so nothing is rebuilt
+# the library is streamed in chunks, every chunk is screened by a worker of a process pool and written to its own part
+# file (id, production, growth, yield and status columns as numpy arrays), an interrupted screen skips the chunks that
+# already have their part file when it is started again with the same library
+
+import collections
+import glob
+import itertools
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+import model_gsm
+import sequence_reader
+import stoichiometry_gsm
+
+template = 'screen'
+# part files of finished chunks, the temporary ones of unfinished chunks do not match
+part_pattern = 'part-' + '[0-9]' * 6 + '.npz'
+valid_residues = set(stoichiometry_gsm.sbml_aa)
+
+# model and settings of the worker process, set once by worker_init
+worker_model = None
+worker_settings = None
+
+
+def worker_init(model, settings):
+
+    global worker_model, worker_settings
+    worker_model = model
+    worker_settings = settings
+
+
+def read_proteins(path):
+
+    # yields (record name, amino acid sequence) for every record of a FASTA or GenBank file (plain or gzip), one record
+    # at a time
+    for name, record in sequence_reader.read_records(path, record=sequence_reader.SequenceBuffer):
+        yield name, record.sequence()
+
+
+def library_chunks(library, chunk_size):
+
+    # (chunk index, names, sequences) of chunk_size proteins of library, a FASTA path or (name, sequence) pairs
+    records = read_proteins(library) if isinstance(library, str) else iter(library)
+    for index in itertools.count():
+        chunk = [record for _, record in zip(range(chunk_size), records)]
+        if not chunk:
+            return
+        names, seqs = zip(*chunk)
+        yield index, list(names), [seq.rstrip('*') for seq in seqs]
+
+
+def part_path(output_dir, index):
+
+    return os.path.join(output_dir, 'part-{:06d}.npz'.format(index))
+
+
+def set_synthesis(model, stoichiometries):
+
+    # changes the DNA/RNA/AA synthesis reactions of the template to stoichiometries {sequence type: (SBML ids,
+    # coefficients)}, only in the solver: one call per metabolite with the coefficients of all three reactions
+    changes = collections.defaultdict(dict)
+    for seq_type, (sbml_ids, coefficients) in stoichiometries.items():
+        reaction = model.reactions.get_by_id('{}_{}_reaction'.format(template, seq_type))
+        for sbml_id, coefficient in zip(sbml_ids, coefficients):
+            changes[sbml_id].update({reaction.forward_variable: coefficient, reaction.reverse_variable: -coefficient})
+    for sbml_id, coefficients in changes.items():
+        model.constraints[sbml_id].set_linear_coefficients(coefficients)
+
+
+def screen_chunk(model, settings, index, names, seqs):
+
+    # maximum production of every protein of the chunk, written to the part file of the chunk
+    # proteins with residues that are not in the tables are not solved and get the status 'invalid'
+    output_dir, growth, uptake = settings
+    valid = [row for row, seq in enumerate(seqs) if seq and set(seq) <= valid_residues]
+    production = np.full(len(names), np.nan)
+    growth_flux = np.full(len(names), np.nan)
+    uptake_flux = np.full(len(names), np.nan)
+    status = np.full(len(names), 'invalid', dtype=object)
+    if valid:
+        batch = stoichiometry_gsm.get_construct_stoichiometry_batch([seqs[row] for row in valid],
+                                                                    [names[row] for row in valid])
+        growth_reaction = model.reactions.get_by_id(growth)
+        uptake_reaction = model.reactions.get_by_id(uptake) if uptake else None
+        for position, row in enumerate(valid):
+            set_synthesis(model, {seq_type: (sbml_ids, coefficients[position])
+                                  for seq_type, (sbml_ids, _, coefficients) in batch.items()})
+            status[row] = model.solver.optimize()
+            if status[row] == 'optimal':
+                production[row] = model.solver.objective.value
+                growth_flux[row] = growth_reaction.flux
+                if uptake_reaction is not None:
+                    uptake_flux[row] = uptake_reaction.flux
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yields = np.where(uptake_flux > 0, production / uptake_flux, np.nan)
+    # written to a temporary file first so an interrupted screen never leaves half written parts
+    temporary = '{}.{}.tmp.npz'.format(part_path(output_dir, index)[:-4], os.getpid())
+    np.savez(temporary, **{'id': np.array(names, dtype=str), 'production': production, 'growth': growth_flux,
+                           'yield': yields, 'status': status.astype(str)})
+    os.replace(temporary, part_path(output_dir, index))
+    return len(names)
+
+
+def worker_chunk(task):
+
+    return screen_chunk(worker_model, worker_settings, *task)
+
+
+def screen_library(model, library, output_dir, processes=None, chunk_size=100, min_growth=0, growth='r1339',
+                   uptake='r_uptake_methane'):
+
+    # maximum production of every protein of library (a FASTA file of amino acid sequences, or (name, sequence) pairs)
+    # in model, keeping the growth reaction at least at min_growth. the template construct is added to the model and
+    # removed at the end, the model is left as it was. the results of every chunk of chunk_size proteins go to a part
+    # file in output_dir, the chunks that are already there are skipped (a library must keep its order to resume)
+    # yield is the production per unit of uptake flux (nan if nothing is taken up or there is no uptake reaction)
+    # returns all the results read back with read_screen
+    processes = processes or os.cpu_count()
+    os.makedirs(output_dir, exist_ok=True)
+    done = {int(os.path.basename(path)[5:11]) for path in glob.glob(os.path.join(output_dir, part_pattern))}
+    if uptake and uptake not in model.reactions:
+        uptake = None
+    settings = (output_dir, growth, uptake)
+    tasks = (task for task in library_chunks(library, chunk_size) if task[0] not in done)
+    screened = 0
+    start = time.perf_counter()
+
+    def report(count):
+        nonlocal screened
+        screened += count
+        elapsed = time.perf_counter() - start
+        print("{} proteins screened in {:.0f} s ({:.0f} per hour)".format(screened, elapsed, 3600 * screened / elapsed))
+
+    with model:
+        model_gsm.add_constructs(model, [{'name': template, 'aa': 'M'}])
+        model.objective = model.reactions.get_by_id(template + '_Biosynthesis')
+        model.reactions.get_by_id(growth).lower_bound = min_growth
+        if processes == 1:
+            for task in tasks:
+                report(screen_chunk(model, settings, *task))
+        else:
+            with multiprocessing.Pool(processes, initializer=worker_init, initargs=(model, settings)) as pool:
+                # a few chunks per process are in flight, the rest of the library is only read when needed
+                pending = collections.deque()
+                for task in tasks:
+                    pending.append(pool.apply_async(worker_chunk, (task,)))
+                    if len(pending) >= 2 * processes:
+                        report(pending.popleft().get())
+                while pending:
+                    report(pending.popleft().get())
+    return read_screen(output_dir)
+
+
+def read_screen(output_dir):
+
+    # results of screen_library as a pandas DataFrame in the order of the library
+    import pandas as pd
+    columns = ['id', 'production', 'growth', 'yield', 'status']
+    parts = []
+    for path in sorted(glob.glob(os.path.join(output_dir, part_pattern))):
+        with np.load(path) as part:
+            parts.append(pd.DataFrame({column: part[column] for column in columns}))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+# streaming readers for FASTA and GenBank files (plain or gzip) that feed the stoichiometry calculator
+# files are read in pieces of at most chunk_size bytes and the residues are counted as they come,
+# so a record is never held as one string and memory stays bounded even for multi-gigabyte files
+
+import gzip
+
+import numpy as np
+
+import stoichiometry_gsm
+
+# lowercase is turned into uppercase, whitespace and the position numbers of GenBank files are dropped
+normalize_table = bytes.maketrans(b'abcdefghijklmnopqrstuvwxyz', b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+ignored_bytes = b' \t\r\n\v\f0123456789/'
+
+
+class ResidueCounter:
+
+    # counts the residues of one record piece by piece, keeping the order in which the residues first appear
+    # (get_stoichiometry sums the residues in that order, so we need it to get exactly the same result)
+
+    def __init__(self):
+        self.counts = np.zeros(256, dtype=np.int64)
+        self.order = []
+
+    def add(self, piece):
+        piece = piece.translate(normalize_table, ignored_bytes)
+        if not piece:
+            return
+        piece_counts = np.bincount(np.frombuffer(piece, dtype=np.uint8), minlength=256)
+        new = [int(byte) for byte in np.flatnonzero(piece_counts) if not self.counts[byte]]
+        self.order.extend(sorted(new, key=lambda byte: piece.find(bytes([byte]))))
+        self.counts += piece_counts
+
+    def split(self, sequence_type):
+        # valid residue counts in order of appearance and everything else (IUPAC ambiguity codes, stop codons, gaps...)
+        MW_dict = stoichiometry_gsm.sequence_tables[sequence_type.upper()][0]
+        counts = {}
+        invalid = {}
+        for byte in self.order:
+            residue = chr(byte)
+            if residue in MW_dict:
+                counts[residue] = int(self.counts[byte])
+            else:
+                invalid[residue] = int(self.counts[byte])
+        return counts, invalid
+
+
+class SequenceBuffer:
+
+    # keeps the whole sequence of one record, normalized like ResidueCounter, for when the sequence itself is needed and
+    # not only its counts (screen_gsm.read_proteins). it has the add of ResidueCounter so the same readers fill it
+
+    def __init__(self):
+        self.pieces = []
+
+    def add(self, piece):
+        self.pieces.append(piece.translate(normalize_table, ignored_bytes))
+
+    def sequence(self):
+        return b''.join(self.pieces).decode('ascii')
+
+
+def open_sequence_file(path):
+
+    # gzip files are recognized by their magic number, not by the extension
+    with open(path, 'rb') as handle:
+        magic = handle.read(2)
+    if magic == b'\x1f\x8b':
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_pieces(handle, chunk_size):
+
+    # lines of at most chunk_size bytes, a FASTA sequence written on a single line comes in several pieces
+    # the second value tells if the piece starts a new line
+    line_start = True
+    for piece in iter(lambda: handle.readline(chunk_size), b''):
+        yield piece, line_start
+        line_start = piece.endswith(b'\n')
+
+
+def read_fasta(handle, chunk_size, record=ResidueCounter):
+
+    name = None
+    counter = None
+    buffer = []
+    buffered = 0
+    pieces = read_pieces(handle, chunk_size)
+    for piece, line_start in pieces:
+        if line_start and piece.startswith(b'>'):
+            if name is not None:
+                counter.add(b''.join(buffer))
+                yield name, counter
+            # headers longer than chunk_size keep coming in pieces until the end of the line
+            header = piece
+            while not header.endswith(b'\n'):
+                rest, _ = next(pieces, (b'\n', False))
+                header += rest
+            fields = header[1:].split()
+            name = fields[0].decode() if fields else ''
+            counter = record()
+            buffer = []
+            buffered = 0
+        elif name is not None:
+            # pieces are grouped until chunk_size bytes before counting them, numpy is slow on single lines
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered >= chunk_size:
+                counter.add(b''.join(buffer))
+                buffer = []
+                buffered = 0
+    if name is not None:
+        counter.add(b''.join(buffer))
+        yield name, counter
+
+
+def read_genbank(handle, chunk_size, record=ResidueCounter):
+
+    name = None
+    counter = None
+    in_sequence = False
+    buffer = []
+    buffered = 0
+    for piece, line_start in read_pieces(handle, chunk_size):
+        if line_start and piece.startswith(b'LOCUS'):
+            fields = piece.split()
+            name = fields[1].decode() if len(fields) > 1 else ''
+            counter = record()
+            in_sequence = False
+        elif line_start and piece.startswith(b'ORIGIN'):
+            in_sequence = True
+        elif line_start and piece.startswith(b'//'):
+            if name is not None:
+                counter.add(b''.join(buffer))
+                yield name, counter
+            name = None
+            in_sequence = False
+            buffer = []
+            buffered = 0
+        elif in_sequence and name is not None:
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered >= chunk_size:
+                counter.add(b''.join(buffer))
+                buffer = []
+                buffered = 0
+    # a last record without the closing //
+    if name is not None and in_sequence:
+        counter.add(b''.join(buffer))
+        yield name, counter
+
+
+def read_records(path, chunk_size=1 << 20, record=ResidueCounter):
+
+    # yields (record name, ResidueCounter) for every record of a FASTA or GenBank file, or another record class with the
+    # same add method (SequenceBuffer to get the sequences)
+    # the format is taken from the first line that is not empty
+    with open_sequence_file(path) as handle:
+        first = b''
+        while not first.strip():
+            first = handle.readline(chunk_size)
+            if not first:
+                return
+        handle.seek(0)
+        if first.startswith(b'>'):
+            reader = read_fasta(handle, chunk_size, record)
+        elif first.startswith(b'LOCUS'):
+            reader = read_genbank(handle, chunk_size, record)
+        else:
+            raise ValueError("{}: not a FASTA or GenBank file".format(path))
+        for name, counter in reader:
+            yield name, counter
+
+
+def stream_stoichiometry(path, sequence_type, chunk_size=1 << 20):
+
+    # yields (record name, mmol_gr_sbml, invalid residues) for every record of the file, mmol_gr_sbml is the same dict
+    # get_stoichiometry gives for the record sequence without the invalid residues, which are returned per record
+    # instead of failing in the middle of the file. records with no valid residue at all get None
+    for name, counter in read_records(path, chunk_size):
+        counts, invalid = counter.split(sequence_type)
+        if invalid:
+            print("WARNING: {} has residues that are not valid {} and were skipped: {}".format(name, sequence_type.upper(), invalid))
+        if not counts:
+            yield name, None, invalid
+            continue
+        yield name, stoichiometry_gsm.stoichiometry_from_counts(counts, sequence_type, name), invalid
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+# compact on-disk store for the sequences of our constructs
+# the DNA of every construct is 2-bit packed (4 bases per byte), the RNA and protein are normally not stored at all:
+# they are kept as a list of DNA segments (start, length, strand) that are transcribed or translated when asked for.
+# only when a sequence cannot be found in the DNA it is stored explicitly (RNA 2-bit packed, protein one byte per residue)
+# the file is memory mapped and only the bytes of the requested sequence are read and decoded
+#
+# layout: magic (4 bytes) | version (uint32) | index length (uint64) | index (json) | data
+# the index gives for every construct where its sequences are, offsets are relative to the start of the data
+
+import json
+import mmap
+import struct
+
+import numpy as np
+
+magic = b'PHSQ'
+version = 1
+header = struct.Struct('<4sIQ')
+
+# 2-bit codes of the bases, the first base of a byte goes in the highest bits
+dna_bases = 'ACGT'
+rna_bases = 'ACGU'
+
+# standard genetic code, codons are numbered 16 * first + 4 * second + third with the 2-bit codes above
+genetic_code = 'KNKNTTTTRSRSIIMIQHQHPPPPRRRRLLLLEDEDAAAAGGGGVVVV*Y*YSSSS*CWCLFLF'
+
+# the 4 bases of every possible byte, used to unpack a whole array of bytes with one lookup
+unpack_table = np.array([[(byte >> shift) & 3 for shift in (6, 4, 2, 0)] for byte in range(256)], dtype=np.uint8)
+
+
+def pack_bases(seq, bases=dna_bases):
+
+    # 2-bit codes of a DNA/RNA sequence, 4 bases per byte
+    table = bytearray([255] * 256)
+    for code, base in enumerate(bases):
+        table[ord(base)] = code
+    codes = np.frombuffer(seq.encode('ascii').translate(table), dtype=np.uint8)
+    if (codes == 255).any():
+        raise ValueError("only {} can be 2-bit packed".format(', '.join(bases)))
+    codes = np.concatenate((codes, np.zeros(-len(codes) % 4, dtype=np.uint8))).reshape(-1, 4)
+    return (codes[:, 0] << 6 | codes[:, 1] << 4 | codes[:, 2] << 2 | codes[:, 3]).astype(np.uint8).tobytes()
+
+
+def reverse_complement(seq):
+
+    return seq[::-1].translate(str.maketrans('ACGTU', 'TGCAA'))
+
+
+def translate(dna):
+
+    # protein of a DNA sequence read from its first base, incomplete last codons are ignored
+    codes = np.frombuffer(dna.encode('ascii').translate(bytes.maketrans(b'ACGT', b'\x00\x01\x02\x03')), dtype=np.uint8)
+    codes = codes[:len(codes) - len(codes) % 3].reshape(-1, 3).astype(np.intp)
+    return np.frombuffer(genetic_code.encode('ascii'), dtype=np.uint8)[16 * codes[:, 0] + 4 * codes[:, 1] + codes[:, 2]].tobytes().decode('ascii')
+
+
+def find_segments(target, texts):
+
+    # split target into the fewest pieces (greedy, longest first) that appear in any of texts
+    # returns a list of (text index, position, length) or None if some residue of target is in none of them
+    segments = []
+    position = 0
+    while position < len(target):
+        best = (0, None, None)
+        for index, text in enumerate(texts):
+            # binary search of the longest prefix of the rest of target that is in this text
+            low, high = 0, len(target) - position
+            while low < high:
+                middle = (low + high + 1) // 2
+                if text.find(target[position:position + middle]) >= 0:
+                    low = middle
+                else:
+                    high = middle - 1
+            if low > best[0]:
+                best = (low, index, text.find(target[position:position + low]))
+        if best[0] == 0:
+            return None
+        segments.append((best[1], best[2], best[0]))
+        position += best[0]
+    return segments
+
+
+def rna_segments(dna, rna):
+
+    # DNA segments (start, length, strand) that transcribed and joined give rna
+    found = find_segments(rna.replace('U', 'T'), [dna, reverse_complement(dna)])
+    if found is None:
+        return None
+    return [[start, length, 1] if strand == 0 else [len(dna) - start - length, length, -1] for strand, start, length in found]
+
+
+def aa_segments(dna, aa):
+
+    # DNA segments (start, length, strand) that translated and joined give aa, looked for in the 6 reading frames
+    reverse = reverse_complement(dna)
+    frames = [translate(dna[frame:]) for frame in range(3)] + [translate(reverse[frame:]) for frame in range(3)]
+    found = find_segments(aa, frames)
+    if found is None:
+        return None
+    segments = []
+    for frame, start, length in found:
+        start = frame % 3 + 3 * start
+        if frame < 3:
+            segments.append([start, 3 * length, 1])
+        else:
+            segments.append([len(dna) - start - 3 * length, 3 * length, -1])
+    return segments
+
+
+def write_sequence_store(path, constructs):
+
+    # constructs: {name: {'dna': ..., 'rna': ..., 'aa': ...}}, rna and aa are optional
+    # without rna the whole DNA is transcribed, without aa the DNA is translated from its start to the first stop codon
+    index = {}
+    data = bytearray()
+
+    def add(block):
+        offset = len(data)
+        data.extend(block)
+        return offset
+
+    for name, sequences in constructs.items():
+        dna = sequences['dna'].upper()
+        record = {'dna': [add(pack_bases(dna)), len(dna)]}
+
+        rna = sequences.get('rna')
+        segments = [[0, len(dna), 1]] if rna is None else rna_segments(dna, rna.upper())
+        # the segments are only worth it if they take less space than the packed sequence (12 bytes per segment)
+        if segments is not None and (rna is None or 12 * len(segments) < len(rna) / 4):
+            record['rna'] = {'segments': segments}
+        else:
+            record['rna'] = {'packed': [add(pack_bases(rna.upper(), rna_bases)), len(rna)]}
+
+        aa = sequences.get('aa')
+        if aa is None:
+            length = 3 * len(translate(dna).split('*')[0])
+            segments = [[0, length, 1]]
+        else:
+            segments = aa_segments(dna, aa.upper())
+        if segments is not None and (aa is None or 12 * len(segments) < len(aa)):
+            record['aa'] = {'segments': segments}
+        else:
+            record['aa'] = {'bytes': [add(aa.upper().encode('ascii')), len(aa)]}
+        index[name] = record
+
+    encoded_index = json.dumps({'records': index}).encode()
+    with open(path, 'wb') as handle:
+        handle.write(header.pack(magic, version, len(encoded_index)))
+        handle.write(encoded_index)
+        handle.write(data)
+
+
+class SequenceStore:
+
+    # read access to a file written by write_sequence_store, the file is memory mapped the first time it is needed
+    # and every sequence is decoded from its bytes when asked for, nothing is kept in memory
+
+    def __init__(self, path):
+        self.path = path
+        self.index = None
+        self.buffer = None
+        self.data_start = None
+
+    def open(self):
+        if self.buffer is not None:
+            return
+        with open(self.path, 'rb') as handle:
+            self.buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, file_version, index_length = header.unpack_from(self.buffer, 0)
+        if file_magic != magic or file_version != version:
+            raise ValueError("{} is not a version {} sequence store".format(self.path, version))
+        self.index = json.loads(self.buffer[header.size:header.size + index_length])['records']
+        self.data_start = header.size + index_length
+
+    def names(self):
+        self.open()
+        return list(self.index)
+
+    def __contains__(self, name):
+        self.open()
+        return name in self.index
+
+    def unpack(self, offset, length, start=0, end=None, bases=dna_bases):
+        # bases start:end of a packed sequence, only the bytes that contain them are read
+        end = length if end is None else end
+        first, last = start // 4, (end + 3) // 4
+        packed = np.frombuffer(self.buffer, dtype=np.uint8, count=last - first, offset=self.data_start + offset + first)
+        codes = unpack_table[packed].reshape(-1)[start - 4 * first:end - 4 * first]
+        return np.frombuffer(bases.encode('ascii'), dtype=np.uint8)[codes].tobytes().decode('ascii')
+
+    def segment(self, name, start, length, strand):
+        offset, dna_length = self.index[name]['dna']
+        dna = self.unpack(offset, dna_length, start, start + length)
+        return dna if strand == 1 else reverse_complement(dna)
+
+    def dna(self, name):
+        self.open()
+        return self.unpack(*self.index[name]['dna'])
+
+    def rna(self, name):
+        self.open()
+        record = self.index[name]['rna']
+        if 'packed' in record:
+            return self.unpack(*record['packed'], bases=rna_bases)
+        return ''.join(self.segment(name, *segment) for segment in record['segments']).replace('T', 'U')
+
+    def aa(self, name):
+        self.open()
+        record = self.index[name]['aa']
+        if 'bytes' in record:
+            offset, length = record['bytes']
+            start = self.data_start + offset
+            return self.buffer[start:start + length].decode('ascii')
+        return ''.join(translate(self.segment(name, *segment)) for segment in record['segments'])
+
+    def sequence(self, name, sequence_type):
+        # sequence_type as in get_stoichiometry: DNA, RNA or AA
+        return getattr(self, sequence_type.lower())(name)
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
@@ -1,6 +1,23 @@
-pMMO_dna_seq = 'ATGAAAACTATTAAAGATAGAATTGCTAAATGGTCTGCTATTGGTTTGTTGTCTGCTGTTGCTGCTACTGCTTTTTATGCTCCATCTGCTTCTGCTCATGGTGAAAAATCTCAAGCTGCTTTTATGAGAATGAGGACTATTCATTGGTATGACTTATCTTGGTCTAAGGAAAAGGTTAAAATAAACGAAACTGTTGAGATTAAAGGTAAATTTCATGTTTTTGAAGGTTGGCCTGAAACTGTTGATGAACCTGATGTTGCTTTTTTGAATGTTGGTATGCCTGGTCCTGTTTTTATTAGAAAAGAATCTTATATTGGTGGTCAATTGGTTCCAAGATCTGTTAGATTGGAAATTGGTAAAACTTATGATTTTAGAGTTGTTTTGAAAGCTAGAAGACCTGGTGATTGGCATGTTCATACTATGATGAATGTTCAAGGTGGTGGTCCAATTATTGGTCCTGGTAAATGGATTACTGTTGAAGGTTCTATGTCTGAATTTAGAAATCCTGTTACTACTTTGACTGGTCAAACTGTTGATTTGGAAAATTATAATGAAGGTAATACTTATTTCTGGCACGCTTTTTGGTTCGCAATAGGCGTTGCCTGGATTGGATATTGGTCGAGGAGACCTATCTTCATACCAAGGTTATTGATGGTTGATGCTGGTAGAGCTGATGAATTGGTTTCTGCTACTGATAGAAAAGTTGCTATGGGTTTTTTGGCTGCTACTATTTTGATTGTTGTTATGGCTATGTCTTCTGCTAATTCTAAATATCCAATTACTATTCCATTGCAAGCTGGTACTATGAGAGGTATGAAACCATTGGAATTGCCTGCTCCAACTGTTTCTGTTAAAGTTGAAGATGCTACTTATAGAGTTCCTGGTAGAGCTATGAGAATGAAATTGACTATTACTAATCATGGTAATTCTCCAATTAGATTGGGTGAATTTTATACTGCTTCTGTTAGATTTTTGGATTCTGATGTTTATAAAGATACTACTGGTTATCCTGAAGATTTGTTGGCTGAAGATGGTTTGTCTGTTTCTGATAATTCTCCATTGGCTCCTGGTGAAACTAGAACTGTTGATGTTACTGCTTCTGATGCTGCTTGGGAAGTTTATAGATTGTCTGATATTATTTATGATCCTGATTCTAGATTTGCTGGTTTGTTGTTTTTTTTTGATGCTACTGGTAATAGACAAGTTGTTCAAATTGATGCTCCATTGATTCCATCTTTTATGTAAATGGTGAGCAAGGGCGAGGAGCTGTTCACCGGGGTGGTGCCCATCCTGGTCGAGCTGGACGGCGACGTAAACGGCCACAAGTTCAGCGTGTCCGGCGAGGGCGAGGGCGATGCCACCTACGGCAAGCTGACCCTGAAGCTGATCTGCACCACCGGCAAGCTGCCCGTGCCCTGGCCCACCCTCGTGACCACCCTGGGCTACGGCCTGCAGTGCTTCGCCCGCTACCCCGACCACATGAAGCAGCACGACTTCTTCAAGTCCGCCATGCCCGAAGGCTACGTCCAGGAGCGCACCATCTTCTTCAAGGACGACGGCAACTACAAGACCCGCGCCGAGGTGAAGTTCGAGGGCGACACCCTGGTGAACCGCATCGAGCTGAAGGGCATCGACTTCAAGGAGGACGGCAACATCCTGGGGCACAAGCTGGAGTACAACTACAACAGCCACAACGTCTATATCACCGCCGACAAGCAGAAGAACGGCATCAAGGCCAACTTCAAGATCCGCCACAACATCGAGGACGGCGGCGTGCAGCTCGCCGACCACTACCAGCAGAACACCCCCATCGGCGACGGCCCCGTGCTGCTGCCCGACAACCACTACCTGAGCTACCAGTCCAAGCTGAGCAAAGACCCCAACGAGAAGCGCGATCACATGGTCCTGCTGGAGTTCGTGACCGCCGCCGGGATCACTCTCGGCATGGACGAGCTGTACAAGTAATTACTTGTACAGCTCGTCCATGCCGAGAGTGATCCCGGCGGCGGTCACGAACTCCAGCAGGACCATGTGATCGCGCTTCTCGTTGGGGTCTTTGCTCAGCTTGGACTGGTAGCTCAGGTAGTGGTTGTCGGGCAGCAGCACGGGGCCGTCGCCGATGGGGGTGTTCTGCTGGTAGTGGTCGGCGAGCTGCACGCCGCCGTCCTCGATGTTGTGGCGGATCTTGAAGTTGGCCTTGATGCCGTTCTTCTGCTTGTCGGCGGTGATATAGACGTTGTGGCTGTTGTAGTTGTACTCCAGCTTGTGCCCCAGGATGTTGCCGTCCTCCTTGAAGTCGATGCCCTTCAGCTCGATGCGGTTCACCAGGGTGTCGCCCTCGAACTTCACCTCGGCGCGGGTCTTGTAGTTGCCGTCGTCCTTGAAGAAGATGGTGCGCTCCTGGACGTAGCCTTCGGGCATGGCGGACTTGAAGAAGTCGTGCTGCTTCATGTGGTCGGGGTAGCGGGCGAAGCACTGCAGGCCGTAGCCCAGGGTGGTCACGAGGGTGGGCCAGGGCACGGGCAGCTTGCCGGTGGTGCAGATCAGCTTCAGGGTCAGCTTGCCGTAGGTGGCATCGCCCTCGCCCTCGCCGGACACGCTGAACTTGTGGCCGTTTACGTCGCCGTCCAGCTCGACCAGGATGGGCACCACCCCGGTGAACAGCTCCTCGCCCTTGCTCACCATTTACATAAAAGATGGAATCAATGGAGCATCAATTTGAACAACTTGTCTATTACCAGTAGCATCAAAAAAAAACAACAAACCAGCAAATCTAGAATCAGGATCATAAATAATATCAGACAATCTATAAACTTCCCAAGCAGCATCAGAAGCAGTAACATCAACAGTTCTAGTTTCACCAGGAGCCAATGGAGAATTATCAGAAACAGACAAACCATCTTCAGCCAACAAATCTTCAGGATAACCAGTAGTATCTTTATAAACATCAGAATCCAAAAATCTAACAGAAGCAGTATAAAATTCACCCAATCTAATTGGAGAATTACCATGATTAGTAATAGTCAATTTCATTCTCATAGCTCTACCAGGAACTCTATAAGTAGCATCTTCAACTTTAACAGAAACAGTTGGAGCAGGCAATTCCAATGGTTTCATACCTCTCATAGTACCAGCTTGCAATGGAATAGTAATTGGATATTTAGAATTAGCAGAAGACATAGCCATAACAACAATCAAAATAGTAGCAGCCAAAAAACCCATAGCAACTTTTCTATCAGTAGCAGAAACCAATTCATCAGCTCTACCAGCATCAACCATCAATAACCTTGGTATGAAGATAGGTCTCCTCGACCAATATCCAATCCAGGCAACGCCTATTGCGAACCAAAAAGCGTGCCAGAAATAAGTATTACCTTCATTATAATTTTCCAAATCAACAGTTTGACCAGTCAAAGTAGTAACAGGATTTCTAAATTCAGACATAGAACCTTCAACAGTAATCCATTTACCAGGACCAATAATTGGACCACCACCTTGAACATTCATCATAGTATGAACATGCCAATCACCAGGTCTTCTAGCTTTCAAAACAACTCTAAAATCATAAGTTTTACCAATTTCCAATCTAACAGATCTTGGAACCAATTGACCACCAATATAAGATTCTTTTCTAATAAAAACAGGACCAGGCATACCAACATTCAAAAAAGCAACATCAGGTTCATCAACAGTTTCAGGCCAACCTTCAAAAACATGAAATTTACCTTTAATCTCAACAGTTTCGTTTATTTTAACCTTTTCCTTAGACCAAGATAAGTCATACCAATGAATAGTCCTCATTCTCATAAAAGCAGCTTGAGATTTTTCACCATGAGCAGAAGCAGATGGAGCATAAAAAGCAGTAGCAGCAACAGCAGACAACAAACCAATAGCAGACCATTTAGCAATTCTATCTTTAATAGTTTTCATTCATGAGATTATTGGAAACCACCAGAATCGAATATAAAAGGCGAACACCTTTCCCAATTTTGGTTTCTCCTGACCCAAAGACTTTTCATGAGATTATTGGAAACCACCAGAATCGAATATAAAAGGCGAACACCTTTCCCAATTTTGGTTTCTCCTGACCCAAAGACTTTTCATGAGATTATTGGAAACCACCAGAATCGAATATAAAAGGCGAACACCTTTCCCAATTTTGGTTTCTCCTGACCCAAAGACTTTAAAGTCTTTGGGTCAGGAGAAACCAAAATTGGGAAAGGTGTTCGCCTTTTATATTCGATTCTGGTGGTTTCCAATAATCTCATGAAAAGTCTTTGGGTCAGGAGAAACCAAAATTGGGAAAGGTGTTCGCCTTTTATATTCGATTCTGGTGGTTTCCAATAATCTCATGAAAAGTCTTTGGGTCAGGAGAAACCAAAATTGGGAAAGGTGTTCGCCTTTTATATTCGATTCTGGTGGTTTCCAATAATCTCATGAACTGACAATAAAAAGATTCTTGTTTTCAAGAACTTGTCATTTGTATAGTTTTTTTATATTGTAGTTGTTCTATTTTAATCAAATGTTAGCGTGATTTATATTTTTTTTCGCCTCGACATCATCTGCCCAGATGCGAAGTTAAGTGCGCAGAAAGTAATATCATGCGTCAATCGTATGTGAATGCTGGTCGCTATACTGACTGACAATAAAAAGATTCTTGTTTTCAAGAACTTGTCATTTGTATAGTTTTTTTATATTGTAGTTGTTCTATTTTAATCAAATGTTAGCGTGATTTATATTTTTTTTCGCCTCGACATCATCTGCCCAGATGCGAAGTTAAGTGCGCAGAAAGTAATATCATGCGTCAATCGTATGTGAATGCTGGTCGCTATACTGACTGACAATAAAAAGATTCTTGTTTTCAAGAACTTGTCATTTGTATAGTTTTTTTATATTGTAGTTGTTCTATTTTAATCAAATGTTAGCGTGATTTATATTTTTTTTCGCCTCGACATCATCTGCCCAGATGCGAAGTTAAGTGCGCAGAAAGTAATATCATGCGTCAATCGTATGTGAATGCTGGTCGCTATACTGCAGTATAGCGACCAGCATTCACATACGATTGACGCATGATATTACTTTCTGCGCACTTAACTTCGCATCTGGGCAGATGATGTCGAGGCGAAAAAAAATATAAATCACGCTAACATTTGATTAAAATAGAACAACTACAATATAAAAAAACTATACAAATGACAAGTTCTTGAAAACAAGAATCTTTTTATTGTCAGTCAGTATAGCGACCAGCATTCACATACGATTGACGCATGATATTACTTTCTGCGCACTTAACTTCGCATCTGGGCAGATGATGTCGAGGCGAAAAAAAATATAAATCACGCTAACATTTGATTAAAATAGAACAACTACAATATAAAAAAACTATACAAATGACAAGTTCTTGAAAACAAGAATCTTTTTATTGTCAGTCAGTATAGCGACCAGCATTCACATACGATTGACGCATGATATTACTTTCTGCGCACTTAACTTCGCATCTGGGCAGATGATGTCGAGGCGAAAAAAAATATAAATCACGCTAACATTTGATTAAAATAGAACAACTACAATATAAAAAAACTATACAAATGACAAGTTCTTGAAAACAAGAATCTTTTTATTGTCAGTATGAAACTACTCTTACCATTATTGACACTCGTTGCTGTTGCTAAGGCCATGTCTGCTGCTCAATCTGCTGTTAGATCTCATGCTGAAGCTGTTCAAGTTTCTAGAACTATTGATTGGATGGCTTTGTTTGTTGTTTTTTTTGTTATTGTTGGTTCTTATCATATTCATGCTATGTTGACTATGGGTGATTGGGATTTTTGGTCTGATTGGAAAGATAGAAGATTGTGGGTTACTGTTACTCCAATTGTTTTGGTTACTTTTCCTGCTGCTGTTCAATCTTATTTGTGGGAAAGATATAGATTGCCATGGGGTGCTACTGTTTGTGTTTTGGGTTTGTTGTTGGGTGAATGGATTAATAGATATTTTAATTTTTGGGGTTGGACTTATTTTCCAATTAATTTTGTTTTTCCTGCTTCTTTGGTTCCTGGTGCTATTATTTTGGATACTGTTTTGATGTTGTCTGGTTCTTATTTGTTTACTGCTATTGTTGGTGCTATGGGTTGGGGTTTGATTTTTTATCCTGGTAATTGGCCAATTATTGCTCCATTGCATGTTCCTGTTGAAAATAATGGTATGTTGATGTCTATTGCTGATATTCAAGGTTATAATTATGTTAGAACTGGTACTCCTGAATATATTAGAATGGTTGAAAAAGGTACTTTGAGAACTTTTGGTAAAGATGTTGCGCCCGTTTCAGCTTTTTTTTCTGCGTTCATGTCTATATTGATATATTTTATGTGGCATTTCATTGGTAGATGGTTTTCTAATGAAAGATTTTTGCAATCTACTTAATTAAGTAGATTGCAAAAATCTTTCATTAGAAAACCATCTACCAATGAAATGCCACATAAAATATATCAATATAGACATGAACGCAGAAAAAAAAGCTGAAACGGGCGCAACATCTTTACCAAAAGTTCTCAAAGTACCTTTTTCAACCATTCTAATATATTCAGGAGTACCAGTTCTAACATAATTATAACCTTGAATATCAGCAATAGACATCAACATACCATTATTTTCAACAGGAACATGCAATGGAGCAATAATTGGCCAATTACCAGGATAAAAAATCAAACCCCAACCCATAGCACCAACAATAGCAGTAAACAAATAAGAACCAGACAACATCAAAACAGTATCCAAAATAATAGCACCAGGAACCAAAGAAGCAGGAAAAACAAAATTAATTGGAAAATAAGTCCAACCCCAAAAATTAAAATATCTATTAATCCATTCACCCAACAACAAACCCAAAACACAAACAGTAGCACCCCATGGCAATCTATATCTTTCCCACAAATAAGATTGAACAGCAGCAGGAAAAGTAACCAAAACAATTGGAGTAACAGTAACCCACAATCTTCTATCTTTCCAATCAGACCAAAAATCCCAATCACCCATAGTCAACATAGCATGAATATGATAAGAACCAACAATAACAAAAAAAACAACAAACAAAGCCATCCAATCAATAGTTCTAGAAACTTGAACAGCTTCAGCATGAGATCTAACAGCAGATTGAGCAGCAGACATGGCCTTAGCAACAGCAACGAGTGTCAATAATGGTAAGAGTAGTTTCATATGAAACTACTCTTACCATTATTGACACTCGTTGCTGTTGCTAAGGCCATGGCTGCTACTACTATTGGTGGTGCTGCTGCTGCTGAAGCTCCATTGTTAGATAAGAAATGGTTGACATTTGCTTTGGCTATATACACTGTTTTTTATTTGTGGGTTAGATGGTATGAGGGGGTTTATGGCTGGTCTGCTGGTTTGGATTCTTTCGCTCCGGAGTTTGAAACTTATTGGATGAATTTCTTGTATACGGAGATTGTTTTGGAAATTGTTACTGCTTCTATTTTGTGGGGTTACTTATGGAAAACTAGAGATAGAAATTTGGCTGCTTTGACTCCAAGAGAAGAATTGAGAAGAAATTTTACTCATTTGGTATGGTTGGTTGCTTATGCTTGGGCTATTTACTGGGGTGCTTCTTATTTTACTGAACAAGATGGTACTTGGCACCAAACAATAGTTAGGGACACTGATTTTACACCTTCTCATATTATTGAATTCTATTTGTCTTACCCAATTTATATTATTACTGGGTTTGCTGCTTTTATTTATGCTAAAACTAGATTGCCATTTTTTGCTAAAGGTATTTCTTTGCCATATTTGGTTTTGGTTGTTGGTCCATTTATGATTTTGCCAAATGTTGGTTTGAATGAATGGGGTCATACTTTTTGGTTTATGGAAGAATTGTTTGTTGCTCCATTGCATTATGGTTTTGTTATTTTCGGTTGGTTGGCTTTGGCTGTTATGGGTACTTTGACTCAAACTTTTTATAGATTTGCTCAAGGTGGTTTGGGTCAATCTTTGTGTGAAGCTGTTGATGAAGGTTTGATTGCTAAATAATTATTTAGCAATCAAACCTTCATCAACAGCTTCACACAAAGATTGACCCAAACCACCTTGAGCAAATCTATAAAAAGTTTGAGTCAAAGTACCCATAACAGCCAAAGCCAACCAACCGAAAATAACAAAACCATAATGCAATGGAGCAACAAACAATTCTTCCATAAACCAAAAAGTATGACCCCATTCATTCAAACCAACATTTGGCAAAATCATAAATGGACCAACAACCAAAACCAAATATGGCAAAGAAATACCTTTAGCAAAAAATGGCAATCTAGTTTTAGCATAAATAAAAGCAGCAAACCCAGTAATAATATAAATTGGGTAAGACAAATAGAATTCAATAATATGAGAAGGTGTAAAATCAGTGTCCCTAACTATTGTTTGGTGCCAAGTACCATCTTGTTCAGTAAAATAAGAAGCACCCCAGTAAATAGCCCAAGCATAAGCAACCAACCATACCAAATGAGTAAAATTTCTTCTCAATTCTTCTCTTGGAGTCAAAGCAGCCAAATTTCTATCTCTAGTTTTCCATAAGTAACCCCACAAAATAGAAGCAGTAACAATTTCCAAAACAATCTCCGTATACAAGAAATTCATCCAATAAGTTTCAAACTCCGGAGCGAAAGAATCCAAACCAGCAGACCAGCCATAAACCCCCTCATACCATCTAACCCACAAATAAAAAACAGTGTATATAGCCAAAGCAAATGTCAACCATTTCTTATCTAACAATGGAGCTTCAGCAGCAGCAGCACCACCAATAGTAGTAGCAGCCATGGCCTTAGCAACAGCAACGAGTGTCAATAATGGTAAGAGTAGTTTCAT'
-pMMO_rna_seq = 'UUAAGUAGAUUGCAAAAAUCUUUCAUUAGAAAACCAUCUACCAAUGAAAUGCCACAUAAAAUAUAUCAAUAUAGACAUGAACGCAGAAAAAAAAGCUGAAACGGGCGCAACAUCUUUACCAAAAGUUCUCAAAGUACCUUUUUCAACCAUUCUAAUAUAUUCAGGAGUACCAGUUCUAACAUAAUUAUAACCUUGAAUAUCAGCAAUAGACAUCAACAUACCAUUAUUUUCAACAGGAACAUGCAAUGGAGCAAUAAUUGGCCAAUUACCAGGAUAAAAAAUCAAACCCCAACCCAUAGCACCAACAAUAGCAGUAAACAAAUAAGAACCAGACAACAUCAAAACAGUAUCCAAAAUAAUAGCACCAGGAACCAAAGAAGCAGGAAAAACAAAAUUAAUUGGAAAAUAAGUCCAACCCCAAAAAUUAAAAUAUCUAUUAAUCCAUUCACCCAACAACAAACCCAAAACACAAACAGUAGCACCCCAUGGCAAUCUAUAUCUUUCCCACAAAUAAGAUUGAACAGCAGCAGGAAAAGUAACCAAAACAAUUGGAGUAACAGUAACCCACAAUCUUCUAUCUUUCCAAUCAGACCAAAAAUCCCAAUCACCCAUAGUCAACAUAGCAUGAAUAUGAUAAGAACCAACAAUAACAAAAAAAACAACAAACAAAGCCAUCCAAUCAAUAGUUCUAGAAACUUGAACAGCUUCAGCAUGAGAUCUAACAGCAGAUUGAGCAGCAGACAUGGCCUUAGCAACAGCAACGAGUGUCAAUAAUGGUAAGAGUAGUUUCAUUUACUUGUACAGCUCGUCCAUGCCGAGAGUGAUCCCGGCGGCGGUCACGAACUCCAGCAGGACCAUGUGAUCGCGCUUCUCGUUGGGGUCUUUGCUCAGCUUGGACUGGUAGCUCAGGUAGUGGUUGUCGGGCAGCAGCACGGGGCCGUCGCCGAUGGGGGUGUUCUGCUGGUAGUGGUCGGCGAGCUGCACGCCGCCGUCCUCGAUGUUGUGGCGGAUCUUGAAGUUGGCCUUGAUGCCGUUCUUCUGCUUGUCGGCGGUGAUAUAGACGUUGUGGCUGUUGUAGUUGUACUCCAGCUUGUGCCCCAGGAUGUUGCCGUCCUCCUUGAAGUCGAUGCCCUUCAGCUCGAUGCGGUUCACCAGGGUGUCGCCCUCGAACUUCACCUCGGCGCGGGUCUUGUAGUUGCCGUCGUCCUUGAAGAAGAUGGUGCGCUCCUGGACGUAGCCUUCGGGCAUGGCGGACUUGAAGAAGUCGUGCUGCUUCAUGUGGUCGGGGUAGCGGGCGAAGCACUGCAGGCCGUAGCCCAGGGUGGUCACGAGGGUGGGCCAGGGCACGGGCAGCUUGCCGGUGGUGCAGAUCAGCUUCAGGGUCAGCUUGCCGUAGGUGGCAUCGCCCUCGCCCUCGCCGGACACGCUGAACUUGUGGCCGUUUACGUCGCCGUCCAGCUCGACCAGGAUGGGCACCACCCCGGUGAACAGCUCCUCGCCCUUGCUCACCAUUUACAUAAAAGAUGGAAUCAAUGGAGCAUCAAUUUGAACAACUUGUCUAUUACCAGUAGCAUCAAAAAAAAACAACAAACCAGCAAAUCUAGAAUCAGGAUCAUAAAUAAUAUCAGACAAUCUAUAAACUUCCCAAGCAGCAUCAGAAGCAGUAACAUCAACAGUUCUAGUUUCACCAGGAGCCAAUGGAGAAUUAUCAGAAACAGACAAACCAUCUUCAGCCAACAAAUCUUCAGGAUAACCAGUAGUAUCUUUAUAAACAUCAGAAUCCAAAAAUCUAACAGAAGCAGUAUAAAAUUCACCCAAUCUAAUUGGAGAAUUACCAUGAUUAGUAAUAGUCAAUUUCAUUCUCAUAGCUCUACCAGGAACUCUAUAAGUAGCAUCUUCAACUUUAACAGAAACAGUUGGAGCAGGCAAUUCCAAUGGUUUCAUACCUCUCAUAGUACCAGCUUGCAAUGGAAUAGUAAUUGGAUAUUUAGAAUUAGCAGAAGACAUAGCCAUAACAACAAUCAAAAUAGUAGCAGCCAAAAAACCCAUAGCAACUUUUCUAUCAGUAGCAGAAACCAAUUCAUCAGCUCUACCAGCAUCAACCAUCAAUAACCUUGGUAUGAAGAUAGGUCUCCUCGACCAAUAUCCAAUCCAGGCAACGCCUAUUGCGAACCAAAAAGCGUGCCAGAAAUAAGUAUUACCUUCAUUAUAAUUUUCCAAAUCAACAGUUUGACCAGUCAAAGUAGUAACAGGAUUUCUAAAUUCAGACAUAGAACCUUCAACAGUAAUCCAUUUACCAGGACCAAUAAUUGGACCACCACCUUGAACAUUCAUCAUAGUAUGAACAUGCCAAUCACCAGGUCUUCUAGCUUUCAAAACAACUCUAAAAUCAUAAGUUUUACCAAUUUCCAAUCUAACAGAUCUUGGAACCAAUUGACCACCAAUAUAAGAUUCUUUUCUAAUAAAAACAGGACCAGGCAUACCAACAUUCAAAAAAGCAACAUCAGGUUCAUCAACAGUUUCAGGCCAACCUUCAAAAACAUGAAAUUUACCUUUAAUCUCAACAGUUUCGUUUAUUUUAACCUUUUCCUUAGACCAAGAUAAGUCAUACCAAUGAAUAGUCCUCAUUCUCAUAAAAGCAGCUUGAGAUUUUUCACCAUGAGCAGAAGCAGAUGGAGCAUAAAAAGCAGUAGCAGCAACAGCAGACAACAAACCAAUAGCAGACCAUUUAGCAAUUCUAUCUUUAAUAGUUUUCAUUUAUUUAGCAAUCAAACCUUCAUCAACAGCUUCACACAAAGAUUGACCCAAACCACCUUGAGCAAAUCUAUAAAAAGUUUGAGUCAAAGUACCCAUAACAGCCAAAGCCAACCAACCGAAAAUAACAAAACCAUAAUGCAAUGGAGCAACAAACAAUUCUUCCAUAAACCAAAAAGUAUGACCCCAUUCAUUCAAACCAACAUUUGGCAAAAUCAUAAAUGGACCAACAACCAAAACCAAAUAUGGCAAAGAAAUACCUUUAGCAAAAAAUGGCAAUCUAGUUUUAGCAUAAAUAAAAGCAGCAAACCCAGUAAUAAUAUAAAUUGGGUAAGACAAAUAGAAUUCAAUAAUAUGAGAAGGUGUAAAAUCAGUGUCCCUAACUAUUGUUUGGUGCCAAGUACCAUCUUGUUCAGUAAAAUAAGAAGCACCCCAGUAAAUAGCCCAAGCAUAAGCAACCAACCAUACCAAAUGAGUAAAAUUUCUUCUCAAUUCUUCUCUUGGAGUCAAAGCAGCCAAAUUUCUAUCUCUAGUUUUCCAUAAGUAACCCCACAAAAUAGAAGCAGUAACAAUUUCCAAAACAAUCUCCGUAUACAAGAAAUUCAUCCAAUAAGUUUCAAACUCCGGAGCGAAAGAAUCCAAACCAGCAGACCAGCCAUAAACCCCCUCAUACCAUCUAACCCACAAAUAAAAAACAGUGUAUAUAGCCAAAGCAAAUGUCAACCAUUUCUUAUCUAACAAUGGAGCUUCAGCAGCAGCAGCACCACCAAUAGUAGUAGCAGCCAUGGCCUUAGCAACAGCAACGAGUGUCAAUAAUGGUAAGAGUAGUUUCAU'
-pMMO_aa_seq = 'MKLLLPLLTLVAVAKAMAATTIGGAAAAEAPLLDKKWLTFALAIYTVFYLWVRWYEGVYGWSAGLDSFAPEFETYWMNFLYTEIVLEIVTASILWGYLWKTRDRNLAALTPREELRRNFTHLVWLVAYAWAIYWGASYFTEQDGTWHQTIVRDTDFTPSHIIEFYLSYPIYIITGFAAFIYAKTRLPFFAKGISLPYLVLVVGPFMILPNVGLNEWGHTFWFMEELFVAPLHYGFVIFGWLALAVMGTLTQTFYRFAQGGLGQSLCEAVDEGLIAKMKTIKDRIAKWSAIGLLSAVAATAFYAPSASAHGEKSQAAFMRMRTIHWYDLSWSKEKVKINETVEIKGKFHVFEGWPETVDEPDVAFLNVGMPGPVFIRKESYIGGQLVPRSVRLEIGKTYDFRVVLKARRPGDWHVHTMMNVQGGGPIIGPGKWITVEGSMSEFRNPVTTLTGQTVDLENYNEGNTYFWHAFWFAIGVAWIGYWSRRPIFIPRLLMVDAGRADELVSATDRKVAMGFLAATILIVVMAMSSANSKYPITIPLQAGTMRGMKPLELPAPTVSVKVEDATYRVPGRAMRMKLTITNHGNSPIRLGEFYTASVRFLDSDVYKDTTGYPEDLLAEDGLSVSDNSPLAPGETRTVDVTASDAAWEVYRLSDIIYDPDSRFAGLLFFFDATGNRQVVQIDAPLIPSFMMVSKGEELFTGVVPILVELDGDVNGHKFSVSGEGEGDATYGKLTLKLICTTGKLPVPWPTLVTTLGYGLQCFARYPDHMKQHDFFKSAMPEGYVQERTIFFKDDGNYKTRAEVKFEGDTLVNRIELKGIDFKEDGNILGHKLEYNYNSHNVYITADKQKNGIKANFKIRHNIEDGGVQLADHYQQNTPIGDGPVLLPDNHYLSYQSKLSKDPNEKRDHMVLLEFVTAAGITLGMDELYKMKLLLPLLTLVAVAKAMSAAQSAVRSHAEAVQVSRTIDWMALFVVFFVIVGSYHIHAMLTMGDWDFWSDWKDRRLWVTVTPIVLVTFPAAVQSYLWERYRLPWGATVCVLGLLLGEWINRYFNFWGWTYFPINFVFPASLVPGAIILDTVLMLSGSYLFTAIVGAMGWGLIFYPGNWPIIAPLHVPVENNGMLMSIADIQGYNYVRTGTPEYIRMVEKGTLRTFGKDVAPVSAFFSAFMSILIYFMWHFIGRWFSNERFLQST'
-hemo_dna_seq = 'ATGGGTGCTTTTACTGAAAAACAAGAGGCTTTGGTTTCTTCTAGCTTTGAAGCTTTTAAAGCTAACATTCCACAATATTCTGTTGTTTTTTATACTTCTATTTTGGAAAAAGCTCCTGCTGCTAAAGATTTGTTTTCTTTTTTGTCTAATGGTGTTGATCCATCTAATCCAAAATTGACTGGTCATGCTGAAAAATTGTTTGGTTTGGTTAGAGATTCTGCTGGTCAATTGAAAGCTAATGGTACTGTTGTTGCTGATGCTGCTTTGGGTTCTATTCATGCTCAAAAAGCTATTACTGATCCACAATTTGTTGTTGTTAAAGAAGCTTTGTTGAAAACTATTAAAGAAGCTGTTGGTGATAAATGGTCTGATGAATTGTCTTCTGCTTGGGAAGTTGCTTATGATGAATTGGCTGCTGCTATTAAAAAAGCTTTTAAAAGCTTTTTTAATAGCAGCAGCCAATTCATCATAAGCAACTTCCCAAGCAGAAGACAATTCATCAGACCATTTATCACCAACAGCTTCTTTAATAGTTTTCAACAAAGCTTCTTTAACAACAACAAATTGTGGATCAGTAATAGCTTTTTGAGCATGAATAGAACCCAAAGCAGCATCAGCAACAACAGTACCATTAGCTTTCAATTGACCAGCAGAATCTCTAACCAAACCAAACAATTTTTCAGCATGACCAGTCAATTTTGGATTAGATGGATCAACACCATTAGACAAAAAAGAAAACAAATCTTTAGCAGCAGGAGCTTTTTCCAAAATAGAAGTATAAAAAACAACAGAATATTGTGGAATGTTAGCTTTAAAAGCTTCAAAGCTAGAAGAAACCAAAGCCTCTTGTTTTTCAGTAAAAGCACCCATATGCTTCCAAGATTCTGGTGGGAATACTGCTGATAGCCTAACGTTCATGATCAAAATTTAACTGTTCTAACCCCTACTTGACAGGCAATATATAAACAGAAGGAAGCTGCCCTGTCTTAAACCTTTTTTTTTATCATCATTATTAGCTTACTTTCATAATTGCGACTGGTTCCAATTGACAAGCTTTTGATTTTAACGACTTTTAACGACAACTTGAGAAGATCAAAAAACAACTAATTATTCGAAACGATGGCTATCCCCGAAGAGTTTGATATCCTAGTTCTAGGTGGTGGATCCAGTGGATCCTGTATTGCCGGAAGATTGGCAAACTTGGACCACTCCTTGAAAGTACTTTCAAGGAGTGGTCCAAGTTTGCCAATCTTCCGGCAATACAGGATCCACTGGATCCACCACCTAGAACTAGGATATCAAACTCTTCGGGGATAGCCATCGTTTCGAATAATTAGTTGTTTTTTGATCTTCTCAAGTTGTCGTTAAAAGTCGTTAAAATCAAAAGCTTGTCAATTGGAACCAGTCGCAATTATGAAAGTAAGCTAATAATGATGATAAAAAAAAAGGTTTAAGACAGGGCAGCTTCCTTCTGTTTATATATTGCCTGTCAAGTAGGGGTTAGAACAGTTAAATTTTGATCATGAACGTTAGGCTATCAGCAGTATTCCCACCAGAATCTTGGAAGCATACTGACAATAAAAAGATTCTTGTTTTCAAGAACTTGTCATTTGTATAGTTTTTTTATATTGTAGTTGTTCTATTTTAATCAAATGTTAGCGTGATTTATATTTTTTTTCGCCTCGACATCATCTGCCCAGATGCGAAGTTAAGTGCGCAGAAAGTAATATCATGCGTCAATCGTATGTGAATGCTGGTCGCTATACTGCAGTATAGCGACCAGCATTCACATACGATTGACGCATGATATTACTTTCTGCGCACTTAACTTCGCATCTGGGCAGATGATGTCGAGGCGAAAAAAAATATAAATCACGCTAACATTTGATTAAAATAGAACAACTACAATATAAAAAAACTATACAAATGACAAGTTCTTGAAAACAAGAATCTTTTTATTGTCAGT'
-hemo_rna_seq = 'AAAAGCUUUUUUAAUAGCAGCAGCCAAUUCAUCAUAAGCAACUUCCCAAGCAGAAGACAAUUCAUCAGACCAUUUAUCACCAACAGCUUCUUUAAUAGUUUUCAACAAAGCUUCUUUAACAACAACAAAUUGUGGAUCAGUAAUAGCUUUUUGAGCAUGAAUAGAACCCAAAGCAGCAUCAGCAACAACAGUACCAUUAGCUUUCAAUUGACCAGCAGAAUCUCUAACCAAACCAAACAAUUUUUCAGCAUGACCAGUCAAUUUUGGAUUAGAUGGAUCAACACCAUUAGACAAAAAAGAAAACAAAUCUUUAGCAGCAGGAGCUUUUUCCAAAAUAGAAGUAUAAAAAACAACAGAAUAUUGUGGAAUGUUAGCUUUAAAAGCUUCAAAGCUAGAAGAAACCAAAGCCUCUUGUUUUUCAGUAAAAGCACCCAU'
-hemo_aa_seq = 'MGAFTEKQEALVSSSFEAFKANIPQYSVVFYTSILEKAPAAKDLFSFLSNGVDPSNPKLTGHAEKLFGLVRDSAGQLKANGTVVADAALGSIHAQKAITDPQFVVVKEALLKTIKEAVGDKWSDELSSAWEVAYDELAAAIKKAF'
\ No newline at end of file
+# sequences of our two recombinant proteins, pMMO and leghemoglobin
+# they used to be written here as string literals, now they live in data/sequences.bin (see sequence_store.py):
+# 2-bit packed DNA, with the RNA and protein taken from segments of it. they are only decoded when used,
+# so pMMO_dna_seq, hemo_aa_seq, ... and "from sequences import *" work as before
+
+import os
+
+import sequence_store
+
+store = sequence_store.SequenceStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sequences.bin'))
+
+sequence_types = ['dna', 'rna', 'aa']
+
+__all__ = ['{}_{}_seq'.format(name, sequence_type) for name in store.names() for sequence_type in sequence_types]
+
+
+def __getattr__(attribute):
+
+    # <construct>_<dna/rna/aa>_seq --> sequence read from the store
+    name, _, sequence_type = attribute[:-len('_seq')].rpartition('_')
+    if not attribute.endswith('_seq') or sequence_type not in sequence_types or name not in store:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, attribute))
+    return store.sequence(name, sequence_type)
@@ -1,88 +1,101 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
+import os
 import sys
+from collections import Counter, OrderedDict
 
-def get_stoichiometry(seq, sequence_type, protein_name):
+import numpy as np
 
-    '''
-    codon_optimization ={
-        'A': 'GCU', 'C': 'UGU', 'D': 'GAC', 'E': 'GAG', 'F': 'UUC',
-        'G': 'GGU', 'H': 'CAC', 'I': 'AUU', 'K': 'AAG', 'L': 'UUG',
-        'M': 'AUG', 'N': 'AAC', 'P': 'CCA', 'Q': 'CAA', 'R': 'AGA',
-        'S': 'UCU', 'T': 'ACU', 'V': 'GUU', 'W': 'UGG', 'Y': 'UAC'
-        }
+# lookup tables shared by all the stoichiometry functions, they are defined once at import instead of on every call
 
-    RNA_seq = ''
-    for aa in seq:
-        RNA_seq += codon_optimization[aa]
-    #add the stop codon (UAA is the most likely for P.pastoris with 75%)
-    RNA_seq += 'UAA'
+sbml_aa= {
+    'A': 'm153', 'R': 'm158', 'N': 'm161', 'D': 'm156',
+    'C': 'm331', 'E': 'm154', 'Q': 'm163', 'G': 'm210',
+    'H': 'm490', 'I': 'm239', 'L': 'm227', 'K': 'm203',
+    'M': 'm343', 'F': 'm272', 'P': 'm185', 'S': 'm279',
+    'T': 'm305', 'W': 'm280', 'Y': 'm274', 'V': 'm222'
+    }
 
+#sbml_aa = {id:aa for aa,id in sbml_aa_to_id.items()}
 
-    reverse_transcription = str.maketrans('U', 'T')
-    DNA_seq = RNA_seq.translate(reverse_transcription)
-    '''
+sbml_dna = {'A': 'm404', 'T': 'm437', 'C': 'm431', 'G': 'm389'}
 
-    sbml_aa= {
-        'A': 'm153', 'R': 'm158', 'N': 'm161', 'D': 'm156',
-        'C': 'm331', 'E': 'm154', 'Q': 'm163', 'G': 'm210',
-        'H': 'm490', 'I': 'm239', 'L': 'm227', 'K': 'm203',
-        'M': 'm343', 'F': 'm272', 'P': 'm185', 'S': 'm279',
-        'T': 'm305', 'W': 'm280', 'Y': 'm274', 'V': 'm222'
-        }
-        
-    #sbml_aa = {id:aa for aa,id in sbml_aa_to_id.items()}
+sbml_rna = {'A': 'm94', 'U': 'm418', 'C': 'm423', 'G': 'm384'}
 
-    sbml_dna = {'A': 'm404', 'T': 'm437', 'C': 'm431', 'G': 'm389'}
+dna_MW = {'A': 331.2, 'T': 322.2, 'G': 347.2, 'C': 307.2}
 
-    sbml_rna = {'A': 'm94', 'U': 'm418', 'C': 'm423', 'G': 'm384'}
+rna_MW = {'A': 347.2, 'U': 324.2, 'G': 363.2, 'C': 323.2}
 
-    dna_MW = {'A': 331.2, 'T': 322.2, 'G': 347.2, 'C': 307.2}
+aa_MW = {
+    'A': 89.1,  'R': 174.2, 'N': 132.1, 'D': 133.1, 'C': 121.2,
+    'E': 147.1, 'Q': 146.2, 'G': 75.1,  'H': 155.2, 'I': 131.2,
+    'L': 131.2, 'K': 146.2, 'M': 149.2, 'F': 165.2, 'P': 115.1,
+    'S': 105.1,  'T': 119.1, 'W': 204.2,  'Y': 181.2, 'V': 117.1
+    }
 
-    rna_MW = {'A': 347.2, 'U': 324.2, 'G': 363.2, 'C': 323.2}
+# mmol of ATP spent per mmol of monomer polymerized
+atp_multipliers = {'DNA': 3.4, 'RNA': 2.4, 'AA': 4.3}
+
+# ATP and H2O are consumed, ADP and phosphate are produced
+atp_sbml = ['m1', 'm5', 'm3', 'm7']
+
+# sequence type --> (MW table, SBML ids)
+sequence_tables = {
+    'DNA': (dna_MW, sbml_dna),
+    'RNA': (rna_MW, sbml_rna),
+    'AA': (aa_MW, sbml_aa)
+    }
+
+# most used codon of each amino acid in K. phaffii
+codon_optimization ={
+    'A': 'GCU', 'C': 'UGU', 'D': 'GAC', 'E': 'GAG', 'F': 'UUC',
+    'G': 'GGU', 'H': 'CAC', 'I': 'AUU', 'K': 'AAG', 'L': 'UUG',
+    'M': 'AUG', 'N': 'AAC', 'P': 'CCA', 'Q': 'CAA', 'R': 'AGA',
+    'S': 'UCU', 'T': 'ACU', 'V': 'GUU', 'W': 'UGG', 'Y': 'UAC'
+    }
+
+#add the stop codon (UAA is the most likely for P.pastoris with 75%)
+stop_codon = 'UAA'
 
-    aa_MW = {
-        'A': 89.1,  'R': 174.2, 'N': 132.1, 'D': 133.1, 'C': 121.2,
-        'E': 147.1, 'Q': 146.2, 'G': 75.1,  'H': 155.2, 'I': 131.2,
-        'L': 131.2, 'K': 146.2, 'M': 149.2, 'F': 165.2, 'P': 115.1,
-        'S': 105.1,  'T': 119.1, 'W': 204.2,  'Y': 181.2, 'V': 117.1
-        }
 
-    seq_len = len(seq)
-    counts = {}
+def get_stoichiometry(seq, sequence_type, protein_name):
+
+    # Step 1: Get count for each amino acid (Counter keeps the order in which residues first appear, same as the old loop)
+    return stoichiometry_from_counts(dict(Counter(seq)), sequence_type, protein_name)
+
+
+def stoichiometry_from_counts(counts, sequence_type, protein_name):
+
+    # rest of get_stoichiometry once the residues are counted, counts must be in the order the residues first appear
+    # in the sequence. this lets the streaming readers count a sequence piece by piece and still get the same result
+    counts = dict(counts)
+    seq_len = sum(counts.values())
     sequence_type = sequence_type.upper() # to allow user introduce lower and uppercase (should be fixed with app, because we control the input!)
-    # Step 1: Get count for each amino acid 
-    for bp in seq:
-        if bp in counts:
-            counts[bp] += 1
-        else: 
-            counts[bp] = 1
     # we need to consider the case that some protein might not contain some specific amino acids, and we need to specify that it is 0 and tell the MW dict to get the info from
+    if sequence_type not in sequence_tables:
+        print("ERROR: The sequence type introduced is not correct. Options are DNA, RNA or AA")
+        sys.exit(1)
+    MW_dict, model_ids = sequence_tables[sequence_type]
+    invalid = [bp for bp in counts if bp not in MW_dict]
+    if invalid:
+        raise KeyError("{}: {} are not valid {} residues".format(protein_name, invalid, sequence_type))
     if sequence_type == 'AA':
-        MW_dict = aa_MW
-        model_ids = sbml_aa
         for amino_acid in sbml_aa.keys():
             if amino_acid not in counts.keys():
                 counts[amino_acid] = 0
-    elif sequence_type == 'DNA':
-        MW_dict = dna_MW
-        model_ids = sbml_dna
-    elif sequence_type == 'RNA':
-        MW_dict = rna_MW
-        model_ids = sbml_rna
-    else:
-        print("ERROR: The sequence type introduced is not correct. Options are DNA, RNA or AA")
-        sys.exit(1)
     
     # Step 2: Get gr/mol of protein for each amino acid
     gr_mol = {}
     for bp in counts:
         gr_mol[bp] = MW_dict[bp] * counts[bp] / seq_len
 
-    # Step 4: Get mmol/ gr of protein for each amino acid
+    # Step 4: Get mmol/ gr of protein for each amino acid (the total is the same for every residue, so only sum it once)
+    gr_mol_total = sum(gr_mol.values())
     mmol_gr = {}
     for bp in counts:
-        mmol_gr[bp] = round(gr_mol[bp] / sum(gr_mol.values()) / MW_dict[bp] * 1000, 5)
+        mmol_gr[bp] = round(gr_mol[bp] / gr_mol_total / MW_dict[bp] * 1000, 5)
     
     # change it to the ids used for the model, as we need it to automize the reaction definition
     mmol_gr_sbml = {}
@@ -90,17 +103,10 @@ def get_stoichiometry(seq, sequence_type, protein_name):
         mmol_gr_sbml[model_ids[bp]] = - mmol_gr[bp]
     
     # we add the ATP stoichiometry as well as ADP, water and phosphate
-    if sequence_type == 'DNA':
-        atp_multiplier = 3.4
-    elif sequence_type == 'RNA':
-        atp_multiplier = 2.4
-    elif sequence_type == 'AA':
-        atp_multiplier = 4.3
-
-    atp = sum(mmol_gr.values()) * atp_multiplier; 
+    atp = sum(mmol_gr.values()) * atp_multipliers[sequence_type]; 
 
     mmol_gr['ATP'] = round(atp, 5); 
-    for count, metabolite in enumerate(['m1', 'm5', 'm3', 'm7']):
+    for count, metabolite in enumerate(atp_sbml):
         if count < 2:
             mmol_gr_sbml[metabolite] = - round(atp, 5)
         else:
@@ -110,67 +116,325 @@ def get_stoichiometry(seq, sequence_type, protein_name):
     mmol_gr_sbml[protein_name + '_' + sequence_type] = 1 
     return mmol_gr_sbml
 
-'''
-try:
-    input_file = open(original_model_file, 'r')
-    output_file = open(new_model_file, 'w')
-except IOError as err:
-    print("Cant open file:", str(err));
-    sys.exit(1)
-
-reaction_flag = False
-
-#dict for cleaner coding
-reaction_dict = {
-    'R_r1100': [aa_stoch, sbml_id_to_aa],
-    'R_r1101': [dna_stoch, sbml_dna],
-    'R_r1103': [rna_stoch, sbml_rna]
-    }
 
-for line in input_file: 
-    
-    #copy file line by line while looking for reaction
-    if not reaction_flag:
-        output_file.write(line)
-        
-        #look for reaction ID's specified in dict
-        for reaction in reaction_dict:
-            if line.find('id="' + reaction) != -1:
-                
-                #when reaction lines found, update flag and dictionaries
-                reaction_flag = True
-                stochiometry_dict = reaction_dict[reaction][0]
-                sbml_ids = reaction_dict[reaction][1]
-    
+def count_residues(seqs, residues):
 
-    #when reaction lines are reached
-    if reaction_flag:
-        
-        #regex group 1 is the species, group 2 is the stoichiometric value
-                           #<speciesReference species="M_m1360" stoichiometry="0.997" constant="true"/>
-        regex = re.search(r'<speciesReference species="(.*)" stoichiometry="(.*)" constant="true"/>', line)
-        if regex:
-            species = regex.group(1)
-            old_stochiometry = regex.group(2)
-            
-            #M_m3, -5 and -7 are all equivalent to M_m1
-            if species in ('M_m3', 'M_m5', 'M_m7'):
-                species = 'M_m1'
-            
-            #don't edit lines with stoic. value of 1
-            if old_stochiometry == "1":
-                output_file.write(line)
-            #rewrite line with new value
-            else:
-                new_stochiometry = str(stochiometry_dict[sbml_ids[species]])
-                print(new_stochiometry)
-                output_file.write(line.replace(old_stochiometry, new_stochiometry))
-        
-        #keep copying file if reaction lines not found
+    # residue counts of a group of sequences, all sequences are joined in one byte array, every byte is translated
+    # to its column with a lookup table and the residues of all sequences are counted in a single np.bincount call
+    # everything that is not a valid residue is counted on an extra last column
+    n_seqs = len(seqs)
+    n_columns = len(residues) + 1
+    table = bytearray([len(residues)] * 256)
+    for column, residue in enumerate(residues):
+        table[ord(residue)] = column
+
+    lengths = np.fromiter(map(len, seqs), dtype=np.intp, count=n_seqs)
+    columns = np.frombuffer(''.join(seqs).encode('ascii').translate(table), dtype=np.uint8)
+    keys = np.repeat(np.arange(0, n_seqs * n_columns, n_columns, dtype=np.intp), lengths)
+    keys += columns
+    counts = np.bincount(keys, minlength=n_seqs * n_columns).reshape(n_seqs, n_columns)
+    return lengths, counts
+
+
+def first_residues(seqs, residues, prefix=256):
+
+    # position where each residue first appears in each sequence (len(seq) if it does not appear)
+    # the first residues of a sequence are enough for (almost) every residue, writing the positions
+    # backwards leaves the first occurrence. the few that are left are looked up with str.find
+    n_seqs = len(seqs)
+    n_columns = len(residues) + 1
+    table = bytearray([len(residues)] * 256)
+    for column, residue in enumerate(residues):
+        table[ord(residue)] = column
+
+    heads = [seq[:prefix] for seq in seqs]
+    window = np.fromiter(map(len, heads), dtype=np.intp, count=n_seqs)
+    columns = np.frombuffer(''.join(heads).encode('ascii').translate(table), dtype=np.uint8)
+    keys = np.repeat(np.arange(0, n_seqs * n_columns, n_columns, dtype=np.intp), window) + columns
+    positions = np.arange(len(keys)) - np.repeat(np.cumsum(window) - window, window)
+    first = np.full(n_seqs * n_columns, -1, dtype=np.intp)
+    first[keys[::-1]] = positions[::-1]
+    first = first.reshape(n_seqs, n_columns)[:, :-1]
+    for row, column in zip(*np.nonzero(first < 0)):
+        position = seqs[row].find(residues[column])
+        first[row, column] = position if position >= 0 else len(seqs[row])
+    return first
+
+
+def round_like_python(values, ndigits=5):
+
+    # np.round scales by 10**ndigits before rounding, so on exact ties it can end on the other side than python's round,
+    # those few values are rounded again with round() so the batch results are identical to get_stoichiometry
+    rounded = np.round(values, ndigits)
+    ties = near_tie(values, ndigits)
+    rounded[ties] = [round(value, ndigits) for value in values[ties].tolist()]
+    return rounded
+
+
+def near_tie(values, ndigits=5):
+
+    # values so close to a rounding tie that the last bits of the float decide where they are rounded
+    scaled = values * 10 ** ndigits
+    return np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+
+
+def get_stoichiometry_batch(seqs, sequence_type, names, chunk_size=1000):
+
+    # same calculation as get_stoichiometry but for a whole library of sequences at once
+    # the sequences are counted in chunks of chunk_size so the numpy arrays stay small enough to be fast
+    # returns the SBML ids of the columns, the product metabolite of each row and the (sequences x SBML ids) coefficient matrix,
+    # the product coefficient is always 1 so it is not stored in the matrix
+
+    sequence_type = sequence_type.upper()
+    if sequence_type not in sequence_tables:
+        print("ERROR: The sequence type introduced is not correct. Options are DNA, RNA or AA")
+        sys.exit(1)
+    MW_dict, model_ids = sequence_tables[sequence_type]
+    residues = list(model_ids.keys())
+    n_residues = len(residues)
+    sbml_ids = [model_ids[residue] for residue in residues] + atp_sbml
+    if len(seqs) == 0:
+        return sbml_ids, [], np.empty((0, len(sbml_ids)))
+
+    chunks = [count_residues(seqs[start:start + chunk_size], residues) for start in range(0, len(seqs), chunk_size)]
+    lengths = np.concatenate([chunk[0] for chunk in chunks])
+    counts = np.concatenate([chunk[1] for chunk in chunks])
+
+    invalid = np.flatnonzero(counts[:, -1])
+    if invalid.size:
+        seq = seqs[invalid[0]]
+        raise KeyError("{}: residue {!r} is not a valid {} residue".format(
+            names[invalid[0]], next(bp for bp in seq if bp not in MW_dict), sequence_type))
+    counts = counts[:, :-1]
+    # like get_stoichiometry an empty protein divides by its length 0, and an empty DNA or RNA has no bases and so only
+    # zero coefficients
+    empty = lengths == 0
+    if empty.any() and sequence_type == 'AA':
+        raise ZeroDivisionError("{}: the sequence is empty".format(names[np.flatnonzero(empty)[0]]))
+
+    # same operations as get_stoichiometry so both give identical coefficients
+    MW = np.array([MW_dict[residue] for residue in residues])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gr_mol = MW * counts / lengths[:, None]
+        mmol_gr = gr_mol / gr_mol.sum(axis=1)[:, None] / MW * 1000
+    mmol_gr[empty] = 0
+    atp = np.round(mmol_gr, 5).sum(axis=1) * atp_multipliers[sequence_type]
+
+    # get_stoichiometry sums the residues in the order they first appear in the sequence, and float sums depend on the order.
+    # this only changes the result when a value lands next to a rounding tie, so only those sequences are summed again in that order
+    # (residues missing in the sequence go last in table order, as get_stoichiometry appends them at the end)
+    redo = np.flatnonzero(near_tie(mmol_gr).any(axis=1) | near_tie(atp))
+    if redo.size:
+        order = np.argsort(first_residues([seqs[row] for row in redo], residues), axis=1, kind='stable')
+        gr_mol_redo = np.take_along_axis(gr_mol[redo], order, axis=1)
+        mmol_gr[redo] = gr_mol[redo] / np.cumsum(gr_mol_redo, axis=1)[:, -1:] / MW * 1000
+        mmol_gr_redo = np.take_along_axis(round_like_python(mmol_gr[redo]), order, axis=1)
+        atp[redo] = np.cumsum(mmol_gr_redo, axis=1)[:, -1] * atp_multipliers[sequence_type]
+    mmol_gr = round_like_python(mmol_gr)
+    atp = round_like_python(atp)
+
+    coefficients = np.empty((len(seqs), n_residues + len(atp_sbml)))
+    coefficients[:, :n_residues] = - mmol_gr
+    coefficients[:, n_residues:n_residues + 2] = - atp[:, None]
+    coefficients[:, n_residues + 2:] = atp[:, None]
+
+    products = [name + '_' + sequence_type for name in names]
+    return sbml_ids, products, coefficients
+
+
+def batch_to_stoichiometry(sbml_ids, product, row, sequence_type):
+
+    # turn one row of get_stoichiometry_batch back into the dict given by get_stoichiometry,
+    # for DNA and RNA get_stoichiometry only lists the bases present in the sequence
+    sequence_type = sequence_type.upper()
+    mmol_gr_sbml = {}
+    for sbml_id, coefficient in zip(sbml_ids, row):
+        if sequence_type != 'AA' and sbml_id not in atp_sbml and coefficient == 0:
+            continue
+        mmol_gr_sbml[sbml_id] = float(coefficient)
+    mmol_gr_sbml[product] = 1
+    return mmol_gr_sbml
+
+
+def codon_table_from_usage(usage):
+
+    # build a codon table from a codon usage table {codon: (amino acid, frequency)}, as given by codon usage databases
+    # (stop codons with '*' as amino acid). the most used codon of each amino acid is taken, returns (codon table, stop codon)
+    best = {}
+    for codon, (amino_acid, frequency) in usage.items():
+        codon = codon.upper().replace('T', 'U')
+        if amino_acid not in best or frequency > best[amino_acid][1]:
+            best[amino_acid] = (codon, frequency)
+    stop = best.pop('*', (stop_codon, 0))[0]
+    return {amino_acid: codon for amino_acid, (codon, _) in best.items()}, stop
+
+
+def back_translate_batch(aa_seqs, codon_table=codon_optimization, stop=stop_codon):
+
+    # codon optimized RNA and DNA (coding strand) of a list of proteins
+    # all proteins are joined in one byte array and every amino acid is replaced by its codon with a single lookup in a
+    # (256 x 3) codon array, instead of adding the codons one by one to a string. the DNA is the same bytes with U --> T
+    # the stop codon is added at the end unless the sequence already ends with '*'
+    aa_seqs = [aa_seq if aa_seq.endswith('*') else aa_seq + '*' for aa_seq in aa_seqs]
+    codons = np.zeros((256, 3), dtype=np.uint8)
+    valid = np.zeros(256, dtype=bool)
+    for amino_acid, codon in list(codon_table.items()) + [('*', stop)]:
+        codons[ord(amino_acid)] = np.frombuffer(codon.upper().replace('T', 'U').encode('ascii'), dtype=np.uint8)
+        valid[ord(amino_acid)] = True
+
+    encoded = np.frombuffer(''.join(aa_seqs).encode('ascii'), dtype=np.uint8)
+    if not valid[encoded].all():
+        raise KeyError("{!r} have no codon in the codon table".format(
+            sorted(set(chr(byte) for byte in np.unique(encoded[~valid[encoded]])))))
+    RNA_bytes = codons[encoded].tobytes()
+    DNA_bytes = RNA_bytes.translate(bytes.maketrans(b'U', b'T'))
+
+    ends = (np.cumsum(np.fromiter(map(len, aa_seqs), dtype=np.intp, count=len(aa_seqs))) * 3).tolist()
+    starts = [0] + ends[:-1]
+    RNA_seqs = [RNA_bytes[start:end].decode('ascii') for start, end in zip(starts, ends)]
+    DNA_seqs = [DNA_bytes[start:end].decode('ascii') for start, end in zip(starts, ends)]
+    return RNA_seqs, DNA_seqs
+
+
+def back_translate(aa_seq, codon_table=codon_optimization, stop=stop_codon):
+
+    RNA_seqs, DNA_seqs = back_translate_batch([aa_seq], codon_table, stop)
+    return RNA_seqs[0], DNA_seqs[0]
+
+
+def get_construct_stoichiometry(aa_seq, protein_name, codon_table=codon_optimization, stop=stop_codon):
+
+    # the DNA, RNA and AA synthesis stoichiometries of a protein from its amino acid sequence only,
+    # DNA and RNA come from the codon optimized back translation
+    RNA_seq, DNA_seq = back_translate(aa_seq, codon_table, stop)
+    return {
+        'DNA': get_stoichiometry(DNA_seq, 'DNA', protein_name),
+        'RNA': get_stoichiometry(RNA_seq, 'RNA', protein_name),
+        'AA': get_stoichiometry(aa_seq.rstrip('*'), 'AA', protein_name)
+        }
+
+
+def get_construct_stoichiometry_batch(aa_seqs, names, codon_table=codon_optimization, stop=stop_codon):
+
+    # same as get_construct_stoichiometry for a whole proteome, gives the get_stoichiometry_batch output of each sequence type
+    RNA_seqs, DNA_seqs = back_translate_batch(aa_seqs, codon_table, stop)
+    return {
+        'DNA': get_stoichiometry_batch(DNA_seqs, 'DNA', names),
+        'RNA': get_stoichiometry_batch(RNA_seqs, 'RNA', names),
+        'AA': get_stoichiometry_batch([aa_seq.rstrip('*') for aa_seq in aa_seqs], 'AA', names)
+        }
+
+
+def tables_fingerprint():
+
+    # hash of every table the stoichiometry depends on, if any MW, SBML id or ATP value is changed the cache keys change too
+    # so old results are never used again
+    tables = [sequence_tables, atp_multipliers, atp_sbml]
+    return hashlib.sha256(json.dumps(tables, sort_keys=True).encode()).hexdigest()
+
+
+class StoichiometryCache:
+
+    # content-addressed cache for get_stoichiometry: an in-process LRU in front of a directory with one json file per result
+    # the key is the hash of (sequence, sequence type, lookup tables), the protein name only changes the product id
+    # so it is left out of the key and added back when the result is returned
+
+    def __init__(self, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), '.stoichiometry_cache'), maxsize=1024):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, seq, sequence_type, fingerprint):
+        digest = hashlib.sha256(fingerprint.encode())
+        digest.update(sequence_type.encode())
+        digest.update(seq.encode())
+        return digest.hexdigest()
+
+    def get_stoichiometry(self, seq, sequence_type, protein_name):
+        sequence_type = sequence_type.upper()
+        fingerprint = tables_fingerprint()
+        key = self.key(seq, sequence_type, fingerprint)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            stoichiometry = self.memory[key]
         else:
-            output_file.write(line)
-            
-            #update flag if end of reaction lines
-            if line.find('</listOfProducts>') != -1:
-                reaction_flag = False
-'''
\ No newline at end of file
+            stoichiometry = self.load(key, fingerprint)
+            if stoichiometry is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                stoichiometry = get_stoichiometry(seq, sequence_type, protein_name)
+                del stoichiometry[protein_name + '_' + sequence_type]
+                self.save(key, fingerprint, stoichiometry)
+            self.memory[key] = stoichiometry
+            if len(self.memory) > self.maxsize:
+                self.memory.popitem(last=False)
+        mmol_gr_sbml = dict(stoichiometry)
+        mmol_gr_sbml[protein_name + '_' + sequence_type] = 1
+        return mmol_gr_sbml
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def load(self, key, fingerprint):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key)) as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if entry.get('tables') != fingerprint:
+            return None
+        # stored as pairs so the order of the dict is kept
+        return dict(entry['stoichiometry'])
+
+    def save(self, key, fingerprint, stoichiometry):
+        if self.directory is None:
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first so parallel runs never read half written entries
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary, 'w') as handle:
+            json.dump({'tables': fingerprint, 'stoichiometry': list(stoichiometry.items())}, handle)
+        os.replace(temporary, path)
+
+    def prune(self):
+        # remove the files computed with other lookup tables, returns how many were removed
+        if self.directory is None or not os.path.isdir(self.directory):
+            return 0
+        fingerprint = tables_fingerprint()
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    with open(path) as handle:
+                        stale = json.load(handle).get('tables') != fingerprint
+                except (OSError, ValueError):
+                    stale = True
+                if stale:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def clear(self):
+        self.memory.clear()
+        if self.directory is not None and os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    os.remove(os.path.join(root, name))
+
+
+default_cache = StoichiometryCache()
+
+
+def cached_stoichiometry(seq, sequence_type, protein_name):
+
+    # drop-in replacement of get_stoichiometry that goes through default_cache
+    return default_cache.get_stoichiometry(seq, sequence_type, protein_name)
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+
+# sweeps of two exchange reactions of the model (phenotype phase planes), like optimal_conditions in the notebook
+# the grid is split in bands of rows that are solved in parallel, every worker process gets the model only once
+# every cell keeps the solver status, so infeasible conditions (nan) are not mixed up with a production of 0
+# the cells are visited in serpentine order (each row in the opposite direction of the one before) so two LPs in a row
+# only differ in one bound, only that bound is changed in the solver and it starts from the last optimal basis
+# adaptive_sweep solves a coarse grid first and only refines the cells where the objective is not linear
+
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+import model_gsm
+
+# model of the worker process, set once by worker_init
+worker_model = None
+
+
+def worker_init(source, objective):
+
+    # source is a cobra model (sent once to every worker) or the path of an SBML file loaded with model_gsm.load_model
+    global worker_model
+    worker_model = model_gsm.load_model(source) if isinstance(source, str) else source
+    if objective is not None:
+        worker_model.objective = objective
+
+
+def uptake_bounds(value, fixed):
+
+    # fixed forces the flux to value (what optimal_conditions does), otherwise value is only the upper bound
+    return (value, value) if fixed else (0, value)
+
+
+def set_flux_bounds(reaction, lower_bound, upper_bound):
+
+    # same bounds as reaction.bounds = lower_bound, upper_bound gives in the solver (forward and reverse variables)
+    # but only the variables whose bounds change are touched. the bounds cobra keeps in the reaction are not updated,
+    # so reaction.bounds has to be set again at the end
+    if lower_bound > 0:
+        forward, reverse = (lower_bound, upper_bound), (0, 0)
+    elif upper_bound < 0:
+        forward, reverse = (0, 0), (-upper_bound, -lower_bound)
+    else:
+        forward, reverse = (0, upper_bound), (0, -lower_bound)
+    for variable, (lb, ub) in ((reaction.forward_variable, forward), (reaction.reverse_variable, reverse)):
+        if variable.lb != lb or variable.ub != ub:
+            variable.set_bounds(lb, ub)
+
+
+def solver_iterations(model):
+
+    # simplex iterations (pivots) done so far by the solver, None if we do not know how to ask it (only GLPK for now)
+    if model.solver.interface.__name__ == 'optlang.glpk_interface':
+        import swiglpk
+        return swiglpk.glp_get_it_cnt(model.solver.problem)
+    return None
+
+
+def reset_basis(model):
+
+    # forget the last optimal basis so the next LP is solved from scratch
+    if model.solver.interface.__name__ == 'optlang.glpk_interface':
+        import swiglpk
+        swiglpk.glp_std_basis(model.solver.problem)
+
+
+def solve_rows(model, reaction_x, values_x, reaction_y, values_y, rows, fixed, warm_start=True):
+
+    # objective value, solver status, pivots and wall time of every cell of the given rows (y index) of the grid
+    # without warm_start the cells are visited row by row and every LP starts from scratch, to compare with
+    x = model.reactions.get_by_id(reaction_x)
+    y = model.reactions.get_by_id(reaction_y)
+    shape = (len(rows), len(values_x))
+    objective = np.full(shape, np.nan)
+    status = np.empty(shape, dtype=object)
+    pivots = np.full(shape, -1, dtype=np.int64)
+    times = np.zeros(shape)
+    for row, i in enumerate(rows):
+        set_flux_bounds(y, *uptake_bounds(values_y[i], fixed))
+        columns = range(len(values_x)) if not warm_start or row % 2 == 0 else range(len(values_x) - 1, -1, -1)
+        for j in columns:
+            set_flux_bounds(x, *uptake_bounds(values_x[j], fixed))
+            if not warm_start:
+                reset_basis(model)
+            before = solver_iterations(model)
+            start = time.perf_counter()
+            status[row, j] = model.solver.optimize()
+            if status[row, j] == 'optimal':
+                objective[row, j] = model.solver.objective.value
+            times[row, j] = time.perf_counter() - start
+            if before is not None:
+                pivots[row, j] = solver_iterations(model) - before
+    return objective, status, pivots, times
+
+
+def worker_rows(task):
+
+    rows, (reaction_x, values_x, reaction_y, values_y, fixed, warm_start) = task
+    result = solve_rows(worker_model, reaction_x, values_x, reaction_y, values_y, rows, fixed, warm_start)
+    # the bounds cobra keeps were not updated by solve_rows, setting them puts the solver back as it was
+    for reaction in (reaction_x, reaction_y):
+        worker_model.reactions.get_by_id(reaction).bounds = worker_model.reactions.get_by_id(reaction).bounds
+    return (rows,) + result
+
+
+def sweep(model, reaction_x, values_x, reaction_y, values_y, objective=None, fixed=True, processes=None, bands=None,
+          warm_start=True):
+
+    # solves the model for every pair of values of reaction_x (columns) and reaction_y (rows)
+    # model is a cobra model or the path of an SBML file, objective a reaction id (None keeps the one of the model)
+    # returns a dict with the x and y values and, as arrays of shape (len(values_y), len(values_x)), the objective values
+    # (nan where the solver found no optimum), the solver status of every cell ('optimal', 'infeasible', ...),
+    # the pivots the solver needed (-1 if the solver does not tell) and the wall time of every LP
+    # processes=1 runs in this process, the bounds and objective of the model are put back afterwards
+    values_x = np.asarray(values_x, dtype=float)
+    values_y = np.asarray(values_y, dtype=float)
+    processes = processes or os.cpu_count()
+    keys = ['objective', 'status', 'pivots', 'time']
+    result = {'x': values_x, 'y': values_y}
+
+    if processes == 1:
+        if isinstance(model, str):
+            model = model_gsm.load_model(model)
+        saved = {reaction: model.reactions.get_by_id(reaction).bounds for reaction in (reaction_x, reaction_y)}
+        saved_objective = model.objective
+        try:
+            if objective is not None:
+                model.objective = objective
+            result.update(zip(keys, solve_rows(model, reaction_x, values_x, reaction_y, values_y, range(len(values_y)),
+                                               fixed, warm_start)))
+        finally:
+            model.objective = saved_objective
+            for reaction, bounds in saved.items():
+                model.reactions.get_by_id(reaction).bounds = bounds
+        return result
+
+    shape = (len(values_y), len(values_x))
+    result.update(objective=np.full(shape, np.nan), status=np.empty(shape, dtype=object),
+                  pivots=np.full(shape, -1, dtype=np.int64), time=np.zeros(shape))
+    # a few bands per process so the ones that finish early get more work (infeasible cells solve faster)
+    bands = bands or 4 * processes
+    arguments = (reaction_x, values_x, reaction_y, values_y, fixed, warm_start)
+    tasks = [(list(rows), arguments) for rows in np.array_split(np.arange(len(values_y)), bands) if len(rows)]
+    with multiprocessing.Pool(processes, initializer=worker_init, initargs=(model, objective)) as pool:
+        for rows, *values in pool.imap_unordered(worker_rows, tasks):
+            for key, value in zip(keys, values):
+                result[key][rows] = value
+    return result
+
+
+def sweep_report(result):
+
+    # summary of the pivots and LP times of a sweep
+    solved = result['pivots'] >= 0
+    print("{} LPs in {:.2f} s ({:.1f} ms per LP), {} pivots per LP on average, {} at most".format(
+        result['time'].size, result['time'].sum(), 1000 * result['time'].mean(),
+        '{:.1f}'.format(result['pivots'][solved].mean()) if solved.any() else '?',
+        result['pivots'].max() if solved.any() else '?'))
+
+
+def environment_sweep(model, reaction_x, max_x, reaction_y, max_y, precision=100, objective=None, fixed=True, processes=None,
+                      warm_start=True):
+
+    # precision x precision grid from 0 to max_x and max_y, as in optimal_conditions
+    return sweep(model, reaction_x, np.linspace(0, max_x, precision), reaction_y, np.linspace(0, max_y, precision),
+                 objective, fixed, processes, warm_start=warm_start)
+
+
+def test_points(i0, i1, j0, j1):
+
+    # points solved to decide if a cell is linear, they are the new corners if it has to be split
+    im, jm = (i0 + i1) // 2, (j0 + j1) // 2
+    if i1 - i0 <= 1:
+        return [(i0, jm), (i1, jm)]
+    if j1 - j0 <= 1:
+        return [(im, j0), (im, j1)]
+    return [(im, jm)]
+
+
+def cell_is_linear(cell, corners, tests, tolerance):
+
+    # corners: objective at i0 j0, i0 j1, i1 j0, i1 j1, tests: {point of test_points: (objective, status)}
+    # the optimum of an LP is a concave function of its bounds, so it is above the plane through the corners everywhere
+    # in the cell, if it is on that plane at a point inside the cell it is on it in the whole cell (on the two edges
+    # if the cell is one grid step thin)
+    v00, v01, v10, v11 = corners
+    if abs(v00 + v11 - v01 - v10) > tolerance:
+        return False
+    i0, i1, j0, j1 = cell
+    for (i, j), (value, status) in tests.items():
+        u = (i - i0) / (i1 - i0) if i1 > i0 else 0
+        v = (j - j0) / (j1 - j0) if j1 > j0 else 0
+        if status != 'optimal' or abs(value - (v00 + u * (v10 - v00) + v * (v01 - v00))) > tolerance:
+            return False
+    return True
+
+
+def adaptive_sweep(model, reaction_x, max_x, reaction_y, max_y, precision=100, objective=None, fixed=True, coarse=8,
+                   tolerance=1e-6):
+
+    # same grid and result as environment_sweep, but starting from a coarse grid of about coarse x coarse cells
+    # that are split in 4 until the objective is linear in every cell (see cell_is_linear) or the cell is infeasible,
+    # the grid points inside are then interpolated from the corners. result['solved'] tells which cells got an LP,
+    # result['lps'] is the number of LPs solved
+    # runs in this process, the bounds and objective of the model are put back afterwards
+    if isinstance(model, str):
+        model = model_gsm.load_model(model)
+    values_x = np.linspace(0, max_x, precision)
+    values_y = np.linspace(0, max_y, precision)
+    shape = (precision, precision)
+    result = {'x': values_x, 'y': values_y, 'objective': np.full(shape, np.nan), 'status': np.empty(shape, dtype=object),
+              'solved': np.zeros(shape, dtype=bool), 'lps': 0}
+    x = model.reactions.get_by_id(reaction_x)
+    y = model.reactions.get_by_id(reaction_y)
+    saved = {reaction: reaction.bounds for reaction in (x, y)}
+    saved_objective = model.objective
+    solved = {}
+
+    def solve(i, j):
+        if (i, j) not in solved:
+            set_flux_bounds(y, *uptake_bounds(values_y[i], fixed))
+            set_flux_bounds(x, *uptake_bounds(values_x[j], fixed))
+            status = model.solver.optimize()
+            solved[(i, j)] = (model.solver.objective.value if status == 'optimal' else np.nan, status)
+        return solved[(i, j)]
+
+    def cell_infeasible(i0, i1, j0, j1):
+        # one LP with the bounds of the reactions covering the whole cell, if it is infeasible so is every point in it
+        # (some corners can be infeasible while a thin feasible region goes between them)
+        for reaction, first, last in ((y, values_y[i0], values_y[i1]), (x, values_x[j0], values_x[j1])):
+            (lb0, ub0), (lb1, ub1) = uptake_bounds(first, fixed), uptake_bounds(last, fixed)
+            set_flux_bounds(reaction, min(lb0, lb1), max(ub0, ub1))
+        result['lps'] += 1
+        return model.solver.optimize() == 'infeasible'
+
+    try:
+        if objective is not None:
+            model.objective = objective
+        step = max(1, (precision - 1) // coarse)
+        edges = list(range(0, precision - 1, step)) + [precision - 1]
+        # cells as (first row, last row, first column, last column), the corners of a cell are shared with its neighbours
+        cells = [(i0, i1, j0, j1) for i0, i1 in zip(edges, edges[1:]) for j0, j1 in zip(edges, edges[1:])]
+        if precision == 1:
+            cells = [(0, 0, 0, 0)]
+        while cells:
+            cell = cells.pop()
+            i0, i1, j0, j1 = cell
+            corners = [solve(i, j) for i in (i0, i1) for j in (j0, j1)]
+            if i1 - i0 <= 1 and j1 - j0 <= 1:
+                continue
+            statuses = {status for _, status in corners}
+            if statuses == {'infeasible'} and cell_infeasible(*cell):
+                fill_cell(result, cell, corners)
+                continue
+            if statuses == {'optimal'} and cell_is_linear(cell, [value for value, _ in corners],
+                                                          {point: solve(*point) for point in test_points(*cell)}, tolerance):
+                fill_cell(result, cell, corners)
+                continue
+            rows = [(i0, i1)] if i1 - i0 <= 1 else [(i0, (i0 + i1) // 2), ((i0 + i1) // 2, i1)]
+            columns = [(j0, j1)] if j1 - j0 <= 1 else [(j0, (j0 + j1) // 2), ((j0 + j1) // 2, j1)]
+            cells.extend((a, b, c, d) for a, b in rows for c, d in columns)
+    finally:
+        model.objective = saved_objective
+        for reaction, bounds in saved.items():
+            reaction.bounds = bounds
+
+    # the LPs solved are exact, whatever was interpolated around them
+    for (i, j), (value, status) in solved.items():
+        result['objective'][i, j] = value
+        result['status'][i, j] = status
+        result['solved'][i, j] = True
+    result['lps'] += len(solved)
+    return result
+
+
+def fill_cell(result, cell, corners):
+
+    # bilinear interpolation of the 4 corners (i0 j0, i0 j1, i1 j0, i1 j1) over the cell, non-optimal cells are nan
+    i0, i1, j0, j1 = cell
+    (v00, status), (v01, _), (v10, _), (v11, _) = corners
+    u = np.linspace(0, 1, i1 - i0 + 1)[:, None]
+    v = np.linspace(0, 1, j1 - j0 + 1)[None, :]
+    result['objective'][i0:i1 + 1, j0:j1 + 1] = (1 - u) * (1 - v) * v00 + (1 - u) * v * v01 + u * (1 - v) * v10 + u * v * v11
+    result['status'][i0:i1 + 1, j0:j1 + 1] = status
+
+
+# conversion of pMMO_uptake_capacity in the notebook: weight of a pMMO molecule (g), Avogadro's number and
+# the fraction of the cell dry weight that is protein
+pMMO_weight = 4.981620599999999e-20
+avogadro = 6.0221409e+23
+cell_protein = 0.5
+
+
+def methane_ml_to_mmol_at_37(ml):
+    return ml * 0.623 / 0.01604
+
+
+def pMMO_capacity(pMMO_percent):
+
+    # mmol of methane/gDW/h the pMMO can oxidize when it is pMMO_percent % of the cell protein (numbers or arrays)
+    # g of pMMO --> molecules --> mmol, 1000 because of mmol <-> mol, 3600 s <-> h
+    return ((pMMO_percent / 100) * cell_protein) / pMMO_weight / avogadro * 1000 * 3600
+
+
+def limit_curve(model, reactions, limits, tolerance=1e-6):
+
+    # optimum of the model for every value of limits (sorted, no repeats) used as upper bound of all the reactions
+    # a higher limit only relaxes the LP, so below the first feasible limit everything is infeasible, and the optimum
+    # is concave in the limit: if it is on the line between two solved limits at a point in between, it is on it
+    # for all the limits in between. intervals are split until that holds and the LPs of each round are solved
+    # together in increasing order (warm start). returns objective values (nan where infeasible), statuses, LPs solved
+    limits = np.asarray(limits, dtype=float)
+    objective = np.full(len(limits), np.nan)
+    status = np.empty(len(limits), dtype=object)
+    known = np.zeros(len(limits), dtype=bool)
+    lps = 0
+
+    def solve_batch(indices):
+        for k in sorted(set(indices)):
+            if not known[k]:
+                for reaction in reactions:
+                    set_flux_bounds(reaction, 0, limits[k])
+                status[k] = model.solver.optimize()
+                if status[k] == 'optimal':
+                    objective[k] = model.solver.objective.value
+                known[k] = True
+        return len(set(indices))
+
+    last = len(limits) - 1
+    lps += solve_batch([0, last])
+    intervals = [(0, last)]
+    while intervals:
+        # the points to solve for the intervals that are not settled yet
+        checks = {}
+        for a, b in intervals:
+            if b - a <= 1:
+                continue
+            if status[b] != 'optimal':
+                # nothing below an infeasible limit is feasible
+                status[a:b] = status[b]
+                known[a:b] = True
+                continue
+            checks[(a, b)] = (a + b) // 2
+        lps += solve_batch([k for k in checks.values() if not known[k]])
+        intervals = []
+        for (a, b), m in checks.items():
+            if status[a] == 'optimal' and status[m] == 'optimal':
+                line = objective[a] + (objective[b] - objective[a]) * (limits[m] - limits[a]) / (limits[b] - limits[a])
+                if abs(objective[m] - line) <= tolerance:
+                    objective[a:b + 1] = np.interp(limits[a:b + 1], limits[[a, b]], objective[[a, b]])
+                    status[a:b + 1] = 'optimal'
+                    known[a:b + 1] = True
+                    continue
+            intervals.extend([(a, m), (m, b)])
+    return objective, status, lps
+
+
+def pMMO_uptake_capacity(model, precision=0.1, max_pMMO_percent=30, methane_step=0.0001, max_methane=0.051,
+                         uptake='r_uptake_methane', oxidation='r_methane_oxidation', objective=None):
+
+    # same matrix as pMMO_uptake_capacity in the notebook: optimum of the model for every percentage of pMMO in the
+    # cell protein (columns, from 0 to max_pMMO_percent by precision) and methane uptake in ml/gDW/h (rows, from 0 to
+    # max_methane by methane_step), as a pandas DataFrame (nan where infeasible), the LPs solved are in .attrs['lps']
+    # the methane taken up can only go through the pMMO, so every cell is the optimum with the flux of both reactions
+    # limited to the lowest of the two bounds: only one LP curve over those limits is needed (see limit_curve)
+    import pandas as pd
+
+    uptake = model.reactions.get_by_id(uptake)
+    oxidation = model.reactions.get_by_id(oxidation)
+    for metabolite in uptake.metabolites:
+        if {reaction.id for reaction in metabolite.reactions} != {uptake.id, oxidation.id}:
+            raise ValueError("{} is not only made by {} and used by {}".format(metabolite.id, uptake.id, oxidation.id))
+
+    pMMO_percentages = np.arange(0, max_pMMO_percent + precision, precision)
+    methane_concentrations = np.arange(0, max_methane, methane_step)
+    limits = np.minimum(methane_ml_to_mmol_at_37(methane_concentrations)[:, None], pMMO_capacity(pMMO_percentages)[None, :])
+    unique_limits, cells = np.unique(limits, return_inverse=True)
+
+    saved = {reaction: reaction.bounds for reaction in (uptake, oxidation)}
+    saved_objective = model.objective
+    try:
+        if objective is not None:
+            model.objective = objective
+        curve, _, lps = limit_curve(model, [uptake, oxidation], unique_limits)
+    finally:
+        model.objective = saved_objective
+        for reaction, bounds in saved.items():
+            reaction.bounds = bounds
+
+    capacity = pd.DataFrame(curve[cells.reshape(limits.shape)],
+                            index=pd.Index(methane_concentrations, name='methane_ml'),
+                            columns=pd.Index(pMMO_percentages, name='pMMO_percent'))
+    capacity.attrs['lps'] = lps
+    return capacity
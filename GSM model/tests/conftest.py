@@ -0,0 +1,16 @@
+# the modules of the GSM model are flat files next to the notebook, the tests import them like the notebook does
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def workflow_model():
+
+    # the model of the notebook (pheast_final), loaded once. tests that change it do it inside `with model:`
+    import benchmark_gsm
+    return benchmark_gsm.workflow_model()
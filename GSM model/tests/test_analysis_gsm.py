@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from cobra.util.array import create_stoichiometric_matrix
+
+import analysis_gsm
+
+
+@pytest.fixture(scope='module')
+def textbook():
+
+    # the E. coli core model of cobra, small enough to sample in a test
+    import cobra
+    return cobra.io.load_model('textbook')
+
+
+def test_samples_are_feasible(textbook, tmp_path):
+
+    path = str(tmp_path / 'samples.npy')
+    diagnostics = analysis_gsm.sample_fluxes(textbook, path, 200, chains=2, thinning=20, batch_size=30, seed=1,
+                                             processes=1)
+    samples, reactions = analysis_gsm.read_samples(path)
+    assert reactions == [reaction.id for reaction in textbook.reactions] and samples.shape == (200, len(reactions))
+    assert np.abs(create_stoichiometric_matrix(textbook) @ np.asarray(samples).T).max() < 1e-6
+    bounds = np.array([reaction.bounds for reaction in textbook.reactions])
+    assert (samples >= bounds[:, 0] - 1e-6).all() and (samples <= bounds[:, 1] + 1e-6).all()
+    assert np.allclose(diagnostics['mean'], np.asarray(samples).mean(axis=0))
+    assert diagnostics['rhat'].notna().any()
+
+
+def test_selected_reactions(textbook, tmp_path):
+
+    path = str(tmp_path / 'samples.npy')
+    analysis_gsm.sample_fluxes(textbook, path, 20, reactions=['EX_*'], chains=1, thinning=10, seed=1, processes=1)
+    samples, reactions = analysis_gsm.read_samples(path)
+    assert reactions == [reaction.id for reaction in textbook.reactions if reaction.id.startswith('EX_')]
+    assert samples.shape == (20, len(reactions))
+
+
+def test_missing_cobra_internals(textbook, tmp_path, monkeypatch):
+
+    # another cobra without the internals the chains use fails before the warmup points are made
+    monkeypatch.setattr(analysis_gsm, 'step', None)
+    with pytest.raises(ImportError, match='cobra.sampling.core.step'):
+        analysis_gsm.sample_fluxes(textbook, str(tmp_path / 'samples.npy'), 10, processes=1)
+    monkeypatch.undo()
+    with pytest.raises(ImportError, match='_reproject'):
+        analysis_gsm.check_sampler(object())
@@ -0,0 +1,69 @@
+import itertools
+import json
+import random
+
+import pandas as pd
+import pytest
+
+import deletion_gsm
+
+# genes of reactions with flux in pheast_final, their knockouts lower the production without killing the cell
+flux_genes = ['PAS_chr2-1_0437', 'PAS_chr2-1_0769', 'PAS_chr1-4_0292', 'PAS_chr3_0082', 'PAS_chr3_0951',
+                'PAS_chr1-4_0338', 'PAS_chr4_0821', 'PAS_chr4_0152']
+
+
+def cobra_disabled(model, knockout):
+
+    return [reaction.id for reaction in model.reactions
+            if reaction.gpr.body is not None and not reaction.gpr.eval(set(knockout))]
+
+
+def test_compiled_gpr_matches_cobra(workflow_model):
+
+    model = workflow_model
+    compiled = deletion_gsm.CompiledGPR(model)
+    genes = [gene.id for gene in model.genes]
+    rng = random.Random(0)
+    knockouts = [[gene] for gene in genes] + [rng.sample(genes, size) for size in (2, 3, 5) for _ in range(200)]
+    for knockout, disabled in zip(knockouts, compiled.disabled_reactions(knockouts)):
+        assert disabled == cobra_disabled(model, knockout), knockout
+
+
+def test_group_shares_the_disabled_reactions(workflow_model):
+
+    compiled = deletion_gsm.CompiledGPR(workflow_model)
+    knockouts = [list(pair) for pair in itertools.combinations(flux_genes, 2)] + [[gene] for gene in flux_genes]
+    groups = compiled.group(knockouts)
+    assert sorted(map(tuple, (member for _, members in groups for member in members))) == sorted(map(tuple, knockouts))
+    for reactions, members in groups:
+        for member in members:
+            assert reactions == cobra_disabled(workflow_model, member)
+
+
+def test_knockout_search_resumes_from_checkpoint(workflow_model, tmp_path, monkeypatch):
+
+    model = workflow_model
+    # the beam keeps every candidate: the productions of these designs differ only by solver noise (about 1e-9), which
+    # depends on the bases the LPs start from, so a narrow beam could pick other designs in the two searches
+    settings = {'genes': [gene.id for gene in model.genes][:30], 'beam_width': 100, 'processes': 1}
+    full = deletion_gsm.knockout_search(model, max_knockouts=2, **settings)
+    checkpoint = str(tmp_path / 'search.json')
+    deletion_gsm.knockout_search(model, max_knockouts=1, checkpoint=checkpoint, **settings)
+    with open(checkpoint) as handle:
+        state = json.load(handle)
+    assert state['size'] == 1 and state['frontier']
+    # the second run goes on from the frontier of the first one and only evaluates designs that are not in its cache
+    evaluated = []
+    evaluate_design = deletion_gsm.evaluate_design
+
+    def counting(model, reactions, *args, **kwargs):
+        evaluated.append(';'.join(reactions))
+        return evaluate_design(model, reactions, *args, **kwargs)
+
+    monkeypatch.setattr(deletion_gsm, 'evaluate_design', counting)
+    resumed = deletion_gsm.knockout_search(model, max_knockouts=2, checkpoint=checkpoint, **settings)
+    assert evaluated and not set(evaluated) & set(state['cache'])
+    pd.testing.assert_frame_equal(resumed.sort_values('ids', ignore_index=True), full.sort_values('ids', ignore_index=True),
+                                  check_exact=False, atol=1e-7)
+    with pytest.raises(ValueError):
+        deletion_gsm.knockout_search(model, max_knockouts=2, checkpoint=checkpoint, **dict(settings, beam_width=3))
@@ -0,0 +1,69 @@
+import numpy as np
+
+import lp_gsm
+
+
+def test_cache_hit_and_bound_changes(workflow_model):
+
+    model = workflow_model
+    cache = lp_gsm.SolutionCache()
+    solution = cache.optimize(model)
+    assert cache.optimize(model) is solution and (cache.hits, cache.misses) == (1, 1)
+    with model:
+        model.reactions.r_uptake_methane.upper_bound = 1.8
+        limited = cache.optimize(model)
+        assert cache.misses == 2 and limited.objective_value < solution.objective_value
+    # the context puts the bound back, the first solution is found again
+    assert cache.optimize(model) is solution and cache.misses == 2
+
+
+def test_cache_sees_objective_and_constraints(workflow_model):
+
+    model = workflow_model
+    cache = lp_gsm.SolutionCache()
+    key = cache.key(model)
+    with model:
+        model.objective = 'r1339'
+        assert cache.key(model) != key
+    with model:
+        model.add_cons_vars([model.problem.Constraint(model.reactions.r1339.flux_expression, lb=0.01,
+                                                      name='minimum_growth')])
+        constrained = cache.key(model)
+        assert constrained != key
+        model.constraints.minimum_growth.lb = 0.02
+        assert cache.key(model) != constrained
+    assert cache.key(model) == key
+
+
+def test_cache_sees_structure_changes(workflow_model):
+
+    model = workflow_model
+    cache = lp_gsm.SolutionCache()
+    key = cache.key(model)
+    with model:
+        model.remove_reactions([model.reactions.r_methane_oxidation])
+        assert cache.key(model) != key
+    # the context puts the reaction back at the end, which is another order of the variables
+    key = cache.key(model)
+    with model:
+        model.reactions.hemo_Biosynthesis.add_metabolites({model.metabolites.hemo_AA: -0.5})
+        # a coefficient changed in place keeps the fingerprint, only invalidate makes the structure hashed again
+        assert cache.key(model) == key
+        cache.invalidate(model)
+        changed = cache.key(model)
+        assert changed != key and cache.structure(model)[0] == lp_gsm.structure_hash(model)
+    cache.invalidate(model)
+    assert cache.structure(model)[0] == lp_gsm.structure_hash(model)
+
+
+def test_disk_cache(workflow_model, tmp_path):
+
+    model = workflow_model
+    lp_gsm.SolutionCache(str(tmp_path)).optimize(model)
+    cache = lp_gsm.SolutionCache(str(tmp_path))
+    solution = cache.optimize(model)
+    assert (cache.disk_hits, cache.misses) == (1, 0)
+    assert np.isclose(solution.objective_value, model.slim_optimize())
+    cache.clear()
+    cache.optimize(model)
+    assert cache.misses == 1
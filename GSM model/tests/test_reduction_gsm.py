@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from cobra.util.array import create_stoichiometric_matrix
+
+import reduction_gsm
+
+
+@pytest.fixture(scope='module')
+def reduced(workflow_model):
+
+    return reduction_gsm.reduce_model(workflow_model, bounds={'r_uptake_methane': (0, 10)})
+
+
+def test_expand_is_mass_balanced(workflow_model, reduced):
+
+    # the fluxes of the reduced model put back on the full model balance every metabolite and stay in the bounds
+    model = workflow_model
+    solution = reduced.model.optimize()
+    fluxes = reduced.expand(solution)[[reaction.id for reaction in model.reactions]]
+    S = create_stoichiometric_matrix(model)
+    assert np.abs(S @ fluxes.values).max() < 1e-8
+    bounds = np.array([reaction.bounds for reaction in model.reactions])
+    assert (fluxes.values >= bounds[:, 0] - 1e-8).all() and (fluxes.values <= bounds[:, 1] + 1e-8).all()
+    assert np.isclose(solution.objective_value, model.slim_optimize(), rtol=1e-7)
+
+
+def test_same_optimum_with_other_bounds(workflow_model, reduced):
+
+    with workflow_model, reduced.model:
+        for model in (workflow_model, reduced.model):
+            model.reactions.r_uptake_methane.upper_bound = 1.8
+        assert np.isclose(reduced.model.slim_optimize(), workflow_model.slim_optimize(), rtol=1e-7)
+
+
+def test_mapping_covers_every_reaction(workflow_model, reduced):
+
+    assert set(reduced.mapping) == {reaction.id for reaction in workflow_model.reactions}
+    members = {}
+    for reaction, (target, factor) in reduced.mapping.items():
+        if target is not None:
+            members.setdefault(target, {})[reaction] = factor
+    for target, expected in members.items():
+        assert target in reduced.model.reactions and reduced.members(target) == expected
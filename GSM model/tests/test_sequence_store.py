@@ -0,0 +1,58 @@
+import hashlib
+import random
+
+import pytest
+
+import sequence_store
+import sequences
+
+# sha256 of the string literals that were in sequences.py before the store
+literal_hashes = {
+    'pMMO_dna_seq': 'b8223990c4530668e1004916f4d50d12008ea0ebfc1e6951df071308de6358d5',
+    'pMMO_rna_seq': 'f2b8a1f2cef811f4cb51f808ac3d46f63a6ec7d44ddc472fcee8553ff2b890f6',
+    'pMMO_aa_seq': 'bbf23236e511cf74703c7a6482cb17f5b42b8c562c50509deb0f4f5121bf6588',
+    'hemo_dna_seq': 'f5e73ede9d6fc365549bdd69ee4f8280caebdf907869d088873e4b4b49cb7ca8',
+    'hemo_rna_seq': '1450b56ce9400782323c3af361c70a1b37c470024512909190024cdbde143b59',
+    'hemo_aa_seq': '89d6c5a9d49f7cc3e11f152c8f4a3082cc4e9648ce57a12b6ef4fba56009c29a',
+}
+
+
+@pytest.mark.parametrize('attribute', sorted(literal_hashes))
+def test_store_gives_the_literals(attribute):
+
+    assert hashlib.sha256(getattr(sequences, attribute).encode()).hexdigest() == literal_hashes[attribute]
+
+
+def test_round_trip(tmp_path):
+
+    # sequences found in the DNA (segments), not found in it (stored on their own) and left out (made from the DNA)
+    rng = random.Random(0)
+    dna = ''.join(rng.choices('ACGT', k=1001))
+    other = ''.join(rng.choices('ACGT', k=60))
+    coding = 'ATG' + ''.join(rng.choice(['GCT', 'AAA', 'TGG', 'CCG']) for _ in range(50)) + 'TAA'
+    constructs = {
+        'segments': {'dna': dna, 'rna': sequence_store.reverse_complement(dna[100:400]).replace('T', 'U'),
+                     'aa': sequence_store.translate(dna[10:310])},
+        'explicit': {'dna': dna, 'rna': other.replace('T', 'U'), 'aa': 'MKWV' * 20},
+        'derived': {'dna': coding + dna},
+    }
+    path = str(tmp_path / 'store.bin')
+    sequence_store.write_sequence_store(path, constructs)
+    store = sequence_store.SequenceStore(path)
+    try:
+        assert store.names() == list(constructs)
+        for name, record in constructs.items():
+            assert store.dna(name) == record['dna']
+            assert store.rna(name) == record.get('rna', record['dna'].replace('T', 'U'))
+            assert store.aa(name) == record.get('aa', sequence_store.translate(coding).split('*')[0])
+        assert 'missing' not in store
+    finally:
+        store.close()
+
+
+def test_not_a_store(tmp_path):
+
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        sequence_store.SequenceStore(str(path)).names()
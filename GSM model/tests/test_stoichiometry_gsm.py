@@ -0,0 +1,56 @@
+import random
+
+import numpy as np
+import pytest
+
+import benchmark_gsm
+import stoichiometry_gsm
+
+
+def test_round_like_python_on_ties():
+
+    # decimal ties like 0.000015 are stored a little above or below the tie, np.round and round() can disagree there
+    rng = random.Random(0)
+    values = np.array([rng.randrange(10 ** 5) / 10 ** 5 + 5e-6 for _ in range(10000)] + [0.000015, 0.000025, 1.000005])
+    assert stoichiometry_gsm.near_tie(values).all()
+    assert stoichiometry_gsm.round_like_python(values).tolist() == [round(value, 5) for value in values.tolist()]
+
+
+def test_near_tie_only_flags_ties():
+
+    values = np.array([0.1234, 0.123456, 1e-7, 0.5])
+    assert not stoichiometry_gsm.near_tie(values).any()
+
+
+@pytest.mark.parametrize('sequence_type', ['AA', 'DNA', 'RNA'])
+def test_batch_matches_loop(sequence_type):
+
+    proteins = benchmark_gsm.random_proteome(500, min_length=1, max_length=300)
+    if sequence_type == 'AA':
+        seqs = proteins
+    else:
+        rna_seqs, dna_seqs = stoichiometry_gsm.back_translate_batch(proteins)
+        seqs = dna_seqs if sequence_type == 'DNA' else rna_seqs
+    names = ['protein_{}'.format(i) for i in range(len(seqs))]
+    sbml_ids, products, coefficients = stoichiometry_gsm.get_stoichiometry_batch(seqs, sequence_type, names,
+                                                                                 chunk_size=64)
+    for seq, name, product, row in zip(seqs, names, products, coefficients):
+        assert stoichiometry_gsm.batch_to_stoichiometry(sbml_ids, product, row, sequence_type) == \
+            stoichiometry_gsm.get_stoichiometry(seq, sequence_type, name)
+
+
+def test_empty_batch():
+
+    sbml_ids, products, coefficients = stoichiometry_gsm.get_stoichiometry_batch([], 'AA', [])
+    assert products == [] and coefficients.shape == (0, len(sbml_ids))
+
+
+def test_empty_sequence_like_get_stoichiometry():
+
+    with pytest.raises(ZeroDivisionError):
+        stoichiometry_gsm.get_stoichiometry('', 'AA', 'empty')
+    with pytest.raises(ZeroDivisionError):
+        stoichiometry_gsm.get_stoichiometry_batch(['MK', ''], 'AA', ['protein', 'empty'])
+    sbml_ids, products, coefficients = stoichiometry_gsm.get_stoichiometry_batch([''], 'DNA', ['empty'])
+    assert stoichiometry_gsm.batch_to_stoichiometry(sbml_ids, products[0], coefficients[0], 'DNA') == \
+        stoichiometry_gsm.get_stoichiometry('', 'DNA', 'empty')